@@ -1,18 +1,24 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+import anyio.from_thread
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
+from app.api.responses import listing_response
 from app.db.deps import get_db
+from app.models.models import DataCollection
 from app.schemas.bank_transaction import (
     BankTransactionFilters,
     BankTransactionIn,
     BankTransactionOut,
 )
 from app.schemas.common import AmountRange, DateTimeRange
-from app.services.bank_transactions import BankTransactionService, IdempotencyConflict
+from app.services.bank_transactions import BankTransactionService, IdempotencyConflict, StatementFormat
+from app.services.pagination import MAX_PAGE_SIZE
+from app.utils.statement_stream import StatementFormatError
 
 router = APIRouter(prefix="/tenants/{tenant_id}/bank-transactions", tags=["bank-transactions"])
 
@@ -34,19 +40,93 @@ def import_transactions(
         raise HTTPException(status_code=409, detail=str(e))
 
 
+UPLOAD_FORMATS: dict[str, StatementFormat] = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+@router.post("/upload", status_code=status.HTTP_200_OK)
+def upload_statement(
+    tenant_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+    statement_format: StatementFormat | None = Query(default=None, alias="format"),
+):
+    """Import a statement file read as it arrives.
+
+    ``format`` is csv, ndjson, camt053, mt940 or ofx; without it, a ``text/csv`` or
+    ``application/x-ndjson`` Content-Type picks the format. Same response and idempotency
+    rules as /import; the body is never held in memory as a whole.
+    """
+    if not idempotency_key:
+        raise HTTPException(status_code=400, detail="Idempotency-Key header is required")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = statement_format or UPLOAD_FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=415, detail=f"Pass ?format= or a Content-Type of: {', '.join(UPLOAD_FORMATS)}"
+        )
+    try:
+        return BankTransactionService(db).import_stream(
+            tenant_id=tenant_id, chunks=_body_chunks(request), fmt=fmt, idempotency_key=idempotency_key
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except StatementFormatError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _body_chunks(request: Request) -> Iterator[bytes]:
+    # Sync endpoints run in a worker thread; pull the async body one chunk at a time from the event loop.
+    stream = request.stream()
+    while True:
+        try:
+            chunk = anyio.from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+        if chunk:
+            yield chunk
+
+
 @router.get("", response_model=list[BankTransactionOut])
 def list_transactions(
     tenant_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     posted_start: datetime | None = Query(default=None),
     posted_end: datetime | None = Query(default=None),
     amount_min: float | None = Query(default=None, ge=0),
     amount_max: float | None = Query(default=None, ge=0),
     description_contains: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(default=None),
 ):
     filters = BankTransactionFilters(
         posted_at=DateTimeRange(start=posted_start, end=posted_end) if (posted_start or posted_end) else None,
         amount=AmountRange(min=amount_min, max=amount_max) if (amount_min is not None or amount_max is not None) else None,
         description_contains=description_contains,
     )
-    return BankTransactionService(db).list_transactions(tenant_id=tenant_id, filters=filters)
+    return listing_response(
+        request,
+        db,
+        tenant_id=tenant_id,
+        collection=DataCollection.bank_transactions,
+        key=(filters.model_dump_json(), limit, cursor),
+        fields=BankTransactionOut.model_fields,
+        load=lambda: BankTransactionService(db).list_transaction_rows(
+            tenant_id=tenant_id, filters=filters, limit=limit, cursor=cursor
+        ),
+    )
+
+
+@router.get("/search", response_model=list[BankTransactionOut])
+def search_transactions(
+    tenant_id: int,
+    q: str = Query(min_length=1),
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    return BankTransactionService(db).search_transactions(tenant_id=tenant_id, q=q, limit=limit)
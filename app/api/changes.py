@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.db.deps import get_db
+from app.schemas.change import ChangeFeed
+from app.services.change_log import ChangeLogCompacted, ChangeLogService
+from app.services.pagination import MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/tenants/{tenant_id}", tags=["changes"])
+
+
+@router.get("/changes", response_model=ChangeFeed)
+def list_changes(
+    tenant_id: int,
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """Invoice, transaction and match changes after seq ``since``, oldest first.
+
+    Answers 410 Gone once entries after ``since`` have been compacted; the client then resyncs
+    from the listings and continues from the compacted seq named in the error.
+    """
+    try:
+        items, has_more = ChangeLogService(db).feed(tenant_id=tenant_id, since=since, limit=limit)
+    except ChangeLogCompacted as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return ChangeFeed(items=items, next_since=items[-1].seq if items else since, has_more=has_more)
@@ -2,14 +2,17 @@ from __future__ import annotations
 
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
+from app.api.responses import listing_response
 from app.db.deps import get_db
-from app.models.models import InvoiceStatus
+from app.models.models import DataCollection, InvoiceStatus
 from app.schemas.common import AmountRange, DateRange
-from app.schemas.invoice import InvoiceCreate, InvoiceFilters, InvoiceOut
+from app.schemas.invoice import InvoiceBatchOut, InvoiceCreate, InvoiceFilters, InvoiceOut
+from app.services.idempotency import IdempotencyConflict
 from app.services.invoices import InvoiceService
+from app.services.pagination import MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/tenants/{tenant_id}/invoices", tags=["invoices"])
 
@@ -21,9 +24,24 @@ def create_invoice(tenant_id: int, payload: InvoiceCreate, db: Session = Depends
     return invoice
 
 
+@router.post("/batch", response_model=InvoiceBatchOut, status_code=status.HTTP_201_CREATED)
+def create_invoices(
+    tenant_id: int,
+    payload: list[InvoiceCreate],
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+):
+    """Create many invoices in one request; created_ids follow the payload order."""
+    try:
+        return InvoiceService(db).create_invoices(tenant_id=tenant_id, invoices=payload, idempotency_key=idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @router.get("", response_model=list[InvoiceOut])
 def list_invoices(
     tenant_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     status_filter: InvoiceStatus | None = Query(default=None, alias="status"),
     vendor_id: int | None = Query(default=None),
@@ -31,14 +49,36 @@ def list_invoices(
     date_end: date | None = Query(default=None),
     amount_min: float | None = Query(default=None, ge=0),
     amount_max: float | None = Query(default=None, ge=0),
+    description_contains: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(default=None),
 ):
     filters = InvoiceFilters(
         status=status_filter,
         vendor_id=vendor_id,
         invoice_date=DateRange(start=date_start, end=date_end) if (date_start or date_end) else None,
         amount=AmountRange(min=amount_min, max=amount_max) if (amount_min is not None or amount_max is not None) else None,
+        description_contains=description_contains,
+    )
+    return listing_response(
+        request,
+        db,
+        tenant_id=tenant_id,
+        collection=DataCollection.invoices,
+        key=(filters.model_dump_json(), limit, cursor),
+        fields=InvoiceOut.model_fields,
+        load=lambda: InvoiceService(db).list_invoice_rows(tenant_id=tenant_id, filters=filters, limit=limit, cursor=cursor),
     )
-    return InvoiceService(db).list_invoices(tenant_id=tenant_id, filters=filters)
+
+
+@router.get("/search", response_model=list[InvoiceOut])
+def search_invoices(
+    tenant_id: int,
+    q: str = Query(min_length=1),
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    return InvoiceService(db).search_invoices(tenant_id=tenant_id, q=q, limit=limit)
 
 
 @router.delete("/{invoice_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,19 +1,114 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from collections.abc import Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Engine
 from sqlalchemy.orm import Session
 
+from app.api.responses import listing_response
 from app.db.deps import get_db
-from app.schemas.match import AIExplainOut, MatchOut, ReconcileRequest
+from app.models.models import DataCollection, MatchStatus
+from app.schemas.job import ReconcileJobOut, ReconcileJobResults
+from app.schemas.match import (
+    AIExplainOut,
+    BulkConfirmOut,
+    BulkConfirmRequest,
+    MatchConfirmResult,
+    MatchOut,
+    ReconcileRequest,
+    RejectionsCleared,
+)
 from app.services.explain import ExplanationService
+from app.services.jobs import ReconcileJobService, get_job_runner, job_status
+from app.services.pagination import MAX_PAGE_SIZE
 from app.services.reconciliation import ReconciliationService
 
 router = APIRouter(prefix="/tenants/{tenant_id}", tags=["reconciliation"])
 
 
 @router.post("/reconcile", response_model=list[MatchOut], status_code=status.HTTP_200_OK)
-def reconcile(tenant_id: int, payload: ReconcileRequest | None = None, db: Session = Depends(get_db)):
-    return ReconciliationService(db).reconcile(tenant_id=tenant_id, request=payload)
+def reconcile(tenant_id: int, response: Response, payload: ReconcileRequest | None = None, db: Session = Depends(get_db)):
+    svc = ReconciliationService(db)
+    matches = svc.reconcile(tenant_id=tenant_id, request=payload)
+    if svc.assignment_stats is not None:
+        st = svc.assignment_stats
+        response.headers["Server-Timing"] = (
+            f'assign-components;dur={st.components_seconds * 1000:.1f};desc="{st.components} components, {st.edges} edges", '
+            f'assign-solve;dur={st.solve_seconds * 1000:.1f};desc="largest component {st.largest_component} edges"'
+        )
+    return matches
+
+
+@router.post("/reconcile/stream", response_class=StreamingResponse)
+def reconcile_stream(tenant_id: int, payload: ReconcileRequest | None = None, db: Session = Depends(get_db)):
+    """Same run as POST /reconcile, streamed as NDJSON (one match per line) one invoice shard at a time."""
+    return StreamingResponse(_stream_matches(db.get_bind(), tenant_id, payload), media_type="application/x-ndjson")
+
+
+def _stream_matches(bind: Engine, tenant_id: int, payload: ReconcileRequest | None) -> Iterator[str]:
+    # The body outlives the request's session, so the run gets its own; it commits only
+    # once every row was sent, and rolls back if the client goes away.
+    with Session(bind, expire_on_commit=False, autoflush=False) as db:
+        for batch in ReconciliationService(db).reconcile_batches(tenant_id=tenant_id, request=payload):
+            yield "".join(MatchOut.model_validate(m).model_dump_json() + "\n" for m in batch)
+        db.commit()
+
+
+@router.post("/reconcile/jobs", response_model=ReconcileJobOut, status_code=status.HTTP_202_ACCEPTED)
+def submit_reconcile_job(tenant_id: int, payload: ReconcileRequest | None = None, db: Session = Depends(get_db)):
+    job = ReconcileJobService(db).submit(tenant_id=tenant_id, request=payload)
+    # The worker reads the job in its own session, so it must be committed first.
+    db.commit()
+    runner = get_job_runner(db.get_bind())
+    runner.enqueue(job.id)
+    return job_status(job, runner)
+
+
+@router.get("/reconcile/jobs/{job_id}", response_model=ReconcileJobOut)
+def get_reconcile_job(tenant_id: int, job_id: int, db: Session = Depends(get_db)):
+    job = ReconcileJobService(db).get(tenant_id=tenant_id, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job, get_job_runner(db.get_bind()))
+
+
+@router.get("/reconcile/jobs/{job_id}/results", response_model=ReconcileJobResults)
+def get_reconcile_job_results(
+    tenant_id: int,
+    job_id: int,
+    limit: int = Query(default=100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    svc = ReconcileJobService(db)
+    if svc.get(tenant_id=tenant_id, job_id=job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    items, next_cursor = svc.results(tenant_id=tenant_id, job_id=job_id, limit=limit, cursor=cursor)
+    return ReconcileJobResults(items=items, next_cursor=next_cursor)
+
+
+@router.get("/matches", response_model=list[MatchOut])
+def list_matches(
+    tenant_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    status_filter: MatchStatus | None = Query(default=None, alias="status"),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(default=None),
+):
+    return listing_response(
+        request,
+        db,
+        tenant_id=tenant_id,
+        collection=DataCollection.matches,
+        key=(status_filter, limit, cursor),
+        fields=MatchOut.model_fields,
+        load=lambda: ReconciliationService(db).list_match_rows(
+            tenant_id=tenant_id, status=status_filter, limit=limit, cursor=cursor
+        ),
+    )
 
 
 @router.post("/matches/{match_id}/confirm", response_model=MatchOut, status_code=status.HTTP_200_OK)
@@ -26,6 +121,33 @@ def confirm_match(tenant_id: int, match_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/matches/confirm", response_model=BulkConfirmOut, status_code=status.HTTP_200_OK)
+def confirm_matches(tenant_id: int, payload: BulkConfirmRequest, db: Session = Depends(get_db)):
+    """Confirm many matches (by id, or every proposal at or above min_score) with per-id outcomes."""
+    outcomes = ReconciliationService(db).confirm_matches(tenant_id=tenant_id, match_ids=payload.match_ids, min_score=payload.min_score)
+    return BulkConfirmOut(
+        confirmed=sum(1 for o in outcomes.values() if o == "confirmed"),
+        results=[MatchConfirmResult(match_id=match_id, outcome=o) for match_id, o in outcomes.items()],
+    )
+
+
+@router.post("/matches/{match_id}/reject", response_model=MatchOut, status_code=status.HTTP_200_OK)
+def reject_match(tenant_id: int, match_id: int, db: Session = Depends(get_db)):
+    """Reject a proposed match; later reconcile runs never propose its pair(s) again."""
+    try:
+        return ReconciliationService(db).reject_match(tenant_id=tenant_id, match_id=match_id)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Match not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/rejections", response_model=RejectionsCleared)
+def clear_rejections(tenant_id: int, invoice_id: int | None = Query(default=None), db: Session = Depends(get_db)):
+    """Forget rejected pairs, of one invoice or all of the tenant's, so reconcile may propose them again."""
+    return RejectionsCleared(cleared=ReconciliationService(db).clear_rejections(tenant_id=tenant_id, invoice_id=invoice_id))
+
+
 @router.get("/reconcile/explain", response_model=AIExplainOut)
 async def explain(
     tenant_id: int,
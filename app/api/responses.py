@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable, Sequence
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.models.models import DataCollection
+from app.services.data_versions import CachedListing, DataVersionService, get_listing_cache
+from app.utils.fast_json import CHUNK_ROWS, iter_json_array
+
+JSON = "application/json"
+
+RowsLoader = Callable[[], tuple[Sequence[Sequence[Any]], int | None]]
+
+
+def _headers(next_cursor: int | None, etag: str | None = None) -> dict[str, str]:
+    headers = {"ETag": etag} if etag is not None else {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    return headers
+
+
+def rows_response(
+    fields: Sequence[str], rows: Sequence[Sequence[Any]], *, next_cursor: int | None = None, etag: str | None = None
+) -> Response:
+    """A JSON list response for row tuples (see list_*_rows), streamed in chunks when it is large.
+
+    The next page's cursor, if any, goes in the ``X-Next-Cursor`` header.
+    """
+    fields = list(fields)
+    headers = _headers(next_cursor, etag)
+    if len(rows) <= CHUNK_ROWS:
+        return Response(b"".join(iter_json_array(fields, rows)), media_type=JSON, headers=headers)
+    return StreamingResponse(iter_json_array(fields, rows), media_type=JSON, headers=headers)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): the W/ prefix is ignored.
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (t.removeprefix("W/") for t in tags)
+
+
+def listing_response(
+    request: Request,
+    db: Session,
+    *,
+    tenant_id: int,
+    collection: DataCollection,
+    key: Hashable,
+    fields: Sequence[str],
+    load: RowsLoader,
+) -> Response:
+    """rows_response behind a weak ETag from the tenant's ``collection`` version.
+
+    A matching If-None-Match gets a 304 after reading only the version row. Otherwise the body
+    last served for the same ``key`` (the filters and page) at this version is reused, and only
+    a miss runs ``load``. Streamed (large) bodies are not cached.
+    """
+    version = DataVersionService(db).current(tenant_id=tenant_id, collection=collection)
+    etag = f'W/"{collection.value}-{version}"'
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cache = get_listing_cache(db.get_bind())
+    entry = cache.get(tenant_id, collection, key, version)
+    if entry is None:
+        rows, next_cursor = load()
+        if len(rows) > CHUNK_ROWS:
+            return rows_response(fields, rows, next_cursor=next_cursor, etag=etag)
+        entry = CachedListing(version, b"".join(iter_json_array(list(fields), rows)), next_cursor)
+        cache.put(tenant_id, collection, key, entry)
+    return Response(entry.body, media_type=JSON, headers=_headers(entry.next_cursor, etag))
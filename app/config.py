@@ -15,5 +15,25 @@ class Settings(BaseSettings):
     openai_model: str = "gpt-4.1-mini"  # any chat model
     ai_timeout_seconds: float = 4.0
 
+    # Reconciliation
+    reconcile_workers: int = 1  # >1 scores invoice shards in a process pool
+    reconcile_shard_size: int = 2000  # invoices per shard
+    reconcile_job_workers: int = 2  # threads running async reconcile jobs
+    reconcile_job_lease_seconds: float = 60.0  # a running job whose runner stops renewing this long is requeued
+    split_max_candidates: int = 24  # invoices considered per transaction and vendor
+    split_max_work: int = 20_000  # subset-sum steps per transaction (all vendors) before giving up
+
+    # Idempotency keys
+    idempotency_ttl_seconds: int = 7 * 24 * 3600  # a key is forgotten (and its record swept) after this
+    idempotency_cache_size: int = 1024  # committed records kept in the in-process LRU
+    idempotency_sweep_interval_seconds: float = 300.0
+
+    # Change feed
+    change_log_retention_seconds: int = 30 * 24 * 3600  # entries older than this are compacted away
+    change_log_compact_interval_seconds: float = 3600.0
+
+    # Conditional list GETs
+    listing_cache_size: int = 256  # serialized list responses kept per process, by tenant, collection and filters
+
 
 settings = Settings()
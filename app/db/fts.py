@@ -0,0 +1,96 @@
+"""SQLite FTS5 indexes over invoice and bank transaction descriptions.
+
+Each indexed table gets an external-content FTS5 table ``<table>_fts`` that stores only the
+tokenized description, keyed by the row id, and is kept in sync by insert/update/delete
+triggers. Other engines, and SQLite builds without FTS5, get no index; searches there fall
+back to LIKE (see app/services/search.py).
+"""
+from __future__ import annotations
+
+import threading
+
+from sqlalchemy import Connection, Engine, event, text
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+
+FTS_TABLES = ("invoices", "bank_transactions")
+
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+def _ddl(table: str) -> list[str]:
+    fts = fts_table(table)
+    remove = f"INSERT INTO {fts}({fts}, rowid, description) VALUES ('delete', old.id, old.description);"
+    add = f"INSERT INTO {fts}(rowid, description) VALUES (new.id, new.description);"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(description, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF description ON {table} BEGIN {remove} {add} END",
+    ]
+
+
+def fts5_available(conn: Connection) -> bool:
+    if conn.dialect.name != "sqlite":
+        return False
+    return bool(conn.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar())
+
+
+def _has_table(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": name}).first() is not None
+
+
+def create_fts(conn: Connection, table: str) -> bool:
+    """Create the index and triggers for ``table`` if missing, filling it from existing rows; True if created."""
+    if _has_table(conn, fts_table(table)):
+        return False
+    for stmt in _ddl(table):
+        conn.exec_driver_sql(stmt)
+    conn.exec_driver_sql(f"INSERT INTO {fts_table(table)}({fts_table(table)}) VALUES ('rebuild')")
+    return True
+
+
+def ensure_fts(engine: Engine) -> None:
+    """Add the description indexes to a database created before they existed."""
+    with engine.begin() as conn:
+        if fts5_available(conn):
+            for table in FTS_TABLES:
+                create_fts(conn, table)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection: Connection, tables=(), **kw) -> None:
+    if not fts5_available(connection):
+        return
+    for table in tables:
+        if table.name in FTS_TABLES:
+            create_fts(connection, table.name)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _before_drop(target, connection: Connection, tables=(), **kw) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    for table in tables:
+        if table.name in FTS_TABLES:
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts_table(table.name)}")
+
+
+_indexed: dict[tuple[Engine, str], bool] = {}
+_indexed_lock = threading.Lock()
+
+
+def has_fts(db: Session, table: str) -> bool:
+    """Whether ``table`` has a description index on this database (checked once per engine)."""
+    key = (db.get_bind(), table)
+    with _indexed_lock:
+        found = _indexed.get(key)
+    if found is None:
+        conn = db.connection()
+        found = fts5_available(conn) and _has_table(conn, fts_table(table))
+        with _indexed_lock:
+            _indexed[key] = found
+    return found
@@ -1,9 +1,86 @@
 from __future__ import annotations
 
+from sqlalchemy import Engine, inspect, select, text, update
+from sqlalchemy.orm import Session
+
 from app.db.base import Base
+from app.db.fts import ensure_fts
 from app.db.session import ENGINE
 from app.models import models  # noqa: F401  (ensure models are imported)
+from app.models.models import BankTransaction, Invoice
+from app.utils.reconcile import to_cents, token_signature
+
+BACKFILL_BATCH_SIZE = 1000
+# Indexes earlier versions created that no query uses any more.
+OBSOLETE_INDEXES = ("ix_invoices_tenant_status_amount_cents",)
+
+
+def init_db(engine: Engine = ENGINE) -> None:
+    Base.metadata.create_all(bind=engine)
+    upgrade_db(engine)
+
+
+def upgrade_db(engine: Engine) -> None:
+    """Bring a database created by an older version up to the current models.
+
+    create_all only creates missing tables, so columns and indexes added to existing
+    tables are added here (the columns are all nullable) and then backfilled, obsolete
+    indexes are dropped, and the description search indexes are built from the existing rows.
+    """
+    add_missing_columns(engine)
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    ensure_fts(engine)
+    with Session(engine) as db:
+        backfill_description_tokens(db)
+        backfill_amount_cents(db)
+        db.commit()
+
+
+def add_missing_columns(engine: Engine) -> None:
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{col.name}" {col_type}'))
+            # Indexes on added columns (and any other new ones) on existing tables.
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def backfill_description_tokens(db: Session) -> int:
+    """Compute token signatures for rows stored before they were written at insert time."""
+    done = 0
+    for model in (Invoice, BankTransaction):
+        while True:
+            rows = db.execute(
+                select(model.id, model.description).where(model.description_tokens.is_(None)).limit(BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            db.execute(
+                update(model),
+                [{"id": r.id, "description_tokens": token_signature(r.description)} for r in rows],
+            )
+            done += len(rows)
+    return done
 
 
-def init_db() -> None:
-    Base.metadata.create_all(bind=ENGINE)
+def backfill_amount_cents(db: Session) -> int:
+    """Fill the integer minor-unit amount for rows stored before it was written at insert time."""
+    done = 0
+    for model in (Invoice, BankTransaction):
+        while True:
+            rows = db.execute(select(model.id, model.amount).where(model.amount_cents.is_(None)).limit(BACKFILL_BATCH_SIZE)).all()
+            if not rows:
+                break
+            db.execute(update(model), [{"id": r.id, "amount_cents": to_cents(r.amount)} for r in rows])
+            done += len(rows)
+    return done
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import base64
 from dataclasses import dataclass
 from datetime import date, datetime
 from enum import Enum
@@ -11,14 +12,16 @@ from strawberry.types import Info
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
-from app.models.models import InvoiceStatus
-from app.schemas.bank_transaction import BankTransactionIn
+from app.models.models import InvoiceStatus, MatchStatus
+from app.schemas.bank_transaction import BankTransactionFilters, BankTransactionIn
 from app.schemas.invoice import InvoiceCreate, InvoiceFilters
-from app.schemas.match import ReconcileRequest
+from app.schemas.match import BulkConfirmRequest, ReconcileRequest
 from app.schemas.tenant import TenantCreate
 from app.services.bank_transactions import BankTransactionService, IdempotencyConflict
 from app.services.explain import ExplanationService
 from app.services.invoices import InvoiceService
+from app.services.jobs import ReconcileJobService, get_job_runner, job_status
+from app.services.pagination import MAX_PAGE_SIZE
 from app.services.reconciliation import ReconciliationService
 from app.services.tenants import TenantService
 
@@ -122,9 +125,86 @@ class MatchType:
     bank_transaction_id: int
     score: float
     status: GMatchStatus
+    group_id: int | None
     created_at: datetime
 
 
+@strawberry.type
+class MatchConfirmResultType:
+    match_id: int
+    outcome: str
+
+
+@strawberry.enum
+class GJobStatus(Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+@strawberry.type
+class ReconcileJobType:
+    id: int
+    tenant_id: int
+    status: GJobStatus
+    phase: str
+    progress: float
+    result_count: int | None
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+@strawberry.type
+class ReconcileJobResultsType:
+    items: list[MatchType]
+    next_cursor: int | None
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: str | None
+
+
+@strawberry.type
+class InvoiceEdge:
+    cursor: str
+    node: InvoiceType
+
+
+@strawberry.type
+class InvoiceConnection:
+    edges: list[InvoiceEdge]
+    page_info: PageInfo
+
+
+@strawberry.type
+class BankTransactionEdge:
+    cursor: str
+    node: BankTransactionType
+
+
+@strawberry.type
+class BankTransactionConnection:
+    edges: list[BankTransactionEdge]
+    page_info: PageInfo
+
+
+@strawberry.type
+class MatchEdge:
+    cursor: str
+    node: MatchType
+
+
+@strawberry.type
+class MatchConnection:
+    edges: list[MatchEdge]
+    page_info: PageInfo
+
+
 @strawberry.type
 class AIExplainType:
     explanation: str
@@ -145,6 +225,7 @@ class InvoiceFilterInput:
     date_end: date | None = None
     amount_min: float | None = None
     amount_max: float | None = None
+    description_contains: str | None = None
 
 
 @strawberry.input
@@ -152,11 +233,141 @@ class PaginationInput:
     limit: int = 50
     offset: int = 0
 
+
+@strawberry.enum
+class GReconcileMode(Enum):
+    full = "full"
+    incremental = "incremental"
+
+
+@strawberry.enum
+class GCandidateStrategy(Enum):
+    index = "index"
+    exhaustive = "exhaustive"
+    sql = "sql"
+
+
+@strawberry.enum
+class GAssignment(Enum):
+    per_invoice = "per_invoice"
+    one_to_one = "one_to_one"
+
+
 @strawberry.input
 class ReconcileRequestInput:
     invoice_id: int | None = None
     bank_transaction_id: int | None = None
     confirm: bool | None = None
+    # Same meaning as on the REST ReconcileRequest; left out, they take its defaults.
+    mode: GReconcileMode | None = None
+    candidate_strategy: GCandidateStrategy | None = None
+    assignment: GAssignment | None = None
+    split_payments: bool | None = None
+    max_split_invoices: int | None = None
+
+
+def _reconcile_request(input: ReconcileRequestInput | None) -> ReconcileRequest | None:
+    if input is None:
+        return None
+    fields = {k: v.value if isinstance(v, Enum) else v for k, v in vars(input).items() if v is not None}
+    return ReconcileRequest(**fields)
+
+
+def _job_type(db: Session, job) -> ReconcileJobType:
+    out = job_status(job, get_job_runner(db.get_bind()))
+    return ReconcileJobType(**{**out.model_dump(), "status": GJobStatus(out.status.value)})
+
+
+def _encode_cursor(row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{row_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str | None) -> int | None:
+    if cursor is None:
+        return None
+    try:
+        kind, _, value = base64.urlsafe_b64decode(cursor.encode()).decode().partition(":")
+        if kind == "id":
+            return int(value)
+    except ValueError:
+        pass
+    raise ValueError("Invalid cursor")
+
+
+def _page_size(first: int) -> int:
+    return max(1, min(first, MAX_PAGE_SIZE))
+
+
+def _page_info(items, next_cursor: int | None) -> PageInfo:
+    return PageInfo(
+        has_next_page=next_cursor is not None,
+        end_cursor=_encode_cursor(items[-1].id) if items else None,
+    )
+
+
+def _invoice_filters(filters: InvoiceFilterInput | None) -> InvoiceFilters | None:
+    if not filters:
+        return None
+    from app.schemas.common import AmountRange, DateRange
+
+    return InvoiceFilters(
+        status=InvoiceStatus(filters.status.value) if filters.status else None,
+        vendor_id=filters.vendor_id,
+        invoice_date=(
+            None
+            if not (filters.date_start or filters.date_end)
+            else DateRange(start=filters.date_start, end=filters.date_end)
+        ),
+        amount=(
+            None
+            if (filters.amount_min is None and filters.amount_max is None)
+            else AmountRange(min=filters.amount_min, max=filters.amount_max)
+        ),
+        description_contains=filters.description_contains,
+    )
+
+
+def _invoice_type(i) -> InvoiceType:
+    return InvoiceType(
+        id=i.id,
+        tenant_id=i.tenant_id,
+        vendor_id=i.vendor_id,
+        invoice_number=i.invoice_number,
+        amount=i.amount_cents / 100,
+        currency=i.currency,
+        invoice_date=i.invoice_date,
+        description=i.description,
+        status=GInvoiceStatus(i.status.value),
+        created_at=i.created_at,
+    )
+
+
+def _bank_transaction_type(t) -> BankTransactionType:
+    return BankTransactionType(
+        id=t.id,
+        tenant_id=t.tenant_id,
+        external_id=t.external_id,
+        posted_at=t.posted_at,
+        amount=t.amount_cents / 100,
+        currency=t.currency,
+        description=t.description,
+        created_at=t.created_at,
+    )
+
+
+def _match_type(m) -> MatchType:
+    return MatchType(
+        id=m.id,
+        tenant_id=m.tenant_id,
+        invoice_id=m.invoice_id,
+        bank_transaction_id=m.bank_transaction_id,
+        score=m.score,
+        status=GMatchStatus(m.status.value),
+        group_id=m.group_id,
+        created_at=m.created_at,
+    )
+
+
 # ---------------------------
 # Query
 # ---------------------------
@@ -178,52 +389,98 @@ class Query:
         pagination: PaginationInput | None = None,
     ) -> list[InvoiceType]:
         db = info.context.db
+        # Offset paging still walks the skipped rows; invoices_connection seeks by cursor instead.
+        limit = offset = None
+        if pagination:
+            offset = max(pagination.offset, 0)
+            limit = max(pagination.limit, 0) + offset
+        items, _ = InvoiceService(db).list_invoices(tenant_id=tenant_id, filters=_invoice_filters(filters), limit=limit)
+        if offset:
+            items = items[offset:]
+        return [_invoice_type(i) for i in items]
 
-        f = None
-        if filters:
-            f = InvoiceFilters(
-                status=InvoiceStatus(filters.status.value) if filters.status else None,
-                vendor_id=filters.vendor_id,
-                invoice_date=(
-                    None
-                    if not (filters.date_start or filters.date_end)
-                    else {"start": filters.date_start, "end": filters.date_end}
-                ),
-                amount=(
-                    None
-                    if (filters.amount_min is None and filters.amount_max is None)
-                    else {"min": filters.amount_min, "max": filters.amount_max}
-                ),
-            )
+    @strawberry.field
+    def invoices_connection(
+        self,
+        info: Info,
+        tenant_id: int,
+        filters: InvoiceFilterInput | None = None,
+        first: int = 50,
+        after: str | None = None,
+    ) -> InvoiceConnection:
+        items, next_cursor = InvoiceService(info.context.db).list_invoices(
+            tenant_id=tenant_id, filters=_invoice_filters(filters), limit=_page_size(first), cursor=_decode_cursor(after)
+        )
+        return InvoiceConnection(
+            edges=[InvoiceEdge(cursor=_encode_cursor(i.id), node=_invoice_type(i)) for i in items],
+            page_info=_page_info(items, next_cursor),
+        )
 
-            # convert dict to pydantic submodels
-            if isinstance(f.invoice_date, dict):
-                from app.schemas.common import DateRange
-                f.invoice_date = DateRange(**f.invoice_date)
+    @strawberry.field
+    def bank_transactions_connection(
+        self,
+        info: Info,
+        tenant_id: int,
+        description_contains: str | None = None,
+        first: int = 50,
+        after: str | None = None,
+    ) -> BankTransactionConnection:
+        items, next_cursor = BankTransactionService(info.context.db).list_transactions(
+            tenant_id=tenant_id,
+            filters=BankTransactionFilters(description_contains=description_contains),
+            limit=_page_size(first),
+            cursor=_decode_cursor(after),
+        )
+        return BankTransactionConnection(
+            edges=[BankTransactionEdge(cursor=_encode_cursor(t.id), node=_bank_transaction_type(t)) for t in items],
+            page_info=_page_info(items, next_cursor),
+        )
+
+    @strawberry.field
+    def matches_connection(
+        self,
+        info: Info,
+        tenant_id: int,
+        status: GMatchStatus | None = None,
+        first: int = 50,
+        after: str | None = None,
+    ) -> MatchConnection:
+        items, next_cursor = ReconciliationService(info.context.db).list_matches(
+            tenant_id=tenant_id,
+            status=MatchStatus(status.value) if status else None,
+            limit=_page_size(first),
+            cursor=_decode_cursor(after),
+        )
+        return MatchConnection(
+            edges=[MatchEdge(cursor=_encode_cursor(m.id), node=_match_type(m)) for m in items],
+            page_info=_page_info(items, next_cursor),
+        )
 
-            if isinstance(f.amount, dict):
-                from app.schemas.common import AmountRange
-                f.amount = AmountRange(**f.amount)
+    @strawberry.field
+    def search_invoices(self, info: Info, tenant_id: int, q: str, first: int = 50) -> list[InvoiceType]:
+        items = InvoiceService(info.context.db).search_invoices(tenant_id=tenant_id, q=q, limit=_page_size(first))
+        return [_invoice_type(i) for i in items]
 
-        items = InvoiceService(db).list_invoices(tenant_id=tenant_id, filters=f)
-        if pagination:
-            items = items[pagination.offset : pagination.offset + pagination.limit]
+    @strawberry.field
+    def search_bank_transactions(self, info: Info, tenant_id: int, q: str, first: int = 50) -> list[BankTransactionType]:
+        items = BankTransactionService(info.context.db).search_transactions(tenant_id=tenant_id, q=q, limit=_page_size(first))
+        return [_bank_transaction_type(t) for t in items]
 
-        return [
-            InvoiceType(
-                id=i.id,
-                tenant_id=i.tenant_id,
-                vendor_id=i.vendor_id,
-                invoice_number=i.invoice_number,
-                amount=float(i.amount),
-                currency=i.currency,
-                invoice_date=i.invoice_date,
-                description=i.description,
-                status=GInvoiceStatus(i.status.value),
-                created_at=i.created_at,
-            )
-            for i in items
-        ]
+    @strawberry.field
+    def reconcile_job(self, info: Info, tenant_id: int, job_id: int) -> ReconcileJobType | None:
+        db = info.context.db
+        job = ReconcileJobService(db).get(tenant_id=tenant_id, job_id=job_id)
+        return _job_type(db, job) if job is not None else None
+
+    @strawberry.field
+    def reconcile_job_results(
+        self, info: Info, tenant_id: int, job_id: int, limit: int = 100, cursor: int | None = None
+    ) -> ReconcileJobResultsType:
+        db = info.context.db
+        items, next_cursor = ReconcileJobService(db).results(
+            tenant_id=tenant_id, job_id=job_id, limit=_page_size(limit), cursor=cursor
+        )
+        return ReconcileJobResultsType(items=[_match_type(m) for m in items], next_cursor=next_cursor)
 
     @strawberry.field
     def explain_reconciliation(
@@ -247,12 +504,14 @@ class Query:
             raise ValueError("Invoice or transaction not found")
 
         sb = compute_score(
-            invoice_amount=float(invoice.amount),
+            invoice_amount_cents=invoice.amount_cents,
             invoice_date=invoice.invoice_date,
             invoice_desc=invoice.description,
-            txn_amount=float(txn.amount),
+            txn_amount_cents=txn.amount_cents,
             txn_posted_at=txn.posted_at,
             txn_desc=txn.description,
+            invoice_tokens=invoice.description_tokens,
+            txn_tokens=txn.description_tokens,
         )
 
         svc = ExplanationService(db, ai_client=DisabledAIClient())
@@ -291,7 +550,7 @@ class Mutation:
             tenant_id=inv.tenant_id,
             vendor_id=inv.vendor_id,
             invoice_number=inv.invoice_number,
-            amount=float(inv.amount),
+            amount=inv.amount_cents / 100,
             currency=inv.currency,
             invoice_date=inv.invoice_date,
             description=inv.description,
@@ -304,6 +563,31 @@ class Mutation:
         db = info.context.db
         return InvoiceService(db).delete_invoice(tenant_id=tenant_id, invoice_id=invoice_id)
 
+    @strawberry.field
+    def create_invoices(
+        self, info: Info, tenant_id: int, input: list[InvoiceInput], idempotency_key: str | None = None
+    ) -> list[int]:
+        db = info.context.db
+        try:
+            out = InvoiceService(db).create_invoices(
+                tenant_id=tenant_id,
+                invoices=[
+                    InvoiceCreate(
+                        vendor_id=i.vendor_id,
+                        invoice_number=i.invoice_number,
+                        amount=i.amount,
+                        currency=i.currency,
+                        invoice_date=i.invoice_date,
+                        description=i.description,
+                    )
+                    for i in input
+                ],
+                idempotency_key=idempotency_key,
+            )
+        except IdempotencyConflict as e:
+            raise ValueError(str(e))
+        return out["created_ids"]
+
     @strawberry.field
     def import_bank_transactions(
         self,
@@ -335,14 +619,7 @@ class Mutation:
     @strawberry.field
     def reconcile(self, info: Info, tenant_id: int, input: ReconcileRequestInput | None = None) -> list[MatchType]:
         db = info.context.db
-
-        from app.schemas.match import ReconcileRequest as ReconcileRequestModel
-
-        req = None
-        if input is not None:
-            req = ReconcileRequestModel(**vars(input))
-
-        matches = ReconciliationService(db).reconcile(tenant_id=tenant_id, request=req)
+        matches = ReconciliationService(db).reconcile(tenant_id=tenant_id, request=_reconcile_request(input))
 
         return [
             MatchType(
@@ -352,11 +629,21 @@ class Mutation:
                 bank_transaction_id=m.bank_transaction_id,
                 score=m.score,
                 status=GMatchStatus(m.status.value),
+                group_id=m.group_id,
                 created_at=m.created_at,
             )
             for m in matches
     ]
 
+    @strawberry.field
+    def submit_reconcile_job(self, info: Info, tenant_id: int, input: ReconcileRequestInput | None = None) -> ReconcileJobType:
+        db = info.context.db
+        job = ReconcileJobService(db).submit(tenant_id=tenant_id, request=_reconcile_request(input))
+        # The worker reads the job in its own session, so it must be committed first.
+        db.commit()
+        get_job_runner(db.get_bind()).enqueue(job.id)
+        return _job_type(db, job)
+
     @strawberry.field
     def confirm_match(self, info: Info, tenant_id: int, match_id: int) -> MatchType:
         db = info.context.db
@@ -368,9 +655,29 @@ class Mutation:
             bank_transaction_id=m.bank_transaction_id,
             score=m.score,
             status=GMatchStatus(m.status.value),
+            group_id=m.group_id,
             created_at=m.created_at,
         )
 
+    @strawberry.field
+    def confirm_matches(
+        self, info: Info, tenant_id: int, match_ids: list[int] | None = None, min_score: float | None = None
+    ) -> list[MatchConfirmResultType]:
+        db = info.context.db
+        req = BulkConfirmRequest(match_ids=match_ids, min_score=min_score)
+        outcomes = ReconciliationService(db).confirm_matches(tenant_id=tenant_id, match_ids=req.match_ids, min_score=req.min_score)
+        return [MatchConfirmResultType(match_id=match_id, outcome=o) for match_id, o in outcomes.items()]
+
+    @strawberry.field
+    def reject_match(self, info: Info, tenant_id: int, match_id: int) -> MatchType:
+        db = info.context.db
+        return _match_type(ReconciliationService(db).reject_match(tenant_id=tenant_id, match_id=match_id))
+
+    @strawberry.field
+    def clear_rejections(self, info: Info, tenant_id: int, invoice_id: int | None = None) -> int:
+        db = info.context.db
+        return ReconciliationService(db).clear_rejections(tenant_id=tenant_id, invoice_id=invoice_id)
+
 
 schema = strawberry.Schema(query=Query, mutation=Mutation)
 graphql_router = GraphQLRouter(schema, context_getter=get_context)
@@ -1,23 +1,47 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.api.bank_transactions import router as bank_tx_router
+from app.api.changes import router as changes_router
 from app.api.invoices import router as invoice_router
 from app.api.reconcile import router as reconcile_router
 from app.api.tenants import router as tenant_router
+from app.config import settings
 from app.db.init_db import init_db
+from app.db.session import ENGINE
 from app.graphql.schema import graphql_router
+from app.services.change_log import ChangeLogCompactor
+from app.services.idempotency import IdempotencySweeper
+from app.services.jobs import get_job_runner, shutdown_job_runner
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Pick up reconcile jobs interrupted by the previous shutdown.
+    get_job_runner(ENGINE).resume()
+    sweeper = IdempotencySweeper(ENGINE, interval=settings.idempotency_sweep_interval_seconds)
+    compactor = ChangeLogCompactor(ENGINE, interval=settings.change_log_compact_interval_seconds)
+    sweeper.start()
+    compactor.start()
+    yield
+    compactor.stop()
+    sweeper.stop()
+    shutdown_job_runner(ENGINE)
 
 
 def create_app() -> FastAPI:
     init_db()
-    app = FastAPI(title="Multi-Tenant Invoice Reconciliation API")
+    app = FastAPI(title="Multi-Tenant Invoice Reconciliation API", lifespan=lifespan)
 
     app.include_router(tenant_router)
     app.include_router(invoice_router)
     app.include_router(bank_tx_router)
     app.include_router(reconcile_router)
+    app.include_router(changes_router)
 
     app.include_router(graphql_router, prefix="/graphql")
     return app
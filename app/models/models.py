@@ -4,6 +4,7 @@ import enum
 from datetime import datetime, date
 
 from sqlalchemy import (
+    BigInteger,
     Date,
     DateTime,
     Enum,
@@ -11,6 +12,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     Numeric,
     String,
     Text,
@@ -34,6 +36,37 @@ class MatchStatus(str, enum.Enum):
     rejected = "rejected"
 
 
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class ChangeEntity(str, enum.Enum):
+    invoice = "invoice"
+    bank_transaction = "bank_transaction"
+    match = "match"
+    # An invoice's rejected pairs were added (created) or cleared (deleted); entity_id is the
+    # invoice id. Read by incremental reconcile only: it bumps no collection and the feed skips it.
+    rejection = "rejection"
+
+
+class DataCollection(str, enum.Enum):
+    invoices = "invoices"
+    bank_transactions = "bank_transactions"
+    matches = "matches"
+
+
+class ChangeOp(str, enum.Enum):
+    created = "created"
+    deleted = "deleted"
+    status_changed = "status_changed"
+    # match only: proposed matches are created, confirmed or rejected, and deleted when removed
+    confirmed = "confirmed"
+    rejected = "rejected"
+
+
 class Tenant(Base):
     __tablename__ = "tenants"
 
@@ -68,9 +101,13 @@ class Invoice(Base):
 
     invoice_number: Mapped[str | None] = mapped_column(String(64), nullable=True)
     amount: Mapped[float] = mapped_column(Numeric(12, 2), nullable=False)
+    # amount in minor units (to_cents(amount)); NULL only for rows written before the column existed.
+    amount_cents: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     currency: Mapped[str] = mapped_column(String(3), nullable=False, default="USD", server_default="USD")
     invoice_date: Mapped[date | None] = mapped_column(Date, nullable=True)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # token_signature(description); NULL only for rows written before the column existed.
+    description_tokens: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     status: Mapped[InvoiceStatus] = mapped_column(Enum(InvoiceStatus), nullable=False, default=InvoiceStatus.open, server_default=InvoiceStatus.open.value)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -90,8 +127,10 @@ class BankTransaction(Base):
     external_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
     posted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
     amount: Mapped[float] = mapped_column(Numeric(12, 2), nullable=False)
+    amount_cents: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     currency: Mapped[str] = mapped_column(String(3), nullable=False, default="USD", server_default="USD")
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    description_tokens: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     tenant: Mapped[Tenant] = relationship(back_populates="bank_transactions")
@@ -99,6 +138,31 @@ class BankTransaction(Base):
     __table_args__ = (
         UniqueConstraint("tenant_id", "external_id", name="uq_tx_tenant_external_id"),
         Index("ix_tx_tenant_posted", "tenant_id", "posted_at"),
+        Index("ix_tx_tenant_currency_amount_cents", "tenant_id", "currency", "amount_cents"),
+    )
+
+
+class ReconcileJob(Base):
+    __tablename__ = "reconcile_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False, index=True)
+    request_json: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), nullable=False, default=JobStatus.queued, server_default=JobStatus.queued.value)
+    phase: Mapped[str] = mapped_column(String(32), nullable=False, default="queued", server_default="queued")
+    progress: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+    result_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # The runner (process) that claimed the job and until when its claim holds; it renews the
+    # lease while the job runs, and another process only requeues the job once it lapsed.
+    runner_id: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_reconcile_jobs_status", "status"),
     )
 
 
@@ -113,6 +177,11 @@ class Match(Base):
 
     score: Mapped[float] = mapped_column(Float, nullable=False)
     status: Mapped[MatchStatus] = mapped_column(Enum(MatchStatus), nullable=False, default=MatchStatus.proposed, server_default=MatchStatus.proposed.value)
+    # Split payments: rows of one grouped match (one transaction settling several invoices)
+    # share the id of the group's first row; NULL for 1:1 matches.
+    group_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    # Reconcile job whose run proposed this match (NULL for synchronous runs).
+    job_id: Mapped[int | None] = mapped_column(ForeignKey("reconcile_jobs.id", ondelete="SET NULL"), nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     __table_args__ = (
@@ -121,6 +190,17 @@ class Match(Base):
     )
 
 
+class RejectedPair(Base):
+    """An (invoice, transaction) pair a reviewer rejected; reconcile never proposes it again."""
+
+    __tablename__ = "rejected_pairs"
+
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    invoice_id: Mapped[int] = mapped_column(ForeignKey("invoices.id", ondelete="CASCADE"), primary_key=True)
+    bank_transaction_id: Mapped[int] = mapped_column(ForeignKey("bank_transactions.id", ondelete="CASCADE"), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class IdempotencyRecord(Base):
     __tablename__ = "idempotency_records"
 
@@ -128,9 +208,66 @@ class IdempotencyRecord(Base):
     tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False, index=True)
     key: Mapped[str] = mapped_column(String(128), nullable=False)
     request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
-    response_json: Mapped[str] = mapped_column(Text, nullable=False)
+    # Uncompressed response of records written before response_blob; empty otherwise.
+    response_json: Mapped[str] = mapped_column(Text, nullable=False, default="", server_default="")
+    # zlib-compressed stable JSON of the response.
+    response_blob: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     __table_args__ = (
         UniqueConstraint("tenant_id", "key", name="uq_idemp_tenant_key"),
+        Index("ix_idemp_created_at", "created_at"),
     )
+
+
+class ChangeLogEntry(Base):
+    """Append-only per-tenant journal of invoice, transaction and match changes, ordered by seq.
+
+    Entries older than the retention horizon are compacted away (see compact_change_log).
+    """
+
+    __tablename__ = "change_log"
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    entity: Mapped[ChangeEntity] = mapped_column(Enum(ChangeEntity), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[ChangeOp] = mapped_column(Enum(ChangeOp), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_change_log_tenant_seq", "tenant_id", "seq"),
+        Index("ix_change_log_created_at", "created_at"),
+        # seq must never be reused after old entries are pruned
+        {"sqlite_autoincrement": True},
+    )
+
+
+class ChangeLogHorizon(Base):
+    """Highest change-log seq compacted away for a tenant; later entries are all retained."""
+
+    __tablename__ = "change_log_horizons"
+
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    compacted_seq: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class ReconcileWatermark(Base):
+    """Change-log position and parameters of a tenant's last reconcile run."""
+
+    __tablename__ = "reconcile_watermarks"
+
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    last_seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    params_json: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class TenantDataVersion(Base):
+    """Per-tenant, per-collection counter bumped in every transaction that writes the collection."""
+
+    __tablename__ = "tenant_data_versions"
+
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    collection: Mapped[DataCollection] = mapped_column(Enum(DataCollection), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
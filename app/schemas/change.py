@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.models.models import ChangeEntity, ChangeOp
+from app.schemas.common import OrmBase
+
+
+class ChangeOut(OrmBase):
+    seq: int
+    entity: ChangeEntity
+    entity_id: int
+    op: ChangeOp
+    created_at: datetime
+
+
+class ChangeFeed(BaseModel):
+    items: list[ChangeOut]
+    # Pass back as ``since`` to continue after the last item.
+    next_since: int
+    has_more: bool
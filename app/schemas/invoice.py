@@ -17,6 +17,11 @@ class InvoiceCreate(BaseModel):
     description: str | None = None
 
 
+class InvoiceBatchOut(BaseModel):
+    inserted: int
+    created_ids: list[int]
+
+
 class InvoiceOut(OrmBase):
     id: int
     tenant_id: int
@@ -35,3 +40,4 @@ class InvoiceFilters(BaseModel):
     vendor_id: int | None = None
     invoice_date: DateRange | None = None
     amount: AmountRange | None = None
+    description_contains: str | None = None
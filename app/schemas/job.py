@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.models.models import JobStatus
+from app.schemas.common import OrmBase
+from app.schemas.match import MatchOut
+
+
+class ReconcileJobOut(OrmBase):
+    id: int
+    tenant_id: int
+    status: JobStatus
+    phase: str
+    progress: float
+    result_count: int | None
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+class ReconcileJobResults(BaseModel):
+    items: list[MatchOut]
+    next_cursor: int | None
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 from app.models.models import MatchStatus
 from app.schemas.common import OrmBase
@@ -15,12 +16,56 @@ class MatchOut(OrmBase):
     bank_transaction_id: int
     score: float
     status: MatchStatus
+    group_id: int | None = None
     created_at: datetime
 
 
 class ReconcileRequest(BaseModel):
     max_candidates_per_invoice: int = Field(default=3, ge=1, le=10)
     date_window_days: int = Field(default=3, ge=0, le=30)
+    # "index" only scores pairs the per-run candidate index can't rule out; "exhaustive" scores every pair.
+    # "sql" lets the database find same-currency pairs within the amount band or date window, so
+    # transactions are never loaded in full; pairs related only by description are not proposed.
+    candidate_strategy: Literal["index", "exhaustive", "sql"] = "index"
+    # "incremental" rescores only pairs touched by changes since the last run; same proposals as "full".
+    mode: Literal["full", "incremental"] = "full"
+    # "one_to_one" keeps a maximum-weight assignment where each invoice and transaction appears at most once.
+    assignment: Literal["per_invoice", "one_to_one"] = "per_invoice"
+    # Also propose grouped matches where one transaction pays 2..max_split_invoices invoices of one vendor.
+    split_payments: bool = False
+    max_split_invoices: int = Field(default=4, ge=2, le=8)
+    # Scoring processes for this run; defaults to the APP_RECONCILE_WORKERS setting.
+    workers: int | None = Field(default=None, ge=1, le=64)
+
+
+class BulkConfirmRequest(BaseModel):
+    # Either explicit match ids (confirmed in this order) or a score threshold that
+    # auto-confirms every proposed match scoring at least min_score (best first).
+    match_ids: list[int] | None = Field(default=None, min_length=1, max_length=10_000)
+    min_score: float | None = Field(default=None, ge=0, le=1)
+
+    @model_validator(mode="after")
+    def _one_selector(self) -> BulkConfirmRequest:
+        if (self.match_ids is None) == (self.min_score is None):
+            raise ValueError("Provide exactly one of match_ids or min_score")
+        return self
+
+
+ConfirmOutcome = Literal["confirmed", "not_found", "not_proposed", "conflict"]
+
+
+class MatchConfirmResult(BaseModel):
+    match_id: int
+    outcome: ConfirmOutcome
+
+
+class BulkConfirmOut(BaseModel):
+    confirmed: int
+    results: list[MatchConfirmResult]
+
+
+class RejectionsCleared(BaseModel):
+    cleared: int
 
 
 class AIExplainOut(BaseModel):
@@ -1,26 +1,75 @@
 from __future__ import annotations
 
-import json
-from typing import Any
+import hashlib
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from itertools import islice
+from typing import Any, Literal, TypeVar
 
-from sqlalchemy import and_, select
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import Row, Select, select
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from app.models.models import BankTransaction, IdempotencyRecord
-from app.schemas.bank_transaction import BankTransactionIn, BankTransactionFilters
+from app.models.models import BankTransaction, ChangeEntity, ChangeOp
+from app.schemas.bank_transaction import BankTransactionIn, BankTransactionFilters, BankTransactionOut
+from app.services.change_log import ChangeLogService
+from app.services.idempotency import IdempotencyConflict, IdempotencyStore, replay_stored
+from app.services.pagination import keyset_page
+from app.services.search import description_contains, ranked_search
 from app.utils.hashing import sha256_hex, stable_json_dumps
+from app.utils.reconcile import to_cents, token_signature
+from app.utils.statement_formats import iter_camt053_records, iter_mt940_records, iter_ofx_records
+from app.utils.statement_stream import StatementFormatError, iter_csv_records, iter_ndjson_records
 
+IMPORT_CHUNK_SIZE = 1000
 
-class IdempotencyConflict(Exception):
-    pass
+StatementFormat = Literal["csv", "ndjson", "camt053", "mt940", "ofx"]
+
+# format -> (record reader, what a record position counts)
+STATEMENT_READERS: dict[str, tuple[Callable[[Iterable[bytes]], Iterator[tuple[int, dict[str, Any]]]], str]] = {
+    "csv": (iter_csv_records, "line"),
+    "ndjson": (iter_ndjson_records, "line"),
+    "camt053": (iter_camt053_records, "entry"),
+    "mt940": (iter_mt940_records, "line"),
+    "ofx": (iter_ofx_records, "transaction"),
+}
+
+_STATEMENT_ROWS = TypeAdapter(list[BankTransactionIn])
+
+T = TypeVar("T")
 
 
 class BankTransactionService:
     def __init__(self, db: Session) -> None:
         self.db = db
+        self.idempotency = IdempotencyStore(db)
 
-    def list_transactions(self, *, tenant_id: int, filters: BankTransactionFilters | None = None) -> list[BankTransaction]:
+    def list_transactions(
+        self,
+        *,
+        tenant_id: int,
+        filters: BankTransactionFilters | None = None,
+        limit: int | None = None,
+        cursor: int | None = None,
+    ) -> tuple[list[BankTransaction], int | None]:
+        """Matching transactions in id order, one keyset page at a time (see keyset_page)."""
+        stmt = self._filtered(tenant_id, filters)
+        return keyset_page(self.db, stmt, BankTransaction.id, limit=limit, cursor=cursor)
+
+    def list_transaction_rows(
+        self,
+        *,
+        tenant_id: int,
+        filters: BankTransactionFilters | None = None,
+        limit: int | None = None,
+        cursor: int | None = None,
+    ) -> tuple[list[Row], int | None]:
+        """list_transactions as tuples of the BankTransactionOut fields, in field order, without loading ORM objects."""
+        columns = (getattr(BankTransaction, f) for f in BankTransactionOut.model_fields)
+        stmt = self._filtered(tenant_id, filters).with_only_columns(*columns)
+        return keyset_page(self.db, stmt, BankTransaction.id, limit=limit, cursor=cursor, scalars=False)
+
+    def _filtered(self, tenant_id: int, filters: BankTransactionFilters | None) -> Select:
         stmt = select(BankTransaction).where(BankTransaction.tenant_id == tenant_id)
         if filters:
             if filters.posted_at:
@@ -30,14 +79,17 @@ class BankTransactionService:
                     stmt = stmt.where(BankTransaction.posted_at <= filters.posted_at.end)
             if filters.amount:
                 if filters.amount.min is not None:
-                    stmt = stmt.where(BankTransaction.amount >= filters.amount.min)
+                    stmt = stmt.where(BankTransaction.amount_cents >= to_cents(filters.amount.min))
                 if filters.amount.max is not None:
-                    stmt = stmt.where(BankTransaction.amount <= filters.amount.max)
+                    stmt = stmt.where(BankTransaction.amount_cents <= to_cents(filters.amount.max))
             if filters.description_contains:
-                like = f"%{filters.description_contains.lower()}%"
-                stmt = stmt.where(BankTransaction.description.ilike(like))
-        stmt = stmt.order_by(BankTransaction.id)
-        return list(self.db.scalars(stmt))
+                stmt = stmt.where(description_contains(self.db, BankTransaction, filters.description_contains))
+        return stmt
+
+    def search_transactions(self, *, tenant_id: int, q: str, limit: int = 50) -> list[BankTransaction]:
+        """Transactions whose description matches ``q``, most relevant first (see ranked_search)."""
+        stmt = select(BankTransaction).where(BankTransaction.tenant_id == tenant_id)
+        return ranked_search(self.db, stmt, BankTransaction, q, limit=limit)
 
     def import_transactions(
         self,
@@ -53,48 +105,109 @@ class BankTransactionService:
         payload_str = stable_json_dumps(payload_obj)
         req_hash = sha256_hex(payload_str)
 
-        existing = self.db.scalar(
-            select(IdempotencyRecord).where(and_(IdempotencyRecord.tenant_id == tenant_id, IdempotencyRecord.key == idempotency_key))
-        )
-        if existing:
-            if existing.request_hash != req_hash:
-                raise IdempotencyConflict("Idempotency key reused with different payload")
-            return json.loads(existing.response_json)
+        replayed = self.idempotency.replay(tenant_id=tenant_id, key=idempotency_key, request_hash=req_hash)
+        if replayed is not None:
+            return replayed
 
         # Insert transactions; ignore duplicates by (tenant_id, external_id) if external_id is present.
         created_ids: list[int] = []
-        inserted = 0
-        skipped = 0
+        for start in range(0, len(transactions), IMPORT_CHUNK_SIZE):
+            created_ids.extend(self._insert_chunk(tenant_id, transactions[start : start + IMPORT_CHUNK_SIZE]))
+        response = {"inserted": len(created_ids), "skipped": len(transactions) - len(created_ids), "created_ids": created_ids}
+        return self._store_response(tenant_id=tenant_id, idempotency_key=idempotency_key, req_hash=req_hash, response=response)
 
-        for t in transactions:
-            values = {
+    def import_stream(
+        self,
+        *,
+        tenant_id: int,
+        chunks: Iterable[bytes],
+        fmt: StatementFormat,
+        idempotency_key: str,
+    ) -> dict[str, Any]:
+        """import_transactions() for a statement file (see StatementFormat) read chunk by chunk.
+
+        Rows are validated and inserted IMPORT_CHUNK_SIZE at a time, and the idempotency hash is the
+        sha256 of the raw body (prefixed with the format), computed as the bytes pass through; only
+        the created ids are kept for the whole statement. A reused key still reads the body, to hash it,
+        but inserts nothing. Invalid rows raise StatementFormatError (nothing is kept, the caller rolls back).
+        """
+        if not idempotency_key:
+            raise ValueError("idempotency_key is required")
+
+        hasher = hashlib.sha256(f"{fmt}\n".encode())
+
+        def hashed() -> Iterator[bytes]:
+            for chunk in chunks:
+                hasher.update(chunk)
+                yield chunk
+
+        # The record is checked before the body is read, so replay it as fetched: it may expire
+        # (or be swept) while the body streams in.
+        existing = self.idempotency.get(tenant_id=tenant_id, key=idempotency_key)
+        if existing is not None:
+            for _ in hashed():
+                pass
+            return replay_stored(existing, hasher.hexdigest())
+
+        reader, unit = STATEMENT_READERS[fmt]
+        created_ids: list[int] = []
+        total = 0
+        for batch in _batched(reader(hashed()), IMPORT_CHUNK_SIZE):
+            try:
+                transactions = _STATEMENT_ROWS.validate_python([record for _, record in batch])
+            except ValidationError as e:
+                err = e.errors()[0]
+                position = batch[err["loc"][0]][0]
+                field = "".join(f" {part}" for part in err["loc"][1:])
+                raise StatementFormatError(f"{unit} {position}{field}: {err['msg']}") from None
+            created_ids.extend(self._insert_chunk(tenant_id, transactions))
+            total += len(transactions)
+        response = {"inserted": len(created_ids), "skipped": total - len(created_ids), "created_ids": created_ids}
+        return self._store_response(tenant_id=tenant_id, idempotency_key=idempotency_key, req_hash=hasher.hexdigest(), response=response)
+
+    def _store_response(self, *, tenant_id: int, idempotency_key: str, req_hash: str, response: dict[str, Any]) -> dict[str, Any]:
+        self.idempotency.put(tenant_id=tenant_id, key=idempotency_key, request_hash=req_hash, response=response)
+        return response
+
+    def _insert_chunk(self, tenant_id: int, transactions: Sequence[BankTransactionIn]) -> list[int]:
+        """Insert one chunk and journal the new rows; returns their ids in input order.
+
+        Duplicates by (tenant_id, external_id) are skipped; rows without an external_id never
+        conflict (NULLs are distinct in the unique index).
+        """
+        rows = [
+            {
                 "tenant_id": tenant_id,
                 "external_id": t.external_id,
                 "posted_at": t.posted_at,
                 "amount": t.amount,
+                "amount_cents": to_cents(t.amount),
                 "currency": t.currency,
                 "description": t.description,
+                "description_tokens": token_signature(t.description),
             }
+            for t in transactions
+        ]
+        table = BankTransaction.__table__
+        conn = self.db.connection()
+        stmt = sqlite_insert(table).on_conflict_do_nothing(index_elements=["tenant_id", "external_id"])
+        if conn.dialect.insert_returning:
+            # One multi-row INSERT ... RETURNING; ids are assigned in input order, RETURNING order is unspecified.
+            created_ids = sorted(conn.execute(stmt.returning(table.c.id), rows).scalars())
+        else:
+            created_ids = []
+            for values in rows:
+                res = conn.execute(stmt, values)
+                # rowcount == 1 means inserted, 0 means conflict/no-op
+                if res.rowcount == 1 and res.lastrowid is not None:
+                    created_ids.append(int(res.lastrowid))
+        ChangeLogService(self.db).record(
+            tenant_id=tenant_id, entity=ChangeEntity.bank_transaction, op=ChangeOp.created, entity_ids=created_ids
+        )
+        return created_ids
 
-            if t.external_id:
-                stmt = sqlite_insert(BankTransaction).values(**values).on_conflict_do_nothing(index_elements=["tenant_id", "external_id"])
-            else:
-                # No natural key; always insert.
-                stmt = sqlite_insert(BankTransaction).values(**values)
-
-            res = self.db.execute(stmt)
-            # sqlite: rowcount == 1 means inserted, 0 means conflict/no-op
-            if res.rowcount == 1:
-                inserted += 1
-                # Fetch id via lastrowid (dialect specific)
-                last_id = res.lastrowid
-                if last_id is not None:
-                    created_ids.append(int(last_id))
-            else:
-                skipped += 1
-
-        response = {"inserted": inserted, "skipped": skipped, "created_ids": created_ids}
-        record = IdempotencyRecord(tenant_id=tenant_id, key=idempotency_key, request_hash=req_hash, response_json=stable_json_dumps(response))
-        self.db.add(record)
-        self.db.flush()
-        return response
+
+def _batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Collection, Iterable
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Engine, and_, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.models.models import ChangeEntity, ChangeLogEntry, ChangeLogHorizon, ChangeOp, DataCollection
+from app.services.data_versions import DataVersionService
+from app.services.pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
+COLLECTIONS = {
+    ChangeEntity.invoice: DataCollection.invoices,
+    ChangeEntity.bank_transaction: DataCollection.bank_transactions,
+    ChangeEntity.match: DataCollection.matches,
+}
+# Journaled for incremental reconcile, but not part of the public change feed.
+INTERNAL_ENTITIES = (ChangeEntity.rejection,)
+COMPACT_BATCH_SIZE = 1000
+
+
+class ChangeLogCompacted(Exception):
+    """The requested position is older than the tenant's retention horizon."""
+
+
+class ChangeLogService:
+    """Writes and reads the per-tenant change journal.
+
+    Entries are written by the mutating services in the caller's transaction, so a
+    change and its journal entry commit or roll back together. Recording a change also
+    bumps the entity's collection version (see DataVersionService), if it has one.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def record(self, *, tenant_id: int, entity: ChangeEntity, op: ChangeOp, entity_ids: Iterable[int]) -> None:
+        rows = [{"tenant_id": tenant_id, "entity": entity, "entity_id": eid, "op": op} for eid in entity_ids]
+        if rows:
+            self.db.execute(insert(ChangeLogEntry), rows)
+            if entity in COLLECTIONS:
+                DataVersionService(self.db).bump(tenant_id=tenant_id, collections=[COLLECTIONS[entity]])
+
+    def last_seq(self, *, tenant_id: int) -> int:
+        return self.db.scalar(select(func.max(ChangeLogEntry.seq)).where(ChangeLogEntry.tenant_id == tenant_id)) or 0
+
+    def horizon(self, *, tenant_id: int) -> int:
+        """The last seq compacted away (0 if none); entries after it are all still present."""
+        return self.db.scalar(select(ChangeLogHorizon.compacted_seq).where(ChangeLogHorizon.tenant_id == tenant_id)) or 0
+
+    def changes_between(
+        self, *, tenant_id: int, after_seq: int, upto_seq: int, entities: Collection[ChangeEntity] | None = None
+    ) -> list[ChangeLogEntry]:
+        stmt = (
+            select(ChangeLogEntry)
+            .where(and_(ChangeLogEntry.tenant_id == tenant_id, ChangeLogEntry.seq > after_seq, ChangeLogEntry.seq <= upto_seq))
+            .order_by(ChangeLogEntry.seq)
+        )
+        if entities is not None:
+            stmt = stmt.where(ChangeLogEntry.entity.in_(entities))
+        return list(self.db.scalars(stmt))
+
+    def feed(self, *, tenant_id: int, since: int, limit: int) -> tuple[list[ChangeLogEntry], bool]:
+        """Up to ``limit`` entries after seq ``since``, in seq order, and whether more follow.
+
+        Raises ChangeLogCompacted when entries after ``since`` have already been compacted away,
+        in which case the client has to resync from the listings.
+        """
+        horizon = self.horizon(tenant_id=tenant_id)
+        if since < horizon:
+            raise ChangeLogCompacted(f"Changes up to seq {horizon} are no longer retained")
+        stmt = select(ChangeLogEntry).where(
+            and_(ChangeLogEntry.tenant_id == tenant_id, ChangeLogEntry.entity.not_in(INTERNAL_ENTITIES))
+        )
+        entries, next_cursor = keyset_page(self.db, stmt, ChangeLogEntry.seq, limit=limit, cursor=since)
+        return entries, next_cursor is not None
+
+
+def _utcnow() -> datetime:
+    # Naive UTC, as SQLite's CURRENT_TIMESTAMP stores it.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def compact_change_log(db: Session, *, now: datetime | None = None, batch_size: int = COMPACT_BATCH_SIZE) -> int:
+    """Delete entries older than the retention period, committing every ``batch_size`` rows;
+    returns how many. Each tenant's horizon moves up to the last seq removed."""
+    cutoff = (now or _utcnow()) - timedelta(seconds=settings.change_log_retention_seconds)
+    expired = db.execute(
+        select(ChangeLogEntry.tenant_id, func.max(ChangeLogEntry.seq))
+        .where(ChangeLogEntry.created_at < cutoff)
+        .group_by(ChangeLogEntry.tenant_id)
+    ).all()
+    removed = 0
+    for tenant_id, upto_seq in expired:
+        while True:
+            seqs = list(
+                db.scalars(
+                    select(ChangeLogEntry.seq)
+                    .where(and_(ChangeLogEntry.tenant_id == tenant_id, ChangeLogEntry.seq <= upto_seq))
+                    .order_by(ChangeLogEntry.seq)
+                    .limit(batch_size)
+                )
+            )
+            if not seqs:
+                break
+            db.execute(delete(ChangeLogEntry).where(ChangeLogEntry.seq.in_(seqs)))
+            stmt = sqlite_insert(ChangeLogHorizon).values(tenant_id=tenant_id, compacted_seq=seqs[-1])
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[ChangeLogHorizon.tenant_id],
+                    set_={"compacted_seq": func.max(ChangeLogHorizon.compacted_seq, stmt.excluded.compacted_seq)},
+                )
+            )
+            db.commit()
+            removed += len(seqs)
+    return removed
+
+
+class ChangeLogCompactor:
+    """Background thread that runs compact_change_log every ``interval`` seconds."""
+
+    def __init__(self, bind: Engine, *, interval: float) -> None:
+        self.session_factory = sessionmaker(bind=bind, class_=Session, expire_on_commit=False, autoflush=False)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="change-log-compactor", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            # A failed pass (e.g. the database is locked) must not end the thread; the next one retries.
+            try:
+                with self.session_factory() as db:
+                    compact_change_log(db)
+            except Exception:
+                logger.exception("Compacting the change log failed")
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import Engine, and_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.models import DataCollection, TenantDataVersion
+
+
+class DataVersionService:
+    """Per-tenant collection versions, bumped in the writer's transaction.
+
+    A version therefore changes exactly when a committed write to the collection becomes
+    visible, and readers can tell "unchanged" from one primary-key lookup.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def bump(self, *, tenant_id: int, collections: Iterable[DataCollection]) -> None:
+        rows = [{"tenant_id": tenant_id, "collection": c, "version": 1} for c in dict.fromkeys(collections)]
+        if not rows:
+            return
+        stmt = sqlite_insert(TenantDataVersion).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TenantDataVersion.tenant_id, TenantDataVersion.collection],
+            set_={"version": TenantDataVersion.version + 1},
+        )
+        self.db.execute(stmt)
+
+    def current(self, *, tenant_id: int, collection: DataCollection) -> int:
+        stmt = select(TenantDataVersion.version).where(
+            and_(TenantDataVersion.tenant_id == tenant_id, TenantDataVersion.collection == collection)
+        )
+        return self.db.scalar(stmt) or 0
+
+
+@dataclass(frozen=True)
+class CachedListing:
+    version: int
+    body: bytes
+    next_cursor: int | None
+
+
+class ListingCache:
+    """Bounded LRU of serialized list responses, keyed by (tenant id, collection, filter key).
+
+    An entry is only served while its version is the collection's current one.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, DataCollection, Hashable], CachedListing] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: int, collection: DataCollection, key: Hashable, version: int) -> CachedListing | None:
+        with self._lock:
+            entry = self._entries.get((tenant_id, collection, key))
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end((tenant_id, collection, key))
+            return entry
+
+    def put(self, tenant_id: int, collection: DataCollection, key: Hashable, entry: CachedListing) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(tenant_id, collection, key)] = entry
+            self._entries.move_to_end((tenant_id, collection, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_caches: dict[Engine, ListingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_listing_cache(bind: Engine) -> ListingCache:
+    """The process-wide listing cache for a database (one per engine)."""
+    with _caches_lock:
+        cache = _caches.get(bind)
+        if cache is None:
+            cache = _caches[bind] = ListingCache(settings.listing_cache_size)
+        return cache
@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 from app.models.models import BankTransaction, Invoice
 from app.schemas.match import AIExplainOut
 from app.services.ai import AIClient, build_ai_client
-from app.utils.reconcile import compute_score
+from app.utils.reconcile import compute_score, format_cents
 
 
 class ExplanationService:
@@ -22,7 +22,7 @@ class ExplanationService:
             confidence = "medium"
 
         parts: list[str] = []
-        if abs(float(invoice.amount) - float(txn.amount)) < 0.005:
+        if invoice.amount_cents == txn.amount_cents:
             parts.append("The amounts match exactly")
         else:
             parts.append("The amounts are close")
@@ -41,20 +41,22 @@ class ExplanationService:
             raise LookupError("Invoice or transaction not found")
 
         sb = compute_score(
-            invoice_amount=float(invoice.amount),
+            invoice_amount_cents=invoice.amount_cents,
             invoice_date=invoice.invoice_date,
             invoice_desc=invoice.description,
-            txn_amount=float(txn.amount),
+            txn_amount_cents=txn.amount_cents,
             txn_posted_at=txn.posted_at,
             txn_desc=txn.description,
+            invoice_tokens=invoice.description_tokens,
+            txn_tokens=txn.description_tokens,
         )
         score = sb.total
 
         prompt = (
             "Explain why this invoice and bank transaction are likely a match. "
             "Use only the provided facts.\n\n"
-            f"Invoice: amount={float(invoice.amount):.2f} {invoice.currency}, date={invoice.invoice_date}, description={invoice.description}\n"
-            f"Transaction: amount={float(txn.amount):.2f} {txn.currency}, posted_at={txn.posted_at.date()}, description={txn.description}\n"
+            f"Invoice: amount={format_cents(invoice.amount_cents)} {invoice.currency}, date={invoice.invoice_date}, description={invoice.description}\n"
+            f"Transaction: amount={format_cents(txn.amount_cents)} {txn.currency}, posted_at={txn.posted_at.date()}, description={txn.description}\n"
             f"Heuristic score={score:.2f} (amount={sb.amount_score:.2f}, date={sb.date_score:.2f}, text={sb.text_score:.2f})\n"
             "Return 2-6 sentences and include a confidence label."
         )
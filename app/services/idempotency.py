@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import Engine, and_, delete, event, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.models.models import IdempotencyRecord
+from app.utils.hashing import stable_json_dumps
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 1000
+
+
+def _utcnow() -> datetime:
+    # Naive UTC, as SQLite hands DateTime columns back.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    response: dict[str, Any]
+    created_at: datetime
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+class ResponseCache:
+    """Bounded LRU of committed idempotency records, keyed by (tenant id, key)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, str], StoredResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: int, key: str) -> StoredResponse | None:
+        with self._lock:
+            entry = self._entries.get((tenant_id, key))
+            if entry is not None:
+                self._entries.move_to_end((tenant_id, key))
+            return entry
+
+    def put(self, tenant_id: int, key: str, entry: StoredResponse) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(tenant_id, key)] = entry
+            self._entries.move_to_end((tenant_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, tenant_id: int, key: str) -> None:
+        with self._lock:
+            self._entries.pop((tenant_id, key), None)
+
+
+_caches: dict[Engine, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(bind: Engine) -> ResponseCache:
+    """The process-wide response cache for a database (one per engine)."""
+    with _caches_lock:
+        cache = _caches.get(bind)
+        if cache is None:
+            cache = _caches[bind] = ResponseCache(settings.idempotency_cache_size)
+        return cache
+
+
+class IdempotencyStore:
+    """Idempotency records: an in-process LRU in front of the table, zlib-compressed responses,
+    and a TTL after which a key is forgotten (and later swept) as if it had never been used.
+
+    A record only enters the LRU once its transaction commits, so a rolled-back import is
+    never replayed.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.cache = get_response_cache(db.get_bind())
+
+    def get(self, *, tenant_id: int, key: str) -> StoredResponse | None:
+        cutoff = _utcnow() - timedelta(seconds=settings.idempotency_ttl_seconds)
+        entry = self.cache.get(tenant_id, key)
+        if entry is None:
+            record = self.db.scalar(
+                select(IdempotencyRecord).where(and_(IdempotencyRecord.tenant_id == tenant_id, IdempotencyRecord.key == key))
+            )
+            if record is None:
+                return None
+            entry = StoredResponse(record.request_hash, _decode(record), record.created_at)
+            if entry.created_at >= cutoff:
+                self.cache.put(tenant_id, key, entry)
+        if entry.created_at < cutoff:
+            self.cache.discard(tenant_id, key)
+            return None
+        return entry
+
+    def replay(self, *, tenant_id: int, key: str, request_hash: str) -> dict[str, Any] | None:
+        """The stored response for a reused key, None for a new one; IdempotencyConflict if the payload differs."""
+        existing = self.get(tenant_id=tenant_id, key=key)
+        if existing is None:
+            return None
+        return replay_stored(existing, request_hash)
+
+    def put(self, *, tenant_id: int, key: str, request_hash: str, response: dict[str, Any]) -> None:
+        # An expired record the sweeper has not reached yet still holds the unique key.
+        self.db.execute(
+            delete(IdempotencyRecord).where(
+                and_(
+                    IdempotencyRecord.tenant_id == tenant_id,
+                    IdempotencyRecord.key == key,
+                    IdempotencyRecord.created_at < _utcnow() - timedelta(seconds=settings.idempotency_ttl_seconds),
+                )
+            )
+        )
+        created_at = _utcnow()
+        self.db.add(
+            IdempotencyRecord(
+                tenant_id=tenant_id,
+                key=key,
+                request_hash=request_hash,
+                response_blob=zlib.compress(stable_json_dumps(response).encode()),
+                created_at=created_at,
+            )
+        )
+        self.db.flush()
+        pending = self.db.info.setdefault("idempotency_pending", [])
+        pending.append((self.cache, tenant_id, key, StoredResponse(request_hash, response, created_at)))
+
+
+def replay_stored(existing: StoredResponse, request_hash: str) -> dict[str, Any]:
+    """The response of a record already fetched with get(); IdempotencyConflict if the payload differs."""
+    if existing.request_hash != request_hash:
+        raise IdempotencyConflict("Idempotency key reused with different payload")
+    return existing.response
+
+
+def _decode(record: IdempotencyRecord) -> dict[str, Any]:
+    if record.response_blob is not None:
+        return json.loads(zlib.decompress(record.response_blob))
+    # Written before responses were compressed.
+    return json.loads(record.response_json)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    for cache, tenant_id, key, entry in session.info.pop("idempotency_pending", []):
+        cache.put(tenant_id, key, entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop("idempotency_pending", None)
+
+
+def sweep_expired(db: Session, *, now: datetime | None = None, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    """Delete records older than the TTL, committing every ``batch_size`` rows; returns how many."""
+    cutoff = (now or _utcnow()) - timedelta(seconds=settings.idempotency_ttl_seconds)
+    removed = 0
+    while True:
+        ids = list(db.scalars(select(IdempotencyRecord.id).where(IdempotencyRecord.created_at < cutoff).limit(batch_size)))
+        if not ids:
+            return removed
+        db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.id.in_(ids)))
+        db.commit()
+        removed += len(ids)
+
+
+class IdempotencySweeper:
+    """Background thread that runs sweep_expired every ``interval`` seconds."""
+
+    def __init__(self, bind: Engine, *, interval: float) -> None:
+        self.session_factory = sessionmaker(bind=bind, class_=Session, expire_on_commit=False, autoflush=False)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="idempotency-sweeper", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            # A failed sweep (e.g. the database is locked) must not end the thread; the next one retries.
+            try:
+                with self.session_factory() as db:
+                    sweep_expired(db)
+            except Exception:
+                logger.exception("Sweeping expired idempotency records failed")
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
-from sqlalchemy import and_, delete, select
+from typing import Any
+
+from sqlalchemy import Row, Select, and_, delete, insert, select
 from sqlalchemy.orm import Session
 
-from app.models.models import Invoice
-from app.schemas.invoice import InvoiceCreate, InvoiceFilters
+from app.models.models import ChangeEntity, ChangeOp, DataCollection, Invoice
+from app.schemas.invoice import InvoiceCreate, InvoiceFilters, InvoiceOut
+from app.services.change_log import ChangeLogService
+from app.services.data_versions import DataVersionService
+from app.services.idempotency import IdempotencyStore
+from app.services.pagination import keyset_page
+from app.services.search import description_contains, ranked_search
+from app.utils.hashing import sha256_hex, stable_json_dumps
+from app.utils.reconcile import to_cents, token_signature
+
+BATCH_CHUNK_SIZE = 1000
+# Batch keys are stored under this prefix, so they never collide with bank import keys.
+IDEMPOTENCY_SCOPE = "invoices/batch:"
 
 
 class InvoiceService:
@@ -17,15 +30,78 @@ class InvoiceService:
             vendor_id=data.vendor_id,
             invoice_number=data.invoice_number,
             amount=data.amount,
+            amount_cents=to_cents(data.amount),
             currency=data.currency,
             invoice_date=data.invoice_date,
             description=data.description,
+            description_tokens=token_signature(data.description),
         )
         self.db.add(invoice)
         self.db.flush()
+        ChangeLogService(self.db).record(tenant_id=tenant_id, entity=ChangeEntity.invoice, op=ChangeOp.created, entity_ids=[invoice.id])
         return invoice
 
-    def list_invoices(self, *, tenant_id: int, filters: InvoiceFilters | None = None) -> list[Invoice]:
+    def create_invoices(
+        self, *, tenant_id: int, invoices: list[InvoiceCreate], idempotency_key: str | None = None
+    ) -> dict[str, Any]:
+        """Create many invoices with chunked multi-row inserts; returns {"inserted", "created_ids"}, ids in input order.
+
+        With an ``idempotency_key`` the call follows the bank import rules: the same key and
+        payload replay the stored response, the same key with another payload raises IdempotencyConflict.
+        Keys are scoped to this call, apart from those of bank imports.
+        """
+        store = IdempotencyStore(self.db)
+        req_hash = None
+        if idempotency_key:
+            idempotency_key = IDEMPOTENCY_SCOPE + idempotency_key
+            req_hash = sha256_hex(stable_json_dumps({"invoices": [i.model_dump(mode="json") for i in invoices]}))
+            replayed = store.replay(tenant_id=tenant_id, key=idempotency_key, request_hash=req_hash)
+            if replayed is not None:
+                return replayed
+
+        table = Invoice.__table__
+        conn = self.db.connection()
+        created_ids: list[int] = []
+        for start in range(0, len(invoices), BATCH_CHUNK_SIZE):
+            rows = [
+                {
+                    "tenant_id": tenant_id,
+                    "vendor_id": data.vendor_id,
+                    "invoice_number": data.invoice_number,
+                    "amount": data.amount,
+                    "amount_cents": to_cents(data.amount),
+                    "currency": data.currency,
+                    "invoice_date": data.invoice_date,
+                    "description": data.description,
+                    "description_tokens": token_signature(data.description),
+                }
+                for data in invoices[start : start + BATCH_CHUNK_SIZE]
+            ]
+            # RETURNING order is unspecified, but ids are assigned in input order.
+            ids = sorted(conn.execute(insert(table).returning(table.c.id), rows).scalars())
+            ChangeLogService(self.db).record(tenant_id=tenant_id, entity=ChangeEntity.invoice, op=ChangeOp.created, entity_ids=ids)
+            created_ids.extend(ids)
+
+        response = {"inserted": len(created_ids), "created_ids": created_ids}
+        if idempotency_key:
+            store.put(tenant_id=tenant_id, key=idempotency_key, request_hash=req_hash, response=response)
+        return response
+
+    def list_invoices(
+        self, *, tenant_id: int, filters: InvoiceFilters | None = None, limit: int | None = None, cursor: int | None = None
+    ) -> tuple[list[Invoice], int | None]:
+        """Matching invoices in id order, one keyset page at a time (see keyset_page)."""
+        stmt = self._filtered(tenant_id, filters)
+        return keyset_page(self.db, stmt, Invoice.id, limit=limit, cursor=cursor)
+
+    def list_invoice_rows(
+        self, *, tenant_id: int, filters: InvoiceFilters | None = None, limit: int | None = None, cursor: int | None = None
+    ) -> tuple[list[Row], int | None]:
+        """list_invoices as tuples of the InvoiceOut fields, in field order, without loading ORM objects."""
+        stmt = self._filtered(tenant_id, filters).with_only_columns(*(getattr(Invoice, f) for f in InvoiceOut.model_fields))
+        return keyset_page(self.db, stmt, Invoice.id, limit=limit, cursor=cursor, scalars=False)
+
+    def _filtered(self, tenant_id: int, filters: InvoiceFilters | None) -> Select:
         stmt = select(Invoice).where(Invoice.tenant_id == tenant_id)
         if filters:
             if filters.status:
@@ -39,11 +115,17 @@ class InvoiceService:
                     stmt = stmt.where(Invoice.invoice_date <= filters.invoice_date.end)
             if filters.amount:
                 if filters.amount.min is not None:
-                    stmt = stmt.where(Invoice.amount >= filters.amount.min)
+                    stmt = stmt.where(Invoice.amount_cents >= to_cents(filters.amount.min))
                 if filters.amount.max is not None:
-                    stmt = stmt.where(Invoice.amount <= filters.amount.max)
-        stmt = stmt.order_by(Invoice.id)
-        return list(self.db.scalars(stmt))
+                    stmt = stmt.where(Invoice.amount_cents <= to_cents(filters.amount.max))
+            if filters.description_contains:
+                stmt = stmt.where(description_contains(self.db, Invoice, filters.description_contains))
+        return stmt
+
+    def search_invoices(self, *, tenant_id: int, q: str, limit: int = 50) -> list[Invoice]:
+        """Invoices whose description matches ``q``, most relevant first (see ranked_search)."""
+        stmt = select(Invoice).where(Invoice.tenant_id == tenant_id)
+        return ranked_search(self.db, stmt, Invoice, q, limit=limit)
 
     def get_invoice(self, *, tenant_id: int, invoice_id: int) -> Invoice | None:
         stmt = select(Invoice).where(and_(Invoice.tenant_id == tenant_id, Invoice.id == invoice_id))
@@ -52,4 +134,9 @@ class InvoiceService:
     def delete_invoice(self, *, tenant_id: int, invoice_id: int) -> bool:
         stmt = delete(Invoice).where(and_(Invoice.tenant_id == tenant_id, Invoice.id == invoice_id))
         res = self.db.execute(stmt)
-        return res.rowcount > 0
+        if res.rowcount == 0:
+            return False
+        ChangeLogService(self.db).record(tenant_id=tenant_id, entity=ChangeEntity.invoice, op=ChangeOp.deleted, entity_ids=[invoice_id])
+        # Its matches go with it.
+        DataVersionService(self.db).bump(tenant_id=tenant_id, collections=[DataCollection.matches])
+        return True
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Engine, and_, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.models.models import JobStatus, Match, ReconcileJob
+from app.schemas.job import ReconcileJobOut
+from app.schemas.match import ReconcileRequest
+from app.services.pagination import keyset_page
+from app.services.reconciliation import ReconciliationService
+from app.utils.hashing import stable_json_dumps
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    # Naive UTC, as SQLite hands DateTime columns back.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ReconcileJobService:
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def submit(self, *, tenant_id: int, request: ReconcileRequest | None = None) -> ReconcileJob:
+        req = request or ReconcileRequest()
+        job = ReconcileJob(tenant_id=tenant_id, request_json=stable_json_dumps(req.model_dump()))
+        self.db.add(job)
+        self.db.flush()
+        return job
+
+    def get(self, *, tenant_id: int, job_id: int) -> ReconcileJob | None:
+        job = self.db.get(ReconcileJob, job_id)
+        if job is None or job.tenant_id != tenant_id:
+            return None
+        return job
+
+    def results(self, *, tenant_id: int, job_id: int, limit: int, cursor: int | None = None) -> tuple[list[Match], int | None]:
+        """One page of the matches proposed by a job, in id order, and the cursor of the next page.
+
+        Matches a later run replaced are gone, so a job's results only shrink over time.
+        """
+        stmt = select(Match).where(and_(Match.tenant_id == tenant_id, Match.job_id == job_id))
+        return keyset_page(self.db, stmt, Match.id, limit=limit, cursor=cursor)
+
+
+class JobRunner:
+    """Runs reconcile jobs on a local thread pool.
+
+    The jobs table is the queue: a job is claimed by flipping it from queued to running,
+    and its matches and final status commit in one transaction. Progress is reported
+    in memory only, because the running job holds the database's write lock.
+
+    Several processes can share the table. A claim records the runner's id and a lease,
+    which a heartbeat thread renews while the job runs; only jobs whose lease lapsed (their
+    process died) are taken over, and a run that lost its lease rolls back instead of committing.
+    """
+
+    def __init__(self, session_factory: sessionmaker[Session], *, workers: int) -> None:
+        self.session_factory = session_factory
+        self.runner_id = uuid.uuid4().hex
+        self.lease = timedelta(seconds=settings.reconcile_job_lease_seconds)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reconcile-job")
+        self._progress: dict[int, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        # Two runs for the same tenant would replace each other's proposals.
+        self._tenant_locks: defaultdict[int, threading.Lock] = defaultdict(threading.Lock)
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_leases, name="reconcile-job-lease", daemon=True)
+        self._heartbeat.start()
+
+    def enqueue(self, job_id: int) -> None:
+        self._pool.submit(self._run, job_id)
+
+    def resume(self) -> int:
+        """Enqueue queued jobs, after requeueing running ones whose lease lapsed; returns how many.
+
+        Jobs another live process is running keep their lease and are left alone, and a queued
+        job enqueued by several processes is only claimed by one of them (see _run).
+        """
+        with self.session_factory() as db:
+            db.execute(
+                update(ReconcileJob)
+                .where(
+                    and_(
+                        ReconcileJob.status == JobStatus.running,
+                        or_(ReconcileJob.lease_expires_at.is_(None), ReconcileJob.lease_expires_at < _utcnow()),
+                    )
+                )
+                .values(status=JobStatus.queued, phase="queued", progress=0.0, started_at=None, runner_id=None, lease_expires_at=None)
+            )
+            job_ids = list(db.scalars(select(ReconcileJob.id).where(ReconcileJob.status == JobStatus.queued).order_by(ReconcileJob.id)))
+            db.commit()
+        for job_id in job_ids:
+            self.enqueue(job_id)
+        return len(job_ids)
+
+    def shutdown(self) -> None:
+        """Stop taking jobs and drop queued ones without waiting for the running ones.
+
+        Jobs left queued or running in the table are picked up again by resume() on restart,
+        once their lease lapses.
+        """
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def progress(self, job_id: int) -> tuple[str, float] | None:
+        with self._lock:
+            return self._progress.get(job_id)
+
+    def _report(self, job_id: int, phase: str, percent: float) -> None:
+        with self._lock:
+            self._progress[job_id] = (phase, round(percent, 1))
+
+    def _renew_leases(self) -> None:
+        # While a run holds SQLite's write lock the renewal waits or fails; the lock keeps
+        # other processes from taking the job over meanwhile, so a failed renewal is only logged.
+        while not self._stop.wait(self.lease.total_seconds() / 3):
+            try:
+                with self.session_factory() as db:
+                    db.execute(
+                        update(ReconcileJob)
+                        .where(and_(ReconcileJob.runner_id == self.runner_id, ReconcileJob.status == JobStatus.running))
+                        .values(lease_expires_at=_utcnow() + self.lease)
+                    )
+                    db.commit()
+            except Exception:
+                logger.exception("Renewing reconcile job leases failed")
+
+    def _run(self, job_id: int) -> None:
+        with self.session_factory() as db:
+            claimed = db.execute(
+                update(ReconcileJob)
+                .where(and_(ReconcileJob.id == job_id, ReconcileJob.status == JobStatus.queued))
+                .values(
+                    status=JobStatus.running,
+                    phase="loading",
+                    started_at=datetime.now(timezone.utc),
+                    runner_id=self.runner_id,
+                    lease_expires_at=_utcnow() + self.lease,
+                )
+            ).rowcount
+            job = db.get(ReconcileJob, job_id) if claimed else None
+            db.commit()
+        if job is None:
+            return
+
+        self._report(job_id, "loading", 0.0)
+        try:
+            with self._tenant_locks[job.tenant_id], self.session_factory() as db:
+                matches = ReconciliationService(db).reconcile(
+                    tenant_id=job.tenant_id,
+                    request=ReconcileRequest.model_validate_json(job.request_json),
+                    job_id=job_id,
+                    progress=lambda phase, percent: self._report(job_id, phase, percent),
+                )
+                if self._finish(db, job_id, status=JobStatus.succeeded, phase="done", result_count=len(matches)):
+                    db.commit()
+                else:
+                    # The lease lapsed and another process took the job over; its run stands.
+                    db.rollback()
+        except Exception as e:
+            with self.session_factory() as db:
+                self._finish(db, job_id, status=JobStatus.failed, phase="failed", error=f"{type(e).__name__}: {e}")
+                db.commit()
+        finally:
+            with self._lock:
+                self._progress.pop(job_id, None)
+
+    def _finish(self, db: Session, job_id: int, *, status: JobStatus, phase: str, result_count: int | None = None, error: str | None = None) -> bool:
+        """Record the outcome, unless another runner has taken the job over; returns whether it did."""
+        return db.execute(
+            update(ReconcileJob)
+            .where(and_(ReconcileJob.id == job_id, ReconcileJob.runner_id == self.runner_id))
+            .values(
+                status=status,
+                phase=phase,
+                progress=100.0 if status == JobStatus.succeeded else ReconcileJob.progress,
+                result_count=result_count,
+                error=error,
+                finished_at=datetime.now(timezone.utc),
+                lease_expires_at=None,
+            )
+        ).rowcount == 1
+
+
+_runners: dict[Engine, JobRunner] = {}
+_runners_lock = threading.Lock()
+
+
+def get_job_runner(bind: Engine) -> JobRunner:
+    """The process-wide runner for a database (one per engine)."""
+    with _runners_lock:
+        runner = _runners.get(bind)
+        if runner is None:
+            factory = sessionmaker(bind=bind, class_=Session, expire_on_commit=False, autoflush=False)
+            runner = _runners[bind] = JobRunner(factory, workers=settings.reconcile_job_workers)
+        return runner
+
+
+def shutdown_job_runner(bind: Engine) -> None:
+    """Shut down the database's runner, if one was started; the next get_job_runner makes a new one."""
+    with _runners_lock:
+        runner = _runners.pop(bind, None)
+    if runner is not None:
+        runner.shutdown()
+
+
+def job_status(job: ReconcileJob, runner: JobRunner) -> ReconcileJobOut:
+    """The job's row with the live progress of a running job overlaid."""
+    out = ReconcileJobOut.model_validate(job)
+    live = runner.progress(job.id) if job.status == JobStatus.running else None
+    if live is not None:
+        out = out.model_copy(update={"phase": live[0], "progress": live[1]})
+    return out
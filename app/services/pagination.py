@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+MAX_PAGE_SIZE = 1000
+
+
+def keyset_page(
+    db: Session, stmt: Select, id_col: Any, *, limit: int | None, cursor: int | None, scalars: bool = True
+) -> tuple[list[Any], int | None]:
+    """One page of ``stmt`` in id order, starting after id ``cursor``, and the cursor of the next page.
+
+    The next cursor is None on the last page. Pages seek on the id instead of skipping rows, so a
+    page costs the same at any depth; without ``limit`` every remaining row is returned.
+    ``scalars=False`` returns Row tuples for a column select (which must include ``id_col``).
+    """
+    # Column selects go straight to Core, skipping the ORM result machinery.
+    fetch = db.scalars if scalars else db.connection().execute
+    if cursor is not None:
+        stmt = stmt.where(id_col > cursor)
+    stmt = stmt.order_by(id_col)
+    if limit is None:
+        return list(fetch(stmt)), None
+    rows = list(fetch(stmt.limit(limit + 1)))
+    if len(rows) > limit:
+        return rows[:limit], getattr(rows[limit - 1], id_col.key)
+    return rows, None
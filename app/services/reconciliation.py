@@ -1,101 +1,824 @@
 from __future__ import annotations
 
-from sqlalchemy import and_, delete, select
+from collections.abc import Callable, Collection, Iterable, Iterator
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Integer,
+    Row,
+    String,
+    and_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    union,
+    union_all,
+    update,
+)
 from sqlalchemy.orm import Session
 
-from app.models.models import BankTransaction, Invoice, InvoiceStatus, Match, MatchStatus
-from app.schemas.match import ReconcileRequest
-from app.utils.reconcile import compute_score
+from app.config import settings
+from app.models.models import (
+    BankTransaction,
+    ChangeEntity,
+    ChangeOp,
+    Invoice,
+    InvoiceStatus,
+    Match,
+    MatchStatus,
+    ReconcileWatermark,
+    RejectedPair,
+)
+from app.schemas.match import MatchOut, ReconcileRequest
+from app.services.change_log import ChangeLogService
+from app.services.pagination import keyset_page
+from app.utils.assignment import AssignmentStats, solve_assignment
+from app.utils.candidates import (
+    TransactionIndex,
+    rank_invoices,
+    rank_invoices_sharded,
+    rank_prefiltered,
+    top_candidates,
+)
+from app.utils.hashing import stable_json_dumps
+from app.utils.reconcile import ScoringColumns, amount_tolerance_cents
+from app.utils.split_payments import SplitProposal, propose_splits
+
+IN_CHUNK_SIZE = 500
+
+# What a run returns for each match it created (the MatchOut fields).
+CREATED_MATCH_COLUMNS = (
+    Match.id,
+    Match.tenant_id,
+    Match.invoice_id,
+    Match.bank_transaction_id,
+    Match.score,
+    Match.status,
+    Match.group_id,
+    Match.created_at,
+)
+
+# (phase, percent complete)
+ProgressCallback = Callable[[str, float], None]
+
+
+def _day_start(day: date | None, offset_days: int) -> datetime | None:
+    return None if day is None else datetime.combine(day + timedelta(days=offset_days), time.min)
+
+
+def _chunks(ids: Iterable[int], size: int = IN_CHUNK_SIZE) -> Iterator[list[int]]:
+    ids = sorted(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i : i + size]
 
 
 class ReconciliationService:
     def __init__(self, db: Session) -> None:
         self.db = db
+        # Set by reconcile() when the one-to-one assignment stage ran.
+        self.assignment_stats: AssignmentStats | None = None
+        self._job_id: int | None = None
+        self._progress: ProgressCallback | None = None
+        self._batch_size = settings.reconcile_shard_size
+        # invoice id -> transaction ids a reviewer rejected for it; loaded once per run.
+        self._rejected: dict[int, np.ndarray] = {}
 
-    def reconcile(self, *, tenant_id: int, request: ReconcileRequest | None = None) -> list[Match]:
+    def reconcile(
+        self,
+        *,
+        tenant_id: int,
+        request: ReconcileRequest | None = None,
+        job_id: int | None = None,
+        progress: ProgressCallback | None = None,
+    ) -> list[Row]:
+        """Propose the top candidates per open invoice and return the matches created by this run.
+
+        A full run replaces every non-confirmed match. An incremental run replays the change
+        log since the tenant's watermark and only rescores pairs touched by those changes; it
+        leaves the same proposed set as a full run would. Without a watermark, when the
+        scoring parameters changed since it was written, or when the log past it has been
+        compacted, incremental falls back to full.
+
+        ``job_id`` tags the created matches with the reconcile job that ran them, and
+        ``progress`` is called with (phase, percent) as the run advances.
+        """
+        batches = self.reconcile_batches(tenant_id=tenant_id, request=request, job_id=job_id, progress=progress)
+        return [m for batch in batches for m in batch]
+
+    def reconcile_batches(
+        self,
+        *,
+        tenant_id: int,
+        request: ReconcileRequest | None = None,
+        job_id: int | None = None,
+        progress: ProgressCallback | None = None,
+        batch_size: int | None = None,
+    ) -> Iterator[list[Row]]:
+        """reconcile() as a generator: yields the created matches of each ``batch_size`` invoices
+        (default APP_RECONCILE_SHARD_SIZE), flushed, as soon as they are scored.
+
+        The run is only complete (watermark written) once the generator is exhausted.
+        """
         req = request or ReconcileRequest()
+        self._job_id = job_id
+        self._progress = progress
+        self._batch_size = batch_size or settings.reconcile_shard_size
+        self._report("loading", 0.0)
+        self._rejected = self._load_rejections(tenant_id=tenant_id)
+        changes = ChangeLogService(self.db)
+        upto_seq = changes.last_seq(tenant_id=tenant_id)
+        params = stable_json_dumps(
+            {
+                "max_candidates_per_invoice": req.max_candidates_per_invoice,
+                "date_window_days": req.date_window_days,
+                "assignment": req.assignment,
+                "prefilter": req.candidate_strategy == "sql",
+                "split_payments": req.split_payments,
+            }
+        )
+        watermark = self.db.get(ReconcileWatermark, tenant_id)
+
+        # A global assignment can shift with any change, so it always runs in full; so do the
+        # SQL prefilter and split payments, whose proposals incremental rescoring does not reproduce.
+        incremental = (
+            req.mode == "incremental"
+            and req.assignment == "per_invoice"
+            and req.candidate_strategy != "sql"
+            and not req.split_payments
+        )
+        # Entries at or below the horizon have been compacted away, so they cannot be replayed.
+        replayable = watermark is not None and watermark.last_seq >= changes.horizon(tenant_id=tenant_id)
+        if incremental and replayable and watermark.params_json == params:
+            yield from self._reconcile_incremental(tenant_id=tenant_id, req=req, after_seq=watermark.last_seq, upto_seq=upto_seq)
+        else:
+            yield from self._reconcile_full(tenant_id=tenant_id, req=req)
 
+        if watermark is None:
+            watermark = ReconcileWatermark(tenant_id=tenant_id, last_seq=upto_seq, params_json=params)
+            self.db.add(watermark)
+        else:
+            watermark.last_seq = upto_seq
+            watermark.params_json = params
+
+        self._report("persisting", 95.0)
+        self.db.flush()
+
+    def _reconcile_full(self, *, tenant_id: int, req: ReconcileRequest) -> Iterator[list[Row]]:
         # Keep confirmed; refresh proposed/rejected to keep behavior deterministic per run.
-        self.db.execute(delete(Match).where(and_(Match.tenant_id == tenant_id, Match.status != MatchStatus.confirmed)))
-
-        invoices = list(self.db.scalars(select(Invoice).where(and_(Invoice.tenant_id == tenant_id, Invoice.status == InvoiceStatus.open))))
-        txns = list(self.db.scalars(select(BankTransaction).where(BankTransaction.tenant_id == tenant_id)))
-
-        created: list[Match] = []
-        for inv in invoices:
-            scored: list[tuple[float, int]] = []
-            for tx in txns:
-                sb = compute_score(
-                    invoice_amount=float(inv.amount),
-                    invoice_date=inv.invoice_date,
-                    invoice_desc=inv.description,
-                    txn_amount=float(tx.amount),
-                    txn_posted_at=tx.posted_at,
-                    txn_desc=tx.description,
-                    date_window_days=req.date_window_days,
+        self._delete_matches(tenant_id, Match.status != MatchStatus.confirmed)
+
+        ranked_all: Iterable[tuple[int, list[tuple[int, float]]]]
+        if req.candidate_strategy == "sql":
+            total = self.db.scalar(
+                select(func.count()).where(and_(Invoice.tenant_id == tenant_id, Invoice.status == InvoiceStatus.open))
+            )
+            ranked_all = self._track(self._rank_sql(tenant_id=tenant_id, req=req), total=total or 0)
+        else:
+            inv_ids, inv_cols = self._load_open_invoices(tenant_id=tenant_id)
+            txn_ids, txn_cols = self._load_transactions(tenant_id=tenant_id)
+            ranked_all = self._track(self._rank(inv_ids, inv_cols, txn_ids, txn_cols, req), total=len(inv_ids))
+        if req.assignment == "one_to_one":
+            ranked_all = self._assign(tenant_id=tenant_id, ranked_all=ranked_all)
+
+        if not req.split_payments:
+            yield from self._propose_batches(tenant_id=tenant_id, ranked_all=ranked_all)
+            return
+
+        # A grouped match supersedes the 1:1 proposal of any of its (invoice, transaction) pairs.
+        splits = self._find_splits(tenant_id=tenant_id, req=req)
+        grouped = {(inv_id, split.bank_transaction_id) for split in splits for inv_id in split.invoice_ids}
+        ranked_all = (
+            (inv_id, [(tx_id, score) for tx_id, score in ranked if (inv_id, tx_id) not in grouped]) for inv_id, ranked in ranked_all
+        )
+        yield from self._propose_batches(tenant_id=tenant_id, ranked_all=ranked_all)
+        for start in range(0, len(splits), self._batch_size):
+            yield self._insert_splits(tenant_id=tenant_id, splits=splits[start : start + self._batch_size])
+
+    def _find_splits(self, *, tenant_id: int, req: ReconcileRequest) -> list[SplitProposal]:
+        """Grouped matches where one transaction settles several open invoices of one vendor.
+
+        Transactions that already have a confirmed match are skipped.
+        """
+        confirmed_txns = set(
+            self.db.scalars(
+                select(Match.bank_transaction_id).where(and_(Match.tenant_id == tenant_id, Match.status == MatchStatus.confirmed))
+            )
+        )
+
+        inv_rows = self.db.execute(
+            select(Invoice.id, Invoice.currency, Invoice.vendor_id, Invoice.amount_cents, Invoice.invoice_date, Invoice.description_tokens)
+            .where(and_(Invoice.tenant_id == tenant_id, Invoice.status == InvoiceStatus.open, Invoice.invoice_date.is_not(None)))
+            .order_by(Invoice.id)
+        ).all()
+        txn_rows = [
+            r
+            for r in self.db.execute(
+                select(
+                    BankTransaction.id,
+                    BankTransaction.currency,
+                    BankTransaction.amount_cents,
+                    BankTransaction.posted_at,
+                    BankTransaction.description_tokens,
+                )
+                .where(BankTransaction.tenant_id == tenant_id)
+                .order_by(BankTransaction.id)
+            )
+            if r.id not in confirmed_txns
+        ]
+        if len(inv_rows) < 2 or not txn_rows:
+            return []
+
+        splits = propose_splits(
+            [r.id for r in inv_rows],
+            [(r.currency, r.vendor_id) for r in inv_rows],
+            ScoringColumns.from_rows((r.amount_cents, r.invoice_date, r.description_tokens) for r in inv_rows),
+            [r.id for r in txn_rows],
+            [r.currency for r in txn_rows],
+            ScoringColumns.from_rows((r.amount_cents, r.posted_at, r.description_tokens) for r in txn_rows),
+            date_window_days=req.date_window_days,
+            max_items=req.max_split_invoices,
+            max_candidates=settings.split_max_candidates,
+            max_work=settings.split_max_work,
+            rejected={(inv_id, int(tx_id)) for inv_id, tx_ids in self._rejected.items() for tx_id in tx_ids},
+        )
+        return list(splits)
+
+    def _insert_splits(self, *, tenant_id: int, splits: list[SplitProposal]) -> list[Row]:
+        rows = self._insert_proposals(
+            [
+                {
+                    "tenant_id": tenant_id,
+                    "invoice_id": inv_id,
+                    "bank_transaction_id": split.bank_transaction_id,
+                    "score": split.score,
+                    "status": MatchStatus.proposed,
+                    "job_id": self._job_id,
+                }
+                for split in splits
+                for inv_id in split.invoice_ids
+            ]
+        )
+        # Rows come back in input order, so each group is a consecutive run; its first id names it.
+        params, start = [], 0
+        for split in splits:
+            members = rows[start : start + len(split.invoice_ids)]
+            params.extend({"match_id": r.id, "group": members[0].id} for r in members)
+            start += len(members)
+        table = Match.__table__
+        self.db.connection().execute(
+            update(table).where(table.c.id == bindparam("match_id")).values(group_id=bindparam("group")), params
+        )
+        return [
+            r
+            for chunk in _chunks(r.id for r in rows)
+            for r in self.db.connection().execute(select(*CREATED_MATCH_COLUMNS).where(Match.id.in_(chunk)).order_by(Match.id))
+        ]
+
+    def _assign(
+        self, *, tenant_id: int, ranked_all: Iterable[tuple[int, list[tuple[int, float]]]]
+    ) -> list[tuple[int, list[tuple[int, float]]]]:
+        """Reduce per-invoice candidates to a maximum-weight one-to-one proposal set.
+
+        Transactions that already have a confirmed match are left out of the graph.
+        """
+        ranked_all = list(ranked_all)
+        self._report("assigning", 90.0)
+        confirmed = set(
+            self.db.scalars(
+                select(Match.bank_transaction_id).where(and_(Match.tenant_id == tenant_id, Match.status == MatchStatus.confirmed))
+            )
+        )
+        edges = [(inv_id, tx_id, score) for inv_id, ranked in ranked_all for tx_id, score in ranked if tx_id not in confirmed]
+        chosen, self.assignment_stats = solve_assignment(edges)
+        picked = {edges[pos][0]: [(edges[pos][1], edges[pos][2])] for pos in chosen}
+        return [(inv_id, picked.get(inv_id, [])) for inv_id, _ in ranked_all]
+
+    def _reconcile_incremental(
+        self, *, tenant_id: int, req: ReconcileRequest, after_seq: int, upto_seq: int
+    ) -> Iterator[list[Row]]:
+        self._report("scoring", 0.0)
+        entries = ChangeLogService(self.db).changes_between(
+            tenant_id=tenant_id,
+            after_seq=after_seq,
+            upto_seq=upto_seq,
+            entities=(ChangeEntity.invoice, ChangeEntity.bank_transaction, ChangeEntity.rejection),
+        )
+        # A rejection entry names an invoice whose rejected pairs changed, so its candidates change too.
+        changed_invoices = {e.entity_id for e in entries if e.entity in (ChangeEntity.invoice, ChangeEntity.rejection)}
+        new_txns = {e.entity_id for e in entries if e.entity == ChangeEntity.bank_transaction and e.op == ChangeOp.created}
+        deleted_txns = {e.entity_id for e in entries if e.entity == ChangeEntity.bank_transaction and e.op == ChangeOp.deleted}
+
+        # Invoices that proposed a removed transaction need their whole candidate list again.
+        for chunk in _chunks(deleted_txns):
+            changed_invoices.update(
+                self.db.scalars(
+                    select(Match.invoice_id).where(
+                        and_(Match.tenant_id == tenant_id, Match.status == MatchStatus.proposed, Match.bank_transaction_id.in_(chunk))
+                    )
                 )
-                if sb.total <= 0.0:
-                    continue
-                scored.append((sb.total, tx.id))
-
-            scored.sort(key=lambda x: x[0], reverse=True)
-            for score, tx_id in scored[: req.max_candidates_per_invoice]:
-                m = Match(
-                    tenant_id=tenant_id,
-                    invoice_id=inv.id,
-                    bank_transaction_id=tx_id,
-                    score=score,
-                    status=MatchStatus.proposed,
+            )
+        new_txns -= deleted_txns
+
+        # Confirming an invoice pruned its transaction from every other invoice's proposals,
+        # so that transaction is offered to the remaining open invoices again.
+        touched_txns = set(new_txns)
+        for chunk in _chunks(changed_invoices):
+            touched_txns.update(
+                self.db.scalars(
+                    select(Match.bank_transaction_id).where(
+                        and_(Match.tenant_id == tenant_id, Match.status == MatchStatus.confirmed, Match.invoice_id.in_(chunk))
+                    )
                 )
-                self.db.add(m)
-                created.append(m)
+            )
+            self._delete_matches(tenant_id, Match.status != MatchStatus.confirmed, Match.invoice_id.in_(chunk))
 
-        self.db.flush()
-        # Return only proposed created on this run (confirmed preserved but not returned unless they were created now)
-        return created
+        # Changed invoices that are still open: rescore against every transaction.
+        if changed_invoices:
+            inv_ids, inv_cols = self._load_open_invoices(tenant_id=tenant_id, ids=changed_invoices)
+            if inv_ids:
+                txn_ids, txn_cols = self._load_transactions(tenant_id=tenant_id)
+                yield from self._propose_batches(tenant_id=tenant_id, ranked_all=self._rank(inv_ids, inv_cols, txn_ids, txn_cols, req))
+
+        # Every other open invoice: the new top-k is the top-k of its current proposals plus
+        # the touched transactions, because its proposals were the top-k of everything else.
+        if touched_txns:
+            txn_ids, txn_cols = self._load_transactions(tenant_id=tenant_id, ids=touched_txns)
+            inv_ids, inv_cols = self._load_open_invoices(tenant_id=tenant_id)
+            keep = [i for i, inv_id in enumerate(inv_ids) if inv_id not in changed_invoices]
+            ranked_new = {
+                inv_id: ranked
+                for inv_id, ranked in self._rank([inv_ids[i] for i in keep], inv_cols.take(keep), txn_ids, txn_cols, req)
+                if ranked
+            }
+            current: dict[int, list[tuple[int, int, float]]] = {}
+            for chunk in _chunks(ranked_new):
+                rows = self.db.execute(
+                    select(Match.id, Match.invoice_id, Match.bank_transaction_id, Match.score).where(
+                        and_(Match.tenant_id == tenant_id, Match.status == MatchStatus.proposed, Match.invoice_id.in_(chunk))
+                    )
+                )
+                for r in rows:
+                    current.setdefault(r.invoice_id, []).append((r.id, r.bank_transaction_id, r.score))
+
+            stale: list[int] = []
+            merged_all: list[tuple[int, list[tuple[int, float]]]] = []
+            for inv_id, ranked in ranked_new.items():
+                # (match id, transaction id, score); touched pairs are rescored, so drop any stored copy
+                existing = current.get(inv_id, [])
+                stale.extend(row[0] for row in existing if row[1] in touched_txns)
+                existing = [row for row in existing if row[1] not in touched_txns]
+                merged = top_candidates(
+                    np.asarray([row[1] for row in existing] + [tx_id for tx_id, _ in ranked], dtype=np.int64),
+                    np.asarray([row[2] for row in existing] + [score for _, score in ranked], dtype=np.float64),
+                    req.max_candidates_per_invoice,
+                )
+                merged_ids = {tx_id for tx_id, _ in merged}
+                existing_ids = {row[1] for row in existing}
+                stale.extend(row[0] for row in existing if row[1] not in merged_ids)
+                merged_all.append((inv_id, [(tx_id, score) for tx_id, score in merged if tx_id not in existing_ids]))
+            for chunk in _chunks(stale):
+                self._delete_matches(tenant_id, Match.id.in_(chunk))
+            yield from self._propose_batches(tenant_id=tenant_id, ranked_all=merged_all)
+
+    def _load_open_invoices(self, *, tenant_id: int, ids: Collection[int] | None = None) -> tuple[list[int], ScoringColumns]:
+        stmt = select(Invoice.id, Invoice.amount_cents, Invoice.invoice_date, Invoice.description_tokens).where(
+            and_(Invoice.tenant_id == tenant_id, Invoice.status == InvoiceStatus.open)
+        )
+        rows = self._select_ids(stmt, Invoice.id, ids)
+        return [r.id for r in rows], ScoringColumns.from_rows((r.amount_cents, r.invoice_date, r.description_tokens) for r in rows)
+
+    def _load_transactions(self, *, tenant_id: int, ids: Collection[int] | None = None) -> tuple[np.ndarray, ScoringColumns]:
+        stmt = select(
+            BankTransaction.id, BankTransaction.amount_cents, BankTransaction.posted_at, BankTransaction.description_tokens
+        ).where(
+            BankTransaction.tenant_id == tenant_id
+        )
+        rows = self._select_ids(stmt, BankTransaction.id, ids)
+        txn_ids = np.asarray([r.id for r in rows], dtype=np.int64)
+        return txn_ids, ScoringColumns.from_rows((r.amount_cents, r.posted_at, r.description_tokens) for r in rows)
+
+    def _load_rejections(self, *, tenant_id: int) -> dict[int, np.ndarray]:
+        rows = self.db.execute(
+            select(RejectedPair.invoice_id, RejectedPair.bank_transaction_id)
+            .where(RejectedPair.tenant_id == tenant_id)
+            .order_by(RejectedPair.invoice_id, RejectedPair.bank_transaction_id)
+        )
+        rejected: dict[int, list[int]] = {}
+        for inv_id, tx_id in rows:
+            rejected.setdefault(inv_id, []).append(tx_id)
+        return {inv_id: np.asarray(tx_ids, dtype=np.int64) for inv_id, tx_ids in rejected.items()}
+
+    def _select_ids(self, stmt, id_col, ids: Collection[int] | None) -> list:
+        if ids is None:
+            return self.db.execute(stmt.order_by(id_col)).all()
+        rows = [r for chunk in _chunks(ids) for r in self.db.execute(stmt.where(id_col.in_(chunk)))]
+        rows.sort(key=lambda r: r.id)
+        return rows
+
+    def _rank(
+        self,
+        inv_ids: list[int],
+        inv_cols: ScoringColumns,
+        txn_ids: np.ndarray,
+        txn_cols: ScoringColumns,
+        req: ReconcileRequest,
+    ) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+        """Yield (invoice id, top-k (transaction id, score)) for each invoice, in order."""
+        use_index = req.candidate_strategy == "index"
+        workers = req.workers or settings.reconcile_workers
+        if workers > 1 and len(inv_ids) > settings.reconcile_shard_size:
+            return rank_invoices_sharded(
+                inv_ids,
+                inv_cols,
+                txn_ids,
+                txn_cols,
+                use_index=use_index,
+                k=req.max_candidates_per_invoice,
+                date_window_days=req.date_window_days,
+                workers=workers,
+                shard_size=settings.reconcile_shard_size,
+                rejected=self._rejected,
+            )
+        return rank_invoices(
+            inv_ids,
+            inv_cols,
+            txn_ids,
+            txn_cols,
+            index=TransactionIndex(txn_cols) if use_index else None,
+            k=req.max_candidates_per_invoice,
+            date_window_days=req.date_window_days,
+            rejected=self._rejected,
+        )
+
+    def _rank_sql(self, *, tenant_id: int, req: ReconcileRequest) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+        """Rank open invoices block by block, with the database finding each block's candidates.
+
+        One query per block joins the block's invoices (as literal rows carrying their amount
+        band and date window) to the tenant's transactions of the same currency, through the
+        (tenant, currency, amount_cents) and (tenant, posted_at) indexes. Only candidate rows come back.
+        """
+        after_id = 0
+        while True:
+            rows = self.db.execute(
+                select(Invoice.id, Invoice.amount_cents, Invoice.currency, Invoice.invoice_date, Invoice.description_tokens)
+                .where(and_(Invoice.tenant_id == tenant_id, Invoice.status == InvoiceStatus.open, Invoice.id > after_id))
+                .order_by(Invoice.id)
+                .limit(IN_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                return
+            after_id = rows[-1].id
+            inv_ids = [r.id for r in rows]
+            inv_cols = ScoringColumns.from_rows((r.amount_cents, r.invoice_date, r.description_tokens) for r in rows)
 
-    def list_matches(self, *, tenant_id: int, status: MatchStatus | None = None) -> list[Match]:
+            pairs = self.db.execute(self._prefilter_query(tenant_id=tenant_id, invoices=rows, req=req)).all()
+            position: dict[int, int] = {}
+            txn_rows = []
+            pool_lists: dict[int, list[int]] = {}
+            for p in pairs:
+                pos = position.get(p.tx_id)
+                if pos is None:
+                    pos = position[p.tx_id] = len(txn_rows)
+                    txn_rows.append(p)
+                pool_lists.setdefault(p.inv_id, []).append(pos)
+            txn_ids = np.asarray([r.tx_id for r in txn_rows], dtype=np.int64)
+            txn_cols = ScoringColumns.from_rows((r.amount_cents, r.posted_at, r.description_tokens) for r in txn_rows)
+            pools = [np.asarray(pool_lists.get(inv_id, []), dtype=np.int64) for inv_id in inv_ids]
+
+            yield from rank_prefiltered(
+                inv_ids,
+                inv_cols,
+                txn_ids,
+                txn_cols,
+                pools,
+                k=req.max_candidates_per_invoice,
+                date_window_days=req.date_window_days,
+                rejected=self._rejected,
+            )
+
+    @staticmethod
+    def _prefilter_query(*, tenant_id: int, invoices: list, req: ReconcileRequest):
+        block = union_all(
+            *(
+                select(
+                    literal(r.id, Integer).label("inv_id"),
+                    literal(r.currency, String).label("currency"),
+                    literal(r.amount_cents - amount_tolerance_cents(r.amount_cents), BigInteger).label("amount_lo"),
+                    literal(r.amount_cents + amount_tolerance_cents(r.amount_cents), BigInteger).label("amount_hi"),
+                    literal(_day_start(r.invoice_date, -req.date_window_days), DateTime).label("posted_lo"),
+                    literal(_day_start(r.invoice_date, req.date_window_days + 1), DateTime).label("posted_hi"),
+                )
+                for r in invoices
+            )
+        ).cte("invoice_block")
+        tx = BankTransaction
+        columns = (block.c.inv_id, tx.id.label("tx_id"), tx.amount_cents, tx.posted_at, tx.description_tokens)
+        same_currency = and_(tx.tenant_id == tenant_id, tx.currency == block.c.currency)
+        by_amount = select(*columns).join_from(
+            block, tx, and_(same_currency, tx.amount_cents >= block.c.amount_lo, tx.amount_cents <= block.c.amount_hi)
+        )
+        by_date = select(*columns).join_from(
+            block, tx, and_(same_currency, tx.posted_at >= block.c.posted_lo, tx.posted_at < block.c.posted_hi)
+        )
+        return union(by_amount, by_date)
+
+    def _track(
+        self, ranked_all: Iterator[tuple[int, list[tuple[int, float]]]], *, total: int
+    ) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+        """Pass ranked invoices through, reporting scoring progress (0-90%)."""
+        self._report("scoring", 0.0)
+        step = max(total // 100, 1)
+        for n, item in enumerate(ranked_all, start=1):
+            if n % step == 0:
+                self._report("scoring", 90.0 * n / total)
+            yield item
+
+    def _report(self, phase: str, percent: float) -> None:
+        if self._progress is not None:
+            self._progress(phase, percent)
+
+    def _propose_batches(
+        self, *, tenant_id: int, ranked_all: Iterable[tuple[int, list[tuple[int, float]]]]
+    ) -> Iterator[list[Row]]:
+        """Insert proposals and yield the created rows, one batch of invoices at a time."""
+        batch: list[dict] = []
+        for n, (inv_id, ranked) in enumerate(ranked_all, start=1):
+            batch.extend(
+                {
+                    "tenant_id": tenant_id,
+                    "invoice_id": inv_id,
+                    "bank_transaction_id": tx_id,
+                    "score": score,
+                    "status": MatchStatus.proposed,
+                    "job_id": self._job_id,
+                }
+                for tx_id, score in ranked
+            )
+            if n % self._batch_size == 0 and batch:
+                yield self._insert_proposals(batch)
+                batch = []
+        if batch:
+            yield self._insert_proposals(batch)
+
+    def _delete_matches(self, tenant_id: int, *criteria) -> None:
+        """Delete the tenant's matches meeting ``criteria`` and journal their removal."""
+        deleted = self.db.scalars(delete(Match).where(Match.tenant_id == tenant_id, *criteria).returning(Match.id)).all()
+        ChangeLogService(self.db).record(tenant_id=tenant_id, entity=ChangeEntity.match, op=ChangeOp.deleted, entity_ids=deleted)
+
+    def _prune_competitors(self, *, tenant_id: int, invoice_ids: Collection[int], bank_transaction_ids: Collection[int]) -> None:
+        """Delete the proposals for any of these invoices or transactions (just confirmed), and
+        every other member of a split group one of them belonged to, so no group is left partial."""
+        proposed = and_(Match.tenant_id == tenant_id, Match.status == MatchStatus.proposed, Match.group_id.is_not(None))
+        groups: set[int] = set()
+        for col, ids in ((Match.invoice_id, invoice_ids), (Match.bank_transaction_id, bank_transaction_ids)):
+            for chunk in _chunks(ids):
+                groups.update(self.db.scalars(select(Match.group_id).where(and_(proposed, col.in_(chunk)))))
+                self._delete_matches(tenant_id, Match.status == MatchStatus.proposed, col.in_(chunk))
+        for chunk in _chunks(sorted(groups)):
+            self._delete_matches(tenant_id, Match.status == MatchStatus.proposed, Match.group_id.in_(chunk))
+
+    def _group_settles(self, *, tenant_id: int, invoice_ids: Collection[int], bank_transaction_id: int) -> bool:
+        """Whether a split group's invoices still add up to its transaction within tolerance."""
+        txn_cents = self.db.scalar(
+            select(BankTransaction.amount_cents).where(
+                and_(BankTransaction.tenant_id == tenant_id, BankTransaction.id == bank_transaction_id)
+            )
+        )
+        inv_cents = list(
+            self.db.scalars(select(Invoice.amount_cents).where(and_(Invoice.tenant_id == tenant_id, Invoice.id.in_(invoice_ids))))
+        )
+        if txn_cents is None or len(inv_cents) != len(set(invoice_ids)) or len(inv_cents) < 2:
+            return False
+        return abs(sum(inv_cents) - txn_cents) <= amount_tolerance_cents(txn_cents)
+
+    def _insert_proposals(self, rows: list[dict]) -> list[Row]:
+        # One Core executemany, paged into multi-row INSERT ... RETURNING, instead of a
+        # unit-of-work flush; the created rows come back as plain tuples. RETURNING order is unspecified but
+        # ids follow input order, so sort on them (sort_by_parameter_order would fall back to
+        # one statement per row on SQLite).
+        stmt = insert(Match.__table__).returning(*CREATED_MATCH_COLUMNS)
+        rows = self.db.connection().execute(stmt, rows).all()
+        rows.sort(key=lambda r: r.id)
+        ChangeLogService(self.db).record(
+            tenant_id=rows[0].tenant_id, entity=ChangeEntity.match, op=ChangeOp.created, entity_ids=[r.id for r in rows]
+        )
+        return rows
+
+    def list_matches(
+        self, *, tenant_id: int, status: MatchStatus | None = None, limit: int | None = None, cursor: int | None = None
+    ) -> tuple[list[Match], int | None]:
+        """Matches in id order, one keyset page at a time (see keyset_page)."""
         stmt = select(Match).where(Match.tenant_id == tenant_id)
         if status:
             stmt = stmt.where(Match.status == status)
-        stmt = stmt.order_by(Match.id)
-        return list(self.db.scalars(stmt))
+        return keyset_page(self.db, stmt, Match.id, limit=limit, cursor=cursor)
+
+    def list_match_rows(
+        self, *, tenant_id: int, status: MatchStatus | None = None, limit: int | None = None, cursor: int | None = None
+    ) -> tuple[list[Row], int | None]:
+        """list_matches as tuples of the MatchOut fields, in field order, without loading ORM objects."""
+        stmt = select(*(getattr(Match, f) for f in MatchOut.model_fields)).where(Match.tenant_id == tenant_id)
+        if status:
+            stmt = stmt.where(Match.status == status)
+        return keyset_page(self.db, stmt, Match.id, limit=limit, cursor=cursor, scalars=False)
 
     def confirm_match(self, *, tenant_id: int, match_id: int) -> Match:
+        """Confirm a proposed match; a grouped (split payment) match is confirmed as a whole."""
         match = self.db.scalar(select(Match).where(and_(Match.tenant_id == tenant_id, Match.id == match_id)))
         if not match:
             raise LookupError("Match not found")
         if match.status != MatchStatus.proposed:
             raise ValueError("Only proposed matches can be confirmed")
 
-        # Ensure no other confirmed match exists for this invoice or this transaction.
+        members = [match]
+        if match.group_id is not None:
+            members = list(
+                self.db.scalars(select(Match).where(and_(Match.tenant_id == tenant_id, Match.group_id == match.group_id)))
+            )
+        invoice_ids = [m.invoice_id for m in members]
+        member_ids = [m.id for m in members]
+        if match.group_id is not None and not self._group_settles(
+            tenant_id=tenant_id, invoice_ids=invoice_ids, bank_transaction_id=match.bank_transaction_id
+        ):
+            raise ValueError("Split payment group is incomplete: its invoices no longer add up to the transaction")
+
+        # Ensure no other confirmed match exists for these invoices or this transaction.
         existing_conflict = self.db.scalar(
             select(Match).where(
                 and_(
                     Match.tenant_id == tenant_id,
                     Match.status == MatchStatus.confirmed,
-                    (Match.invoice_id == match.invoice_id) | (Match.bank_transaction_id == match.bank_transaction_id),
+                    Match.invoice_id.in_(invoice_ids) | (Match.bank_transaction_id == match.bank_transaction_id),
                 )
             )
         )
         if existing_conflict:
             raise ValueError("Invoice or transaction already has a confirmed match")
 
-        match.status = MatchStatus.confirmed
-        invoice = self.db.scalar(select(Invoice).where(and_(Invoice.tenant_id == tenant_id, Invoice.id == match.invoice_id)))
-        if invoice:
+        for m in members:
+            m.status = MatchStatus.confirmed
+        ChangeLogService(self.db).record(tenant_id=tenant_id, entity=ChangeEntity.match, op=ChangeOp.confirmed, entity_ids=member_ids)
+        invoices = list(self.db.scalars(select(Invoice).where(and_(Invoice.tenant_id == tenant_id, Invoice.id.in_(invoice_ids)))))
+        for invoice in invoices:
             invoice.status = InvoiceStatus.matched
+        ChangeLogService(self.db).record(
+            tenant_id=tenant_id, entity=ChangeEntity.invoice, op=ChangeOp.status_changed, entity_ids=[i.id for i in invoices]
+        )
 
-        # Reject other proposed matches for the same invoice or txn to reduce ambiguity.
-        self.db.execute(
-            delete(Match).where(
-                and_(
-                    Match.tenant_id == tenant_id,
-                    Match.status == MatchStatus.proposed,
-                    Match.id != match.id,
-                    ((Match.invoice_id == match.invoice_id) | (Match.bank_transaction_id == match.bank_transaction_id)),
+        # Reject other proposed matches for the same invoices or txn to reduce ambiguity.
+        self.db.flush()
+        self._prune_competitors(tenant_id=tenant_id, invoice_ids=invoice_ids, bank_transaction_ids=[match.bank_transaction_id])
+        self.db.flush()
+        return match
+
+    def confirm_matches(
+        self, *, tenant_id: int, match_ids: list[int] | None = None, min_score: float | None = None
+    ) -> dict[int, str]:
+        """Confirm many matches with set-based statements; returns match id -> outcome.
+
+        Takes explicit ids (decided in the given order) or a score threshold (every proposed match
+        scoring at least ``min_score``, best first). A match whose invoice or transaction already has
+        a confirmed match, or one confirmed earlier in the same call, is a ``conflict``; grouped
+        matches are confirmed or refused as a whole, and a group whose invoices no longer add up to
+        its transaction is a ``conflict`` too. Outcomes: confirmed, not_found, not_proposed, conflict.
+        """
+        columns = (Match.id, Match.invoice_id, Match.bank_transaction_id, Match.status, Match.group_id)
+        if match_ids is not None:
+            requested = list(dict.fromkeys(match_ids))
+            rows = {
+                r.id: r
+                for chunk in _chunks(requested)
+                for r in self.db.execute(select(*columns).where(and_(Match.tenant_id == tenant_id, Match.id.in_(chunk))))
+            }
+        else:
+            found = self.db.execute(
+                select(*columns)
+                .where(and_(Match.tenant_id == tenant_id, Match.status == MatchStatus.proposed, Match.score >= min_score))
+                .order_by(Match.score.desc(), Match.id)
+            ).all()
+            rows = {r.id: r for r in found}
+            requested = [r.id for r in found]
+
+        groups: dict[int, list[Row]] = {}
+        group_ids = {r.group_id for r in rows.values() if r.group_id is not None and r.status == MatchStatus.proposed}
+        for chunk in _chunks(group_ids):
+            for r in self.db.execute(select(*columns).where(and_(Match.tenant_id == tenant_id, Match.group_id.in_(chunk)))):
+                groups.setdefault(r.group_id, []).append(r)
+
+        # Invoices and transactions already taken by a confirmed match, restricted to those in play.
+        inv_ids = {r.invoice_id for r in rows.values()} | {r.invoice_id for g in groups.values() for r in g}
+        tx_ids = {r.bank_transaction_id for r in rows.values()}
+        confirmed = and_(Match.tenant_id == tenant_id, Match.status == MatchStatus.confirmed)
+        taken_invoices = {
+            i for chunk in _chunks(inv_ids) for i in self.db.scalars(select(Match.invoice_id).where(and_(confirmed, Match.invoice_id.in_(chunk))))
+        }
+        taken_txns = {
+            t
+            for chunk in _chunks(tx_ids)
+            for t in self.db.scalars(select(Match.bank_transaction_id).where(and_(confirmed, Match.bank_transaction_id.in_(chunk))))
+        }
+
+        outcomes: dict[int, str] = {}
+        chosen: list[Row] = []
+        for match_id in requested:
+            if match_id in outcomes:
+                continue
+            r = rows.get(match_id)
+            if r is None:
+                outcomes[match_id] = "not_found"
+                continue
+            if r.status != MatchStatus.proposed:
+                outcomes[match_id] = "not_proposed"
+                continue
+            unit = groups[r.group_id] if r.group_id is not None else [r]
+            if r.bank_transaction_id in taken_txns or any(m.invoice_id in taken_invoices for m in unit):
+                outcome = "conflict"
+            elif r.group_id is not None and not self._group_settles(
+                tenant_id=tenant_id, invoice_ids=[m.invoice_id for m in unit], bank_transaction_id=r.bank_transaction_id
+            ):
+                outcome = "conflict"
+            else:
+                outcome = "confirmed"
+                chosen.extend(unit)
+                taken_txns.add(r.bank_transaction_id)
+                taken_invoices.update(m.invoice_id for m in unit)
+            outcomes.update((m.id, outcome) for m in unit if m.id == match_id or m.id not in outcomes)
+
+        if not chosen:
+            return outcomes
+        for chunk in _chunks(m.id for m in chosen):
+            self.db.execute(update(Match).where(Match.id.in_(chunk)).values(status=MatchStatus.confirmed))
+        ChangeLogService(self.db).record(
+            tenant_id=tenant_id, entity=ChangeEntity.match, op=ChangeOp.confirmed, entity_ids=[m.id for m in chosen]
+        )
+        invoice_ids = sorted({m.invoice_id for m in chosen})
+        for chunk in _chunks(invoice_ids):
+            self.db.execute(
+                update(Invoice).where(and_(Invoice.tenant_id == tenant_id, Invoice.id.in_(chunk))).values(status=InvoiceStatus.matched)
+            )
+        ChangeLogService(self.db).record(
+            tenant_id=tenant_id, entity=ChangeEntity.invoice, op=ChangeOp.status_changed, entity_ids=invoice_ids
+        )
+        # Prune the proposals competing with the matches confirmed here, whole groups included (as confirm_match does).
+        self._prune_competitors(
+            tenant_id=tenant_id, invoice_ids=invoice_ids, bank_transaction_ids=sorted({m.bank_transaction_id for m in chosen})
+        )
+        self.db.flush()
+        return outcomes
+
+    def reject_match(self, *, tenant_id: int, match_id: int) -> Match:
+        """Reject a proposed match; its (invoice, transaction) pairs are never proposed again.
+
+        Rejecting one row of a grouped match rejects the whole group.
+        """
+        match = self.db.scalar(select(Match).where(and_(Match.tenant_id == tenant_id, Match.id == match_id)))
+        if not match:
+            raise LookupError("Match not found")
+        if match.status != MatchStatus.proposed:
+            raise ValueError("Only proposed matches can be rejected")
+
+        members = [match]
+        if match.group_id is not None:
+            members = list(
+                self.db.scalars(select(Match).where(and_(Match.tenant_id == tenant_id, Match.group_id == match.group_id)))
+            )
+        known = {
+            tuple(r)
+            for r in self.db.execute(
+                select(RejectedPair.invoice_id, RejectedPair.bank_transaction_id).where(
+                    and_(RejectedPair.tenant_id == tenant_id, RejectedPair.invoice_id.in_([m.invoice_id for m in members]))
                 )
             )
+        }
+        for m in members:
+            m.status = MatchStatus.rejected
+            if (m.invoice_id, m.bank_transaction_id) not in known:
+                self.db.add(RejectedPair(tenant_id=tenant_id, invoice_id=m.invoice_id, bank_transaction_id=m.bank_transaction_id))
+        ChangeLogService(self.db).record(
+            tenant_id=tenant_id, entity=ChangeEntity.match, op=ChangeOp.rejected, entity_ids=[m.id for m in members]
+        )
+        # The invoices' candidate lists change, so an incremental run must rescore them.
+        ChangeLogService(self.db).record(
+            tenant_id=tenant_id, entity=ChangeEntity.rejection, op=ChangeOp.created, entity_ids=sorted({m.invoice_id for m in members})
         )
         self.db.flush()
         return match
+
+    def clear_rejections(self, *, tenant_id: int, invoice_id: int | None = None) -> int:
+        """Forget rejected pairs (of one invoice, or all of them); returns how many were removed."""
+        where = RejectedPair.tenant_id == tenant_id
+        if invoice_id is not None:
+            where = and_(where, RejectedPair.invoice_id == invoice_id)
+        invoice_ids = sorted(set(self.db.scalars(select(RejectedPair.invoice_id).where(where))))
+        result = self.db.execute(delete(RejectedPair).where(where))
+        ChangeLogService(self.db).record(
+            tenant_id=tenant_id, entity=ChangeEntity.rejection, op=ChangeOp.deleted, entity_ids=invoice_ids
+        )
+        self.db.flush()
+        return result.rowcount
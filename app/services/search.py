@@ -0,0 +1,63 @@
+"""Description search over invoices and bank transactions.
+
+Tables with an FTS5 index (app/db/fts.py) are searched through it; on other engines the same
+calls fall back to LIKE, which scans the tenant's rows.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from sqlalchemy import ColumnElement, Select, column, literal_column, select, table
+from sqlalchemy.orm import Session
+
+from app.db.fts import fts_table, has_fts
+
+_WORD = re.compile(r"(\w+)(\*?)")
+
+
+def _words(term: str) -> list[tuple[str, bool]]:
+    return [(word.lower(), bool(star)) for word, star in _WORD.findall(term)]
+
+
+def contains_query(term: str) -> str | None:
+    """FTS5 query for a ``description_contains`` filter: the words as one phrase, the last a prefix."""
+    words = [word for word, _ in _words(term)]
+    return '"' + " ".join(words) + '"*' if words else None
+
+
+def search_query(q: str) -> str | None:
+    """FTS5 query for a search box: every word must occur, words ending in ``*`` as a prefix."""
+    words = _words(q)
+    return " ".join(f'"{word}"' + ("*" if star else "") for word, star in words) or None
+
+
+def _fts_hits(model: Any, query: str, *columns: str) -> Select:
+    fts = table(fts_table(model.__tablename__), column("rowid"), column("rank"))
+    return select(*(fts.c[name] for name in columns)).where(literal_column(fts.name).op("MATCH")(query))
+
+
+def description_contains(db: Session, model: Any, term: str) -> ColumnElement[bool]:
+    """Filter for rows whose description contains ``term`` (by words on the FTS path)."""
+    query = contains_query(term)
+    if query is not None and has_fts(db, model.__tablename__):
+        return model.id.in_(_fts_hits(model, query, "rowid"))
+    return model.description.ilike(f"%{term.lower()}%")
+
+
+def ranked_search(db: Session, stmt: Select, model: Any, q: str, *, limit: int) -> list[Any]:
+    """Up to ``limit`` rows of ``stmt`` whose description matches ``q``, best bm25 rank first.
+
+    The LIKE fallback has no relevance score and returns matches in id order.
+    """
+    query = search_query(q)
+    if query is None:
+        return []
+    if has_fts(db, model.__tablename__):
+        hits = _fts_hits(model, query, "rowid", "rank").subquery()
+        stmt = stmt.join(hits, hits.c.rowid == model.id).order_by(hits.c.rank, model.id)
+    else:
+        for word, _ in _words(q):
+            stmt = stmt.where(model.description.ilike(f"%{word}%"))
+        stmt = stmt.order_by(model.id)
+    return list(db.scalars(stmt.limit(limit)))
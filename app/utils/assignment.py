@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import heapq
+import time
+from dataclasses import dataclass
+
+# Scores are scaled to integers so the solver compares path costs exactly.
+_WEIGHT_SCALE = 10**9
+
+
+@dataclass(frozen=True)
+class AssignmentStats:
+    edges: int
+    components: int
+    largest_component: int  # edges
+    components_seconds: float
+    solve_seconds: float
+
+
+def connected_components(edges: list[tuple[int, int, float]]) -> list[list[int]]:
+    """Group edge positions by connected component of the invoice/transaction graph.
+
+    Components come out ordered by their first edge, edges keep their input order.
+    """
+    # Invoice ids map to even keys, transaction ids to odd keys.
+    parent: dict[int, int] = {}
+
+    def find(x: int) -> int:
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for inv, tx, _ in edges:
+        a, b = 2 * inv, 2 * tx + 1
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    groups: dict[int, list[int]] = {}
+    for pos, (inv, _, _) in enumerate(edges):
+        groups.setdefault(find(2 * inv), []).append(pos)
+    return list(groups.values())
+
+
+def max_weight_matching(edges: list[tuple[int, int, float]]) -> list[int]:
+    """Positions of a maximum-weight one-to-one matching over positive-weight edges.
+
+    Sparse Hungarian method: every invoice also gets a private zero-weight "unassigned"
+    column, invoices are added one at a time, and each is routed along the shortest
+    augmenting path (Dijkstra on reduced costs, stopping at the first free column), so a
+    step only touches the part of the graph it explores.
+    """
+    invs = sorted({inv for inv, _, _ in edges})
+    txs = sorted({tx for _, tx, _ in edges})
+    n_rows, n_cols = len(invs), len(txs)
+    row_of_inv = {inv: k for k, inv in enumerate(invs)}
+    col_of_tx = {tx: n_rows + k for k, tx in enumerate(txs)}
+    dummy = n_rows + n_cols  # row r's "unassigned" column is dummy + r
+
+    # Nodes: rows [0, n_rows), transaction columns, then one dummy column per row.
+    adj: list[list[tuple[int, int, int]]] = [[] for _ in range(n_rows)]
+    for pos, (inv, tx, w) in enumerate(edges):
+        adj[row_of_inv[inv]].append((col_of_tx[tx], -round(w * _WEIGHT_SCALE), pos))
+    for r in range(n_rows):
+        adj[r].sort()
+        adj[r].append((dummy + r, 0, -1))
+
+    n = dummy + n_rows
+    base = [0] * n  # node potentials, up to a shared constant
+    col_of_row = [-1] * n_rows
+    row_of_col = [-1] * n
+    pos_of_row = [-1] * n_rows
+
+    for r in range(n_rows):
+        # Start r with the smallest potential that keeps its reduced costs non-negative
+        # (c + base[r] - base[j] >= 0 on every edge, tight on the best one). Free columns,
+        # r's dummy included, all keep the initial potential 0: the search never settles a
+        # free column other than the one it augments to.
+        base[r] = max(base[j] - c for j, c, _ in adj[r])
+
+        dist = {r: 0}
+        prev: dict[int, tuple[int, int]] = {}
+        settled: list[int] = []
+        done: set[int] = set()
+        heap = [(0, r)]
+        target = -1
+        while heap:
+            d, x = heapq.heappop(heap)
+            if x in done:
+                continue
+            done.add(x)
+            settled.append(x)
+            if x < n_rows:
+                px = base[x]
+                for j, c, pos in adj[x]:
+                    if j == col_of_row[x]:
+                        continue
+                    nd = d + c + px - base[j]
+                    if nd < dist.get(j, nd + 1):
+                        dist[j] = nd
+                        prev[j] = (x, pos)
+                        heapq.heappush(heap, (nd, j))
+            else:
+                i = row_of_col[x]
+                if i < 0:
+                    target = x
+                    break
+                # Matched edges have zero reduced cost, so the owner row is reached at distance d.
+                if d < dist.get(i, d + 1):
+                    dist[i] = d
+                    prev[i] = (x, -1)
+                    heapq.heappush(heap, (d, i))
+
+        # Every potential rises by the path length; explored nodes by their own distance.
+        # Adding the same amount everywhere changes no reduced cost, so only they are touched.
+        top = dist[target]
+        for x in settled:
+            base[x] += dist[x] - top
+        j = target
+        while True:
+            i, pos = prev[j]
+            prev_col = col_of_row[i]
+            col_of_row[i] = j
+            row_of_col[j] = i
+            pos_of_row[i] = pos
+            if i == r:
+                break
+            j = prev_col
+
+    return sorted(pos for pos in pos_of_row if pos >= 0)
+
+
+def solve_assignment(edges: list[tuple[int, int, float]]) -> tuple[list[int], AssignmentStats]:
+    """Maximum-weight one-to-one assignment over (invoice id, transaction id, score) edges.
+
+    The graph is split into connected components, which are solved independently.
+    Returns the selected edge positions in input order.
+    """
+    t0 = time.perf_counter()
+    components = connected_components(edges)
+    t1 = time.perf_counter()
+
+    chosen: list[int] = []
+    for comp in components:
+        if len(comp) == 1:
+            chosen.extend(comp)
+            continue
+        chosen.extend(comp[k] for k in max_weight_matching([edges[pos] for pos in comp]))
+    t2 = time.perf_counter()
+
+    stats = AssignmentStats(
+        edges=len(edges),
+        components=len(components),
+        largest_component=max((len(c) for c in components), default=0),
+        components_seconds=t1 - t0,
+        solve_seconds=t2 - t1,
+    )
+    return sorted(chosen), stats
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import multiprocessing
+from collections.abc import Iterator, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.utils.reconcile import (
+    NO_DATE,
+    TEXT_SCORE_MAX,
+    ScoringColumns,
+    amount_date_scores,
+    amount_tolerance_cents,
+    text_scores,
+)
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class TransactionIndex:
+    """Per-run candidate index over a tenant's bank transactions.
+
+    A pair can only score above zero if the amounts fall in the tolerance band, the
+    dates fall in the window, or the descriptions share a token. The index answers each
+    of those three questions with a range scan or a postings lookup, so only pairs that
+    can still score are handed to the scorer.
+    """
+
+    def __init__(self, columns: ScoringColumns, *, amount_tolerance_ratio: float = 0.01) -> None:
+        self.columns = columns
+        self.amount_tolerance_ratio = amount_tolerance_ratio
+
+        self._amount_pos = np.argsort(columns.amount_cents, kind="stable")
+        self._amount_keys = columns.amount_cents[self._amount_pos]
+
+        self._date_pos = np.argsort(columns.date_ordinals, kind="stable")
+        self._date_keys = columns.date_ordinals[self._date_pos]
+
+        rows = np.repeat(np.arange(len(columns)), columns.token_counts)
+        order = np.argsort(columns.token_ids, kind="stable")
+        tokens, starts = np.unique(columns.token_ids[order], return_index=True)
+        self._postings = dict(zip(tokens.tolist(), np.split(rows[order], starts[1:]))) if len(tokens) else {}
+
+    def candidates(
+        self,
+        *,
+        amount_cents: int,
+        date_ordinal: int,
+        token_ids: np.ndarray,
+        date_window_days: int,
+    ) -> np.ndarray:
+        """Positions (ascending) of every transaction that may score above zero."""
+        parts = []
+
+        # Integer cents, so the band is exactly the scorer's tolerance.
+        tol = amount_tolerance_cents(amount_cents, self.amount_tolerance_ratio)
+        lo = int(np.searchsorted(self._amount_keys, amount_cents - tol, side="left"))
+        hi = int(np.searchsorted(self._amount_keys, amount_cents + tol, side="right"))
+        parts.append(self._amount_pos[lo:hi])
+
+        if date_ordinal != NO_DATE:
+            lo = int(np.searchsorted(self._date_keys, date_ordinal - date_window_days, side="left"))
+            hi = int(np.searchsorted(self._date_keys, date_ordinal + date_window_days, side="right"))
+            parts.append(self._date_pos[lo:hi])
+
+        for tok in token_ids.tolist():
+            parts.append(self._postings.get(tok, _EMPTY))
+
+        return np.unique(np.concatenate(parts))
+
+
+def top_candidates(ids: np.ndarray, scores: np.ndarray, k: int) -> list[tuple[int, float]]:
+    """The k best (transaction id, score) pairs with a positive score.
+
+    Highest score first; ties keep transaction id order. A partial selection keeps every
+    score tied with the k-th best, so only those are sorted.
+    """
+    keep = scores > 0.0
+    ids, scores = ids[keep], scores[keep]
+    if len(scores) > k:
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        keep = scores >= kth
+        ids, scores = ids[keep], scores[keep]
+    order = np.lexsort((ids, -scores))[:k]
+    return [(int(ids[j]), float(scores[j])) for j in order]
+
+
+def rank_pool(
+    invoice: ScoringColumns,
+    pool: ScoringColumns,
+    pool_ids: np.ndarray,
+    *,
+    k: int,
+    date_window_days: int,
+    eligible: np.ndarray | None = None,
+) -> list[tuple[int, float]]:
+    """Top-k of one invoice (a one-row ScoringColumns) against a pool of transactions.
+
+    Amount and date are scored for the whole pool first. Their sum is a lower bound on each
+    pair's total and, plus TEXT_SCORE_MAX, an upper bound; pairs whose upper bound is below
+    the k-th best lower bound cannot reach the top-k (not even on a tie) and are dropped
+    before text similarity is computed. ``eligible`` masks out pairs that may not be ranked.
+    """
+    amount, date = amount_date_scores(invoice, pool, date_window_days)
+    lower = amount[0] + date[0]
+    if eligible is not None:
+        lower = np.where(eligible, lower, -1.0)
+    survivors = lower >= 0.0
+    if np.count_nonzero(survivors) > k:
+        kth = np.partition(lower, len(lower) - k)[len(lower) - k]
+        survivors &= lower + TEXT_SCORE_MAX >= kth
+    positions = np.flatnonzero(survivors)
+    text = text_scores(invoice, pool.take(positions))[0]
+    total = np.minimum(lower[positions] + text, 1.0)
+    return top_candidates(pool_ids[positions], total, k)
+
+
+def rank_invoices(
+    inv_ids: Sequence[int],
+    inv_cols: ScoringColumns,
+    txn_ids: np.ndarray,
+    txn_cols: ScoringColumns,
+    *,
+    index: TransactionIndex | None,
+    k: int,
+    date_window_days: int,
+    rejected: Mapping[int, np.ndarray] | None = None,
+) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+    """Yield (invoice id, top-k (transaction id, score)) for each invoice, in order.
+
+    Without an index every transaction is scored. ``rejected`` maps invoice ids to the
+    transaction ids that may never be proposed for them.
+    """
+    for i, inv_id in enumerate(inv_ids):
+        if index is not None:
+            positions = index.candidates(
+                amount_cents=int(inv_cols.amount_cents[i]),
+                date_ordinal=int(inv_cols.date_ordinals[i]),
+                token_ids=inv_cols.tokens(i),
+                date_window_days=date_window_days,
+            )
+            pool, pool_ids = txn_cols.take(positions), txn_ids[positions]
+        else:
+            pool, pool_ids = txn_cols, txn_ids
+
+        eligible = _not_rejected(pool_ids, rejected, inv_id)
+        yield inv_id, rank_pool(inv_cols.take([i]), pool, pool_ids, k=k, date_window_days=date_window_days, eligible=eligible)
+
+
+def _not_rejected(pool_ids: np.ndarray, rejected: Mapping[int, np.ndarray] | None, inv_id: int) -> np.ndarray | None:
+    if not rejected or inv_id not in rejected:
+        return None
+    return ~np.isin(pool_ids, rejected[inv_id])
+
+
+def rank_prefiltered(
+    inv_ids: Sequence[int],
+    inv_cols: ScoringColumns,
+    txn_ids: np.ndarray,
+    txn_cols: ScoringColumns,
+    pools: Sequence[np.ndarray],
+    *,
+    k: int,
+    date_window_days: int,
+    rejected: Mapping[int, np.ndarray] | None = None,
+) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+    """rank_invoices over candidate pools found by a coarse prefilter (pools[i] are positions
+    into the transaction columns for invoice i).
+
+    Only pairs whose amount is within tolerance or whose date is within the window are
+    ranked; a pool may be a superset of those.
+    """
+    for i, inv_id in enumerate(inv_ids):
+        positions = pools[i]
+        pool = txn_cols.take(positions)
+        invoice = inv_cols.take([i])
+        inv_ord = int(inv_cols.date_ordinals[i])
+        in_window = (inv_ord != NO_DATE) & (np.abs(pool.date_ordinals - inv_ord) <= date_window_days)
+        in_band = np.abs(pool.amount_cents - int(inv_cols.amount_cents[i])) <= amount_tolerance_cents(int(inv_cols.amount_cents[i]))
+        eligible = in_band | in_window
+        not_rejected = _not_rejected(txn_ids[positions], rejected, inv_id)
+        if not_rejected is not None:
+            eligible &= not_rejected
+        yield inv_id, rank_pool(invoice, pool, txn_ids[positions], k=k, date_window_days=date_window_days, eligible=eligible)
+
+
+# Per-process transaction side of a sharded run, set once by the pool initializer.
+_shard_txns: tuple[np.ndarray, ScoringColumns, TransactionIndex | None] | None = None
+
+
+def _init_shard_worker(txn_ids: np.ndarray, txn_cols: ScoringColumns, use_index: bool) -> None:
+    global _shard_txns
+    _shard_txns = (txn_ids, txn_cols, TransactionIndex(txn_cols) if use_index else None)
+
+
+def _rank_shard(
+    inv_ids: list[int],
+    inv_cols: ScoringColumns,
+    k: int,
+    date_window_days: int,
+    rejected: dict[int, np.ndarray],
+) -> list[tuple[int, list[tuple[int, float]]]]:
+    assert _shard_txns is not None
+    txn_ids, txn_cols, index = _shard_txns
+    return list(
+        rank_invoices(inv_ids, inv_cols, txn_ids, txn_cols, index=index, k=k, date_window_days=date_window_days, rejected=rejected)
+    )
+
+
+def rank_invoices_sharded(
+    inv_ids: Sequence[int],
+    inv_cols: ScoringColumns,
+    txn_ids: np.ndarray,
+    txn_cols: ScoringColumns,
+    *,
+    use_index: bool,
+    k: int,
+    date_window_days: int,
+    workers: int,
+    shard_size: int,
+    rejected: Mapping[int, np.ndarray] | None = None,
+) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+    """rank_invoices over invoice shards scored in a process pool.
+
+    Each worker receives the transaction columns once (pool initializer) and builds its
+    own index; shards carry only invoice columns. Results are yielded in invoice order,
+    so the output is identical to the serial path.
+    """
+    bounds = [(lo, min(lo + shard_size, len(inv_ids))) for lo in range(0, len(inv_ids), shard_size)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        # spawn: workers must not inherit the parent's threads or DB connections
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_shard_worker,
+        initargs=(txn_ids, txn_cols, use_index),
+    ) as pool:
+        rejected = rejected or {}
+        futures = [
+            pool.submit(
+                _rank_shard,
+                list(inv_ids[lo:hi]),
+                inv_cols.take(np.arange(lo, hi)),
+                k,
+                date_window_days,
+                {inv_id: rejected[inv_id] for inv_id in inv_ids[lo:hi] if inv_id in rejected},
+            )
+            for lo, hi in bounds
+        ]
+        for future in futures:
+            yield from future.result()
@@ -0,0 +1,53 @@
+"""JSON encoding of plain row tuples, for list responses that skip the pydantic models.
+
+The output is byte-for-byte what FastAPI renders for the same values through a response model:
+compact separators, UTF-8 text, ``Decimal`` amounts as floats, enums as their values and
+datetimes in ISO 8601 with ``Z`` for UTC. orjson is used when it is installed, the standard
+library otherwise.
+"""
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from itertools import islice
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+CHUNK_ROWS = 1000
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, datetime):
+        text = obj.isoformat()
+        return text[:-6] + "Z" if obj.utcoffset() == timedelta(0) else text
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(obj, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def iter_json_array(fields: Sequence[str], rows: Iterable[Sequence[Any]], *, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """``rows`` as a JSON array of objects keyed by ``fields``, encoded ``chunk_rows`` rows at a time."""
+    yield b"["
+    it = iter(rows)
+    sep = b""
+    while batch := list(islice(it, chunk_rows)):
+        yield sep + dumps([dict(zip(fields, row)) for row in batch])[1:-1]
+        sep = b","
+    yield b"]"
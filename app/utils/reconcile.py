@@ -1,27 +1,76 @@
 from __future__ import annotations
 
+from collections.abc import Iterable, Sequence
+import hashlib
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
 
 
 def _norm(s: str | None) -> str:
     return (s or "").lower().strip()
 
 
+def tokenize(s: str | None) -> set[str]:
+    return set(_norm(s).split())
+
+
 def token_jaccard(a: str | None, b: str | None) -> float:
-    ta = set(_norm(a).split())
-    tb = set(_norm(b).split())
+    ta = tokenize(a)
+    tb = tokenize(b)
     if not ta or not tb:
         return 0.0
     return len(ta & tb) / len(ta | tb)
 
 
+def token_signature(s: str | None) -> bytes:
+    """Sorted, de-duplicated 64-bit token hashes, packed little-endian.
+
+    Stored on invoices and bank transactions at insert time so scoring never re-tokenizes.
+    """
+    hashes = {int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little", signed=True) for tok in tokenize(s)}
+    return np.asarray(sorted(hashes), dtype="<i8").tobytes()
+
+
+def signature_tokens(sig: bytes) -> np.ndarray:
+    return np.frombuffer(sig, dtype="<i8")
+
+
+def signature_jaccard(a: bytes, b: bytes) -> float:
+    ta = signature_tokens(a)
+    tb = signature_tokens(b)
+    if not len(ta) or not len(tb):
+        return 0.0
+    inter = len(np.intersect1d(ta, tb, assume_unique=True))
+    return inter / (len(ta) + len(tb) - inter)
+
+
 def date_distance_days(inv_date: date | None, posted_at: datetime) -> int | None:
     if inv_date is None:
         return None
     return abs((posted_at.date() - inv_date).days)
 
 
+def to_cents(amount: float | Decimal) -> int:
+    """Decimal amount -> integer minor units (cents)."""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_cents(cents: int) -> str:
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+
+def amount_tolerance_cents(amount_cents: int, amount_tolerance_ratio: float = 0.01) -> int:
+    """Largest difference in cents that still counts as a close amount (at least one cent).
+
+    The ratio is taken in whole basis points so the band is exact integer arithmetic.
+    """
+    return max(amount_cents * round(amount_tolerance_ratio * 10_000) // 10_000, 1)
+
+
 @dataclass(frozen=True)
 class ScoreBreakdown:
     amount_score: float
@@ -31,14 +80,16 @@ class ScoreBreakdown:
 
 
 def compute_score(
-    invoice_amount: float,
+    invoice_amount_cents: int,
     invoice_date: date | None,
     invoice_desc: str | None,
-    txn_amount: float,
+    txn_amount_cents: int,
     txn_posted_at: datetime,
     txn_desc: str | None,
     date_window_days: int = 3,
     amount_tolerance_ratio: float = 0.01,
+    invoice_tokens: bytes | None = None,
+    txn_tokens: bytes | None = None,
 ) -> ScoreBreakdown:
     """Deterministic scoring. Total ranges 0..1.
 
@@ -46,16 +97,18 @@ def compute_score(
     - Amount: up to 0.60
     - Date proximity: up to 0.20
     - Text similarity: up to 0.20
+
+    Amounts are integer cents. When both token signatures are given, text similarity
+    compares them instead of re-tokenizing the descriptions.
     """
 
     # Amount
     amount_score = 0.0
-    if abs(float(invoice_amount) - float(txn_amount)) < 0.005:
+    diff = abs(invoice_amount_cents - txn_amount_cents)
+    if diff == 0:
         amount_score = 0.60
-    else:
-        tol = max(float(invoice_amount) * amount_tolerance_ratio, 0.01)
-        if abs(float(invoice_amount) - float(txn_amount)) <= tol:
-            amount_score = 0.40
+    elif diff <= amount_tolerance_cents(invoice_amount_cents, amount_tolerance_ratio):
+        amount_score = 0.40
 
     # Date
     date_score = 0.0
@@ -65,8 +118,148 @@ def compute_score(
         date_score = 0.20 * (1.0 - (dd / max(date_window_days, 1)))
 
     # Text
-    sim = token_jaccard(invoice_desc, txn_desc)
+    if invoice_tokens is not None and txn_tokens is not None:
+        sim = signature_jaccard(invoice_tokens, txn_tokens)
+    else:
+        sim = token_jaccard(invoice_desc, txn_desc)
     text_score = 0.20 * min(sim, 1.0)
 
     total = min(amount_score + date_score + text_score, 1.0)
     return ScoreBreakdown(amount_score=amount_score, date_score=date_score, text_score=text_score, total=total)
+
+
+# ---------------------------
+# Batch scoring (columnar, NumPy)
+# ---------------------------
+
+NO_DATE = -1  # date ordinal placeholder; real ordinals start at 1
+
+
+@dataclass(frozen=True)
+class ScoringColumns:
+    """One side of the scoring problem as parallel arrays.
+
+    Row i's token ids (from its token signature) are ``token_ids[token_offsets[i]:token_offsets[i + 1]]``.
+    """
+
+    amount_cents: np.ndarray
+    date_ordinals: np.ndarray
+    token_ids: np.ndarray
+    token_offsets: np.ndarray
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[tuple[int, date | datetime | None, bytes]],
+    ) -> ScoringColumns:
+        """Build columns from (amount in cents, date or datetime, token signature) rows."""
+        cents: list[int] = []
+        ordinals: list[int] = []
+        signatures: list[bytes] = []
+        for amount_cents, day, sig in rows:
+            cents.append(amount_cents)
+            if isinstance(day, datetime):
+                day = day.date()
+            ordinals.append(day.toordinal() if day is not None else NO_DATE)
+            signatures.append(sig)
+        offsets = np.zeros(len(signatures) + 1, dtype=np.int64)
+        np.cumsum([len(sig) // 8 for sig in signatures], out=offsets[1:])
+        return cls(
+            amount_cents=np.asarray(cents, dtype=np.int64),
+            date_ordinals=np.asarray(ordinals, dtype=np.int64),
+            token_ids=signature_tokens(b"".join(signatures)).astype(np.int64),
+            token_offsets=offsets,
+        )
+
+    def __len__(self) -> int:
+        return len(self.amount_cents)
+
+    @property
+    def token_counts(self) -> np.ndarray:
+        return np.diff(self.token_offsets)
+
+    def tokens(self, i: int) -> np.ndarray:
+        return self.token_ids[self.token_offsets[i] : self.token_offsets[i + 1]]
+
+    def take(self, positions: Sequence[int] | np.ndarray) -> ScoringColumns:
+        positions = np.asarray(positions, dtype=np.int64)
+        counts = self.token_counts[positions]
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        # Flat gather index: for each selected row, its start offset followed by consecutive positions.
+        flat = np.repeat(self.token_offsets[:-1][positions] - offsets[:-1], counts) + np.arange(offsets[-1])
+        return ScoringColumns(
+            amount_cents=self.amount_cents[positions],
+            date_ordinals=self.date_ordinals[positions],
+            token_ids=self.token_ids[flat],
+            token_offsets=offsets,
+        )
+
+
+@dataclass(frozen=True)
+class BatchScores:
+    """Score components shaped (invoices, transactions)."""
+
+    amount_score: np.ndarray
+    date_score: np.ndarray
+    text_score: np.ndarray
+    total: np.ndarray
+
+
+def score_batch(
+    invoices: ScoringColumns,
+    txns: ScoringColumns,
+    date_window_days: int = 3,
+    amount_tolerance_ratio: float = 0.01,
+) -> BatchScores:
+    """Vectorized compute_score for a block of invoices against many transactions.
+
+    Every operation mirrors compute_score in the same order and precision, so each cell
+    equals the scalar result exactly; compute_score stays the reference implementation.
+    """
+    amount_score, date_score = amount_date_scores(invoices, txns, date_window_days, amount_tolerance_ratio)
+    text_score = text_scores(invoices, txns)
+    total = np.minimum(amount_score + date_score + text_score, 1.0)
+    return BatchScores(amount_score=amount_score, date_score=date_score, text_score=text_score, total=total)
+
+
+# Largest text component; amount + date + TEXT_SCORE_MAX bounds a pair's total from above.
+TEXT_SCORE_MAX = 0.20
+
+
+def amount_date_scores(
+    invoices: ScoringColumns,
+    txns: ScoringColumns,
+    date_window_days: int = 3,
+    amount_tolerance_ratio: float = 0.01,
+) -> tuple[np.ndarray, np.ndarray]:
+    """The cheap score components (amount, date), each shaped (invoices, transactions)."""
+    # Amount (integer cents, same band as amount_tolerance_cents)
+    inv_amt = invoices.amount_cents[:, None]
+    diff = np.abs(inv_amt - txns.amount_cents[None, :])
+    tol = np.maximum(inv_amt * round(amount_tolerance_ratio * 10_000) // 10_000, 1)
+    amount_score = np.where(diff == 0, 0.60, np.where(diff <= tol, 0.40, 0.0))
+
+    # Date
+    inv_ord = invoices.date_ordinals[:, None]
+    dd = np.abs(txns.date_ordinals[None, :] - inv_ord)
+    in_window = (inv_ord != NO_DATE) & (dd <= date_window_days)
+    date_score = np.where(in_window, 0.20 * (1.0 - (dd / max(date_window_days, 1))), 0.0)
+    return amount_score, date_score
+
+
+def text_scores(invoices: ScoringColumns, txns: ScoringColumns) -> np.ndarray:
+    """The text component (token Jaccard of the signatures), shaped (invoices, transactions)."""
+    txn_counts = txns.token_counts
+    row_of_token = np.repeat(np.arange(len(txns)), txn_counts)
+    inter = np.zeros((len(invoices), len(txns)), dtype=np.int64)
+    for i in range(len(invoices)):
+        inv_tokens = invoices.tokens(i)
+        if len(inv_tokens):
+            hits = np.isin(txns.token_ids, inv_tokens)
+            inter[i] = np.bincount(row_of_token[hits], minlength=len(txns))
+    inv_counts = invoices.token_counts[:, None]
+    union = inv_counts + txn_counts[None, :] - inter
+    both = (inv_counts > 0) & (txn_counts[None, :] > 0)
+    sim = np.divide(inter, union, out=np.zeros(union.shape), where=both)
+    return TEXT_SCORE_MAX * np.minimum(sim, 1.0)
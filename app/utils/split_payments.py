@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import bisect
+from collections.abc import Collection, Iterator, Sequence
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+
+from app.utils.reconcile import NO_DATE, ScoringColumns, amount_tolerance_cents, score_batch
+
+
+class WorkLimitExceeded(Exception):
+    pass
+
+
+def _subset_sums(
+    items: Sequence[tuple[int, int]], max_size: int, budget: list[int]
+) -> Iterator[tuple[int, tuple[int, ...]]]:
+    """(sum, positions) for every subset of ``items`` ((position, amount) pairs) up to max_size."""
+    for size in range(max_size + 1):
+        for combo in combinations(items, size):
+            budget[0] -= 1
+            if budget[0] < 0:
+                raise WorkLimitExceeded
+            yield sum(amount for _, amount in combo), tuple(pos for pos, _ in combo)
+
+
+def find_split(
+    target_cents: int,
+    amounts: Sequence[int],
+    *,
+    tolerance_cents: int,
+    max_items: int = 4,
+    max_work: int = 20_000,
+    budget: list[int] | None = None,
+) -> tuple[int, ...] | None:
+    """Positions of 2..max_items amounts whose sum is within tolerance of the target.
+
+    Meet in the middle: subset sums of each half are enumerated (sizes bounded by
+    max_items) and one side is binary-searched for the complement. Prefers the sum closest
+    to the target, then fewer items, then lower positions. Every subset generated and
+    every complement probed costs one unit of work; past ``max_work`` the search gives up
+    and returns None. A ``budget`` ([remaining work]) replaces ``max_work`` and is drawn
+    down in place, so several searches can share one limit.
+    """
+    items = list(enumerate(amounts))
+    half = len(items) // 2
+    if budget is None:
+        budget = [max_work]
+    try:
+        right = sorted(_subset_sums(items[half:], max_items, budget))
+        right_sums = [s for s, _ in right]
+        best: tuple[int, int, tuple[int, ...]] | None = None
+        for left_sum, left_pos in _subset_sums(items[:half], max_items, budget):
+            lo = bisect.bisect_left(right_sums, target_cents - tolerance_cents - left_sum)
+            hi = bisect.bisect_right(right_sums, target_cents + tolerance_cents - left_sum)
+            for right_sum, right_pos in right[lo:hi]:
+                budget[0] -= 1
+                if budget[0] < 0:
+                    raise WorkLimitExceeded
+                size = len(left_pos) + len(right_pos)
+                if not 2 <= size <= max_items:
+                    continue
+                key = (abs(left_sum + right_sum - target_cents), size, tuple(sorted(left_pos + right_pos)))
+                if best is None or key < best:
+                    best = key
+    except WorkLimitExceeded:
+        return None
+    return best[2] if best is not None else None
+
+
+@dataclass(frozen=True)
+class SplitProposal:
+    bank_transaction_id: int
+    invoice_ids: tuple[int, ...]
+    score: float
+
+
+def split_score(inv_cols: ScoringColumns, txn_cols: ScoringColumns, date_window_days: int) -> float:
+    """Score of one transaction (txn_cols, one row) against a group of invoices.
+
+    Amount compares the group's sum (0.60 exact, 0.40 within tolerance); date and text
+    are the members' mean date and text scores, so the total stays within 0..1.
+    """
+    scores = score_batch(inv_cols, txn_cols, date_window_days=date_window_days)
+    target = int(txn_cols.amount_cents[0])
+    amount_score = 0.60 if int(inv_cols.amount_cents.sum()) == target else 0.40
+    return min(amount_score + float(scores.date_score.mean()) + float(scores.text_score.mean()), 1.0)
+
+
+def propose_splits(
+    inv_ids: Sequence[int],
+    inv_keys: Sequence[tuple[str, int | None]],
+    inv_cols: ScoringColumns,
+    txn_ids: Sequence[int],
+    txn_currencies: Sequence[str],
+    txn_cols: ScoringColumns,
+    *,
+    date_window_days: int,
+    max_items: int,
+    max_candidates: int,
+    max_work: int,
+    rejected: Collection[tuple[int, int]] = frozenset(),
+) -> Iterator[SplitProposal]:
+    """The best many-to-one invoice group for each transaction that has one.
+
+    Invoices are keyed by (currency, vendor id); a group never mixes keys, and invoices
+    without a vendor form the tenant's own pool. Candidates are a key's dated invoices
+    within the date window and below the transaction amount, the ``max_candidates``
+    closest in date, minus (invoice id, transaction id) pairs in ``rejected``. find_split
+    runs per key, and all keys of a transaction share one ``max_work`` budget, so a
+    transaction with many vendors costs no more than one with a single vendor.
+    """
+    order = np.lexsort((np.asarray(inv_ids, dtype=np.int64), inv_cols.date_ordinals))
+    dated = order[inv_cols.date_ordinals[order] != NO_DATE]
+    ordinals = inv_cols.date_ordinals[dated]
+
+    for j, tx_id in enumerate(txn_ids):
+        target = int(txn_cols.amount_cents[j])
+        posted = int(txn_cols.date_ordinals[j])
+        lo = int(np.searchsorted(ordinals, posted - date_window_days, side="left"))
+        hi = int(np.searchsorted(ordinals, posted + date_window_days, side="right"))
+
+        pools: dict[tuple[str, int | None], list[int]] = {}
+        for pos in dated[lo:hi].tolist():
+            key = inv_keys[pos]
+            if key[0] == txn_currencies[j] and int(inv_cols.amount_cents[pos]) < target and (inv_ids[pos], tx_id) not in rejected:
+                pools.setdefault(key, []).append(pos)
+
+        best: SplitProposal | None = None
+        tol = amount_tolerance_cents(target)
+        txn_row = txn_cols.take([j])
+        budget = [max_work]
+        for key in sorted(pools, key=lambda k: (k[1] is None, k[1] or 0)):
+            if budget[0] <= 0:
+                break
+            pool = sorted(pools[key], key=lambda p: (abs(int(inv_cols.date_ordinals[p]) - posted), inv_ids[p]))[:max_candidates]
+            found = find_split(
+                target, [int(inv_cols.amount_cents[p]) for p in pool], tolerance_cents=tol, max_items=max_items, budget=budget
+            )
+            if found is None:
+                continue
+            members = sorted(pool[k] for k in found)
+            score = split_score(inv_cols.take(members), txn_row, date_window_days)
+            if best is None or score > best.score:
+                best = SplitProposal(bank_transaction_id=tx_id, invoice_ids=tuple(inv_ids[p] for p in members), score=score)
+        if best is not None:
+            yield best
@@ -0,0 +1,251 @@
+"""Streaming readers for bank statement formats.
+
+Each reader takes the statement as an iterable of byte chunks and yields (position, fields)
+records shaped like BankTransactionIn, one per incoming payment, without holding the file:
+CAMT.053 goes through an incremental XML parser that drops each entry once read, MT940 is read
+line by line and OFX tag by tag. Outgoing payments (debits) are skipped, because only credits
+can settle invoices.
+"""
+from __future__ import annotations
+
+import codecs
+import re
+import xml.etree.ElementTree as ET
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from typing import Any
+
+from app.utils.statement_stream import MAX_LINE_LENGTH, StatementFormatError, iter_lines
+
+Record = tuple[int, dict[str, Any]]
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child(elem: ET.Element | None, *path: str) -> ET.Element | None:
+    for name in path:
+        if elem is None:
+            return None
+        elem = next((c for c in elem if _local(c.tag) == name), None)
+    return elem
+
+
+def _text(elem: ET.Element | None, *path: str) -> str | None:
+    found = _child(elem, *path)
+    if found is None or found.text is None:
+        return None
+    return found.text.strip() or None
+
+
+def _camt_entry(entry: ET.Element) -> dict[str, Any] | None:
+    if _text(entry, "CdtDbtInd") != "CRDT":
+        return None
+    amount = _child(entry, "Amt")
+    posted = next(
+        filter(None, (_text(entry, d, "DtTm") or _text(entry, d, "Dt") for d in ("BookgDt", "ValDt"))),
+        None,
+    )
+    remittance = [(e.text or "").strip() for e in entry.iter() if _local(e.tag) == "Ustrd"]
+    description = " ".join(r for r in remittance if r) or _text(entry, "AddtlNtryInf")
+    return {
+        "external_id": _text(entry, "AcctSvcrRef") or _text(entry, "NtryRef"),
+        "posted_at": posted,
+        "amount": amount.text.strip() if amount is not None and amount.text else None,
+        "currency": amount.get("Ccy") if amount is not None else None,
+        "description": description,
+    }
+
+
+def iter_camt053_records(chunks: Iterable[bytes]) -> Iterator[Record]:
+    """(entry number, fields) for each credit ``Ntry`` of a CAMT.053 (any version) statement.
+
+    The external id is the entry's AcctSvcrRef (else NtryRef), the date its booking date (else
+    value date) and the description its unstructured remittance lines (else AddtlNtryInf).
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack: list[ET.Element] = []
+    n = 0
+
+    def drain() -> Iterator[Record]:
+        nonlocal n
+        for event, elem in parser.read_events():
+            if event == "start":
+                stack.append(elem)
+                continue
+            stack.pop()
+            if _local(elem.tag) != "Ntry":
+                continue
+            n += 1
+            fields = _camt_entry(elem)
+            # Detach the entry so the tree never grows past one entry.
+            if stack:
+                stack[-1].remove(elem)
+            if fields is not None:
+                yield n, {k: v for k, v in fields.items() if v is not None}
+
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from drain()
+        parser.close()
+        yield from drain()
+    except ET.ParseError as e:
+        raise StatementFormatError(f"invalid XML ({e})") from None
+
+
+# :61: value date (YYMMDD), optional entry date (MMDD), mark (C, D, RC, RD), optional funds
+# code, amount with a decimal comma, transaction type (e.g. NTRF), reference [//bank reference].
+_MT940_61 = re.compile(
+    r"(?P<date>\d{6})(?:\d{4})?(?P<mark>R?[CD])[A-Z]?(?P<amount>\d+,\d*)"
+    r"[NFS][A-Z0-9]{3}(?P<ref>[^/]*?)(?://(?P<bank_ref>.*))?$"
+)
+_MT940_TAG = re.compile(r"^:(?P<tag>\d{2}[A-Z]?):(?P<value>.*)$")
+
+
+def iter_mt940_records(chunks: Iterable[bytes]) -> Iterator[Record]:
+    """(line number of the ``:61:`` field, fields) for each credit statement line of an MT940 file.
+
+    The currency comes from the statement's opening balance (``:60F:``/``:60M:``), the external id
+    is the bank reference (else the customer reference, unless NONREF) and the description the
+    following ``:86:`` field.
+    """
+    currency: str | None = None
+    current: tuple[int, dict[str, Any]] | None = None
+    info: list[str] | None = None
+
+    def finish() -> Iterator[Record]:
+        nonlocal current, info
+        if current is not None:
+            line_no, fields = current
+            if info:
+                fields["description"] = " ".join(part.strip() for part in info if part.strip()) or None
+            yield line_no, {k: v for k, v in fields.items() if v is not None}
+        current, info = None, None
+
+    for line_no, raw in enumerate(iter_lines(chunks), start=1):
+        line = raw.rstrip("\r\n")
+        m = _MT940_TAG.match(line)
+        if m is None:
+            if line.startswith("-"):
+                # End of a message block.
+                yield from finish()
+            elif info is not None:
+                info.append(line)
+            continue
+        tag, value = m.group("tag"), m.group("value")
+        if tag in ("60F", "60M"):
+            yield from finish()
+            currency = value[7:10] if len(value) >= 10 else None
+        elif tag == "61":
+            yield from finish()
+            s = _MT940_61.match(value)
+            if s is None:
+                raise StatementFormatError(f"line {line_no}: unreadable :61: field")
+            if s.group("mark") not in ("C", "RD"):
+                continue
+            ref = s.group("ref").strip()
+            bank_ref = (s.group("bank_ref") or "").strip()
+            d = s.group("date")
+            current = (
+                line_no,
+                {
+                    "external_id": bank_ref or (ref if ref and ref != "NONREF" else None),
+                    "posted_at": f"20{d[:2]}-{d[2:4]}-{d[4:6]}T00:00:00",
+                    "amount": s.group("amount").replace(",", ".").rstrip("."),
+                    "currency": currency,
+                },
+            )
+        elif tag == "86" and current is not None:
+            info = [value]
+        else:
+            yield from finish()
+    yield from finish()
+
+
+_OFX_DATE = re.compile(r"(\d{4})(\d{2})(\d{2})(?:(\d{2})(\d{2})(\d{2})?)?")
+
+
+def _ofx_date(value: str) -> str | None:
+    m = _OFX_DATE.match(value)
+    if m is None:
+        return None
+    y, mo, d, h, mi, s = (int(g) if g else 0 for g in m.groups())
+    return datetime(y, mo, d, h, mi, s).isoformat()
+
+
+def _ofx_tokens(chunks: Iterable[bytes], *, max_length: int = MAX_LINE_LENGTH) -> Iterator[tuple[str, str]]:
+    """(tag, text after it) pairs of an OFX 1.x (SGML) or 2.x (XML) document.
+
+    Raises StatementFormatError for an element (tag and text) longer than ``max_length`` characters.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    # For the partial element kept in ``pending``: where its tag closes (-1 if not seen yet),
+    # and how far it was already searched, so the next chunk only searches the new text.
+    close, scanned = -1, 0
+
+    def split(final: bool) -> Iterator[tuple[str, str]]:
+        nonlocal pending, close, scanned
+        start = pending.find("<")
+        while start != -1:
+            if close == -1:
+                close = pending.find(">", max(start, scanned))
+            nxt = pending.find("<", max(close + 1, scanned)) if close != -1 else -1
+            if nxt == -1 and not (final and close != -1):
+                break
+            end = nxt if nxt != -1 else len(pending)
+            yield pending[start + 1 : close].strip(), pending[close + 1 : end].strip()
+            start, close, scanned = nxt, -1, 0
+        if start == -1:
+            pending, close, scanned = "", -1, 0
+            return
+        pending, scanned = pending[start:], len(pending) - start
+        if close != -1:
+            close -= start
+        if len(pending) > max_length:
+            raise StatementFormatError(f"OFX element longer than {max_length} characters")
+
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        yield from split(final=False)
+    pending += decoder.decode(b"", final=True)
+    yield from split(final=True)
+
+
+def iter_ofx_records(chunks: Iterable[bytes]) -> Iterator[Record]:
+    """(transaction number, fields) for each credit ``STMTTRN`` of an OFX statement.
+
+    The external id is FITID, the currency the statement's CURDEF and the description
+    NAME and MEMO joined.
+    """
+    currency: str | None = None
+    txn: dict[str, str] | None = None
+    n = 0
+    for tag, value in _ofx_tokens(chunks):
+        tag = tag.upper()
+        if tag == "CURDEF":
+            currency = value
+        elif tag == "STMTTRN":
+            txn = {}
+        elif tag == "/STMTTRN" and txn is not None:
+            n += 1
+            amount = txn.get("TRNAMT", "").replace(",", ".")
+            if amount and not amount.startswith("-"):
+                try:
+                    posted = _ofx_date(txn.get("DTPOSTED", ""))
+                except ValueError:
+                    # Digits that are no date, e.g. month 13.
+                    raise StatementFormatError(f"transaction {n}: invalid DTPOSTED") from None
+                fields = {
+                    "external_id": txn.get("FITID"),
+                    "posted_at": posted,
+                    "amount": amount.lstrip("+"),
+                    "currency": currency,
+                    "description": " ".join(filter(None, (txn.get("NAME"), txn.get("MEMO")))) or None,
+                }
+                yield n, {k: v for k, v in fields.items() if v is not None}
+            txn = None
+        elif txn is not None and not tag.startswith("/") and value:
+            txn[tag] = value
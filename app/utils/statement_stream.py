@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+CSV_COLUMNS = ("external_id", "posted_at", "amount", "currency", "description")
+# Longest line (or OFX element) held while waiting for its end; past it the file is rejected.
+MAX_LINE_LENGTH = 1 << 20
+
+
+class StatementFormatError(ValueError):
+    pass
+
+
+def iter_lines(chunks: Iterable[bytes], *, max_line_length: int = MAX_LINE_LENGTH) -> Iterator[str]:
+    """Decode UTF-8 byte chunks into lines (newline kept), holding at most one partial line.
+
+    Raises StatementFormatError for a line longer than ``max_line_length`` characters.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    n = 0
+
+    def check(length: int) -> None:
+        if length > max_line_length:
+            raise StatementFormatError(f"line {n + 1}: longer than {max_line_length} characters")
+
+    for chunk in chunks:
+        # The partial line kept from the last chunk has no newline; only the new text is searched.
+        start, scanned = 0, len(pending)
+        pending += decoder.decode(chunk)
+        while (end := pending.find("\n", scanned)) != -1:
+            check(end + 1 - start)
+            yield pending[start : end + 1]
+            n += 1
+            start = scanned = end + 1
+        pending = pending[start:]
+        check(len(pending))
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        check(len(pending))
+        yield pending
+
+
+def iter_ndjson_records(chunks: Iterable[bytes]) -> Iterator[tuple[int, Any]]:
+    """(line number, decoded value) for each non-blank NDJSON line."""
+    for n, line in enumerate(iter_lines(chunks), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield n, json.loads(line)
+        except json.JSONDecodeError as e:
+            raise StatementFormatError(f"line {n}: invalid JSON ({e.msg})") from None
+
+
+def iter_csv_records(chunks: Iterable[bytes]) -> Iterator[tuple[int, dict[str, str]]]:
+    """(line number, row) for each CSV record; the header names the columns (see CSV_COLUMNS).
+
+    Empty cells are left out, so the field takes its default. Quoted fields may span lines.
+    """
+    reader = csv.reader(iter_lines(chunks))
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [h.strip() for h in header]
+    unknown = set(header) - set(CSV_COLUMNS)
+    if unknown:
+        raise StatementFormatError(f"unknown CSV columns: {', '.join(sorted(unknown))}")
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) != len(header):
+            raise StatementFormatError(f"line {reader.line_num}: expected {len(header)} fields, got {len(row)}")
+        yield reader.line_num, {h: cell for h, cell in zip(header, row) if cell != ""}
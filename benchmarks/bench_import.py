@@ -0,0 +1,107 @@
+"""Bank transaction import throughput (rows/sec).
+
+    python -m benchmarks.bench_import [--sizes 1000 10000 100000] [--duplicates 0.1]
+
+"row" is the former path (one INSERT ... ON CONFLICT DO NOTHING per transaction, id from
+lastrowid). "chunked" is BankTransactionService.import_transactions, which inserts
+IMPORT_CHUNK_SIZE rows per INSERT ... RETURNING. A ``--duplicates`` share of the statement
+repeats earlier external ids, so both paths also skip rows. Each run uses a fresh SQLite
+file database.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models import models  # noqa: F401  (ensure models are imported)
+from app.models.models import BankTransaction, Tenant
+from app.schemas.bank_transaction import BankTransactionIn
+from app.services.bank_transactions import BankTransactionService
+from app.utils.reconcile import to_cents, token_signature
+
+
+def statement(n: int, duplicates: float) -> list[BankTransactionIn]:
+    rng = random.Random(n)
+    base = datetime(2026, 1, 1)
+    words = ["acme", "widget", "payment", "rent", "hosting", "ltd"]
+    rows = []
+    for i in range(n):
+        ext = f"x{rng.randrange(i)}" if i and rng.random() < duplicates else f"x{i}"
+        rows.append(
+            BankTransactionIn(
+                external_id=ext,
+                posted_at=base + timedelta(minutes=i),
+                amount=round(rng.uniform(1, 5000), 2),
+                description=" ".join(rng.sample(words, 2)),
+            )
+        )
+    return rows
+
+
+def run_row(db: Session, tenant_id: int, transactions: list[BankTransactionIn]) -> int:
+    inserted = 0
+    for t in transactions:
+        values = {
+            "tenant_id": tenant_id,
+            "external_id": t.external_id,
+            "posted_at": t.posted_at,
+            "amount": t.amount,
+            "amount_cents": to_cents(t.amount),
+            "currency": t.currency,
+            "description": t.description,
+            "description_tokens": token_signature(t.description),
+        }
+        res = db.execute(sqlite_insert(BankTransaction).values(**values).on_conflict_do_nothing(index_elements=["tenant_id", "external_id"]))
+        if res.rowcount == 1 and res.lastrowid is not None:
+            inserted += 1
+    return inserted
+
+
+def run_chunked(db: Session, tenant_id: int, transactions: list[BankTransactionIn]) -> int:
+    out = BankTransactionService(db).import_transactions(tenant_id=tenant_id, transactions=transactions, idempotency_key="bench")
+    return out["inserted"]
+
+
+def bench(n: int, duplicates: float) -> dict[str, float]:
+    transactions = statement(n, duplicates)
+    results, counts = {}, set()
+    for name, fn in (("row", run_row), ("chunked", run_chunked)):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite+pysqlite:///{Path(tmp) / 'bench.db'}")
+            Base.metadata.create_all(engine)
+            with Session(engine, expire_on_commit=False, autoflush=False) as db:
+                tenant = Tenant(name="bench")
+                db.add(tenant)
+                db.commit()
+                t0 = time.perf_counter()
+                counts.add(fn(db, tenant.id, transactions))
+                db.commit()
+                results[name] = n / (time.perf_counter() - t0)
+            engine.dispose()
+    assert len(counts) == 1
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of lines repeating an earlier external id")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'row rows/s':>12} {'chunked rows/s':>15} {'speedup':>8}")
+    for n in args.sizes:
+        r = bench(n, args.duplicates)
+        print(f"{n:>8} {r['row']:>12,.0f} {r['chunked']:>15,.0f} {r['chunked'] / r['row']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
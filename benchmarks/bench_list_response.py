@@ -0,0 +1,96 @@
+"""List endpoint latency (ms) for large responses: response-model path vs the row path.
+
+    python -m benchmarks.bench_list_response [--sizes 10000 50000] [--repeat 5]
+
+"model" is the former route body: ORM objects from list_transactions, validated through
+``list[BankTransactionOut]`` (from_attributes) and dumped to JSON, as FastAPI does for a
+``response_model``. "rows" is list_transaction_rows plus iter_json_array, the path the
+``GET .../bank-transactions`` route now takes. Both produce the same bytes; times are medians
+over a SQLite file database.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models import models  # noqa: F401  (ensure models are imported)
+from app.models.models import BankTransaction, Tenant
+from app.schemas.bank_transaction import BankTransactionOut
+from app.services.bank_transactions import BankTransactionService
+from app.utils.fast_json import iter_json_array
+
+ADAPTER = TypeAdapter(list[BankTransactionOut])
+FIELDS = list(BankTransactionOut.model_fields)
+
+
+def median_ms(fn: Callable[[], bytes], repeat: int) -> tuple[float, bytes]:
+    out = fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'model ms':>9} {'rows ms':>8} {'speedup':>8}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite+pysqlite:///{Path(tmp) / 'bench.db'}")
+            Base.metadata.create_all(engine)
+            with Session(engine, expire_on_commit=False) as db:
+                db.add(Tenant(id=1, name="bench"))
+                db.flush()
+                base = datetime(2026, 1, 1)
+                db.execute(
+                    insert(BankTransaction),
+                    [
+                        {
+                            "tenant_id": 1,
+                            "external_id": f"x{i}",
+                            "posted_at": base + timedelta(minutes=i),
+                            "amount": 10 + i % 5000 / 100,
+                            "amount_cents": 1000 + i % 5000,
+                            "currency": "USD",
+                            "description": f"INV-{i} acme widget",
+                        }
+                        for i in range(n)
+                    ],
+                )
+                db.commit()
+                svc = BankTransactionService(db)
+
+                def model() -> bytes:
+                    db.expunge_all()
+                    items, _ = svc.list_transactions(tenant_id=1)
+                    return ADAPTER.dump_json(ADAPTER.validate_python(items))
+
+                def rows() -> bytes:
+                    items, _ = svc.list_transaction_rows(tenant_id=1)
+                    return b"".join(iter_json_array(FIELDS, items))
+
+                model_ms, expected = median_ms(model, args.repeat)
+                rows_ms, body = median_ms(rows, args.repeat)
+                assert body == expected
+            engine.dispose()
+        print(f"{n:>8} {model_ms:>9.1f} {rows_ms:>8.1f} {model_ms / rows_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare the two ways reconcile has persisted proposals.
+
+    python -m benchmarks.bench_match_persist [--sizes 10000 100000 1000000] [--k 3]
+
+"orm" is the former path (a Match object per proposal, db.add, one flush, then MatchOut
+built from the objects, which loads the server-set created_at). "bulk" is the current
+one: ReconciliationService._propose_batches, which runs executemany INSERT ... RETURNING
+in invoice batches. Each run uses a fresh SQLite file database.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models import models  # noqa: F401  (ensure models are imported)
+from app.models.models import Match, MatchStatus, Tenant
+from app.schemas.match import MatchOut
+from app.services.reconciliation import ReconciliationService
+
+
+def ranked_proposals(n: int, k: int) -> list[tuple[int, list[tuple[int, float]]]]:
+    # Foreign keys are not enforced by SQLite, so synthetic ids are fine here.
+    return [(inv, [(inv * k + j, 1.0 - j / 10) for j in range(k)]) for inv in range(1, n // k + 1)]
+
+
+def run_orm(db: Session, tenant_id: int, ranked_all) -> int:
+    created = []
+    for inv_id, ranked in ranked_all:
+        for tx_id, score in ranked:
+            m = Match(tenant_id=tenant_id, invoice_id=inv_id, bank_transaction_id=tx_id, score=score, status=MatchStatus.proposed)
+            db.add(m)
+            created.append(m)
+    db.flush()
+    return len([MatchOut.model_validate(m) for m in created])
+
+
+def run_bulk(db: Session, tenant_id: int, ranked_all) -> int:
+    svc = ReconciliationService(db)
+    return len([MatchOut.model_validate(r) for batch in svc._propose_batches(tenant_id=tenant_id, ranked_all=ranked_all) for r in batch])
+
+
+def bench(n: int, k: int) -> dict[str, float]:
+    results = {}
+    for name, fn in (("orm", run_orm), ("bulk", run_bulk)):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite+pysqlite:///{Path(tmp) / 'bench.db'}")
+            Base.metadata.create_all(engine)
+            with Session(engine, expire_on_commit=False, autoflush=False) as db:
+                tenant = Tenant(name="bench")
+                db.add(tenant)
+                db.commit()
+                ranked_all = ranked_proposals(n, k)
+                t0 = time.perf_counter()
+                count = fn(db, tenant.id, ranked_all)
+                db.commit()
+                results[name] = time.perf_counter() - t0
+            engine.dispose()
+        assert count == len(ranked_all) * k
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=3, help="proposals per invoice")
+    args = parser.parse_args()
+
+    print(f"{'proposals':>10} {'orm s':>9} {'bulk s':>9} {'speedup':>8}")
+    for n in args.sizes:
+        r = bench(n, args.k)
+        print(f"{n:>10} {r['orm']:>9.2f} {r['bulk']:>9.2f} {r['orm'] / r['bulk']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
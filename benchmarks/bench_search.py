@@ -0,0 +1,104 @@
+"""Description search latency (ms per query) against table size.
+
+    python -m benchmarks.bench_search [--sizes 10000 100000 1000000] [--repeat 20]
+
+Each size gets a fresh SQLite file with N bank transactions for the searched tenant (and as
+many for a second tenant), whose descriptions draw from a 5,000-word vocabulary. "like" is
+the former path, ``description ILIKE '%term%'``; "fts" is the FTS5 path of
+app/services/search.py. "contains" is the first 50-row page of
+``list_transactions(description_contains=...)`` for a word in ~0.1% of rows, "miss" the same
+for a word in none, and "search" is ``search_transactions`` (top 50 by bm25). Times are medians.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import and_, create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models import models  # noqa: F401  (ensure models are imported)
+from app.models.models import BankTransaction, Tenant
+from app.schemas.bank_transaction import BankTransactionFilters
+from app.services.bank_transactions import BankTransactionService
+
+VOCABULARY = [f"w{i:04d}" for i in range(5000)]
+CHUNK = 10_000
+
+
+def populate(db: Session, n: int) -> None:
+    rng = random.Random(n)
+    db.add_all([Tenant(id=1, name="searched"), Tenant(id=2, name="other")])
+    db.flush()
+    for start in range(0, 2 * n, CHUNK):
+        rows = [
+            {
+                "tenant_id": 1 + (i % 2),
+                "posted_at": datetime(2026, 1, 1),
+                "amount": 10,
+                "amount_cents": 1000,
+                "currency": "USD",
+                "description": " ".join(rng.choices(VOCABULARY, k=6)),
+            }
+            for i in range(start, min(start + CHUNK, 2 * n))
+        ]
+        db.execute(insert(BankTransaction), rows)
+    db.commit()
+
+
+def median_ms(fn: Callable[[], object], repeat: int) -> float:
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    term, missing = VOCABULARY[42], "absent"
+    print(f"{'rows':>9} {'like contains':>14} {'fts contains':>13} {'like miss':>10} {'fts miss':>9} {'fts search':>11}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite+pysqlite:///{Path(tmp) / 'bench.db'}")
+            Base.metadata.create_all(engine)
+            with Session(engine) as db:
+                populate(db, n)
+                svc = BankTransactionService(db)
+
+                def like(word: str) -> list[BankTransaction]:
+                    stmt = select(BankTransaction).where(
+                        and_(BankTransaction.tenant_id == 1, BankTransaction.description.ilike(f"%{word}%"))
+                    )
+                    return list(db.scalars(stmt.order_by(BankTransaction.id).limit(51)))
+
+                def fts(word: str) -> object:
+                    filters = BankTransactionFilters(description_contains=word)
+                    return svc.list_transactions(tenant_id=1, filters=filters, limit=50)
+
+                timings = [
+                    median_ms(lambda: like(term), args.repeat),
+                    median_ms(lambda: fts(term), args.repeat),
+                    median_ms(lambda: like(missing), args.repeat),
+                    median_ms(lambda: fts(missing), args.repeat),
+                    median_ms(lambda: svc.search_transactions(tenant_id=1, q=term, limit=50), args.repeat),
+                ]
+            engine.dispose()
+        print(f"{n:>9} " + " ".join(f"{t:>{w}.2f}" for t, w in zip(timings, (14, 13, 10, 9, 11))))
+
+
+if __name__ == "__main__":
+    main()
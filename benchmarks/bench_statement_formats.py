@@ -0,0 +1,117 @@
+"""Statement format throughput (rows/sec), parsing alone and parsing plus import.
+
+    python -m benchmarks.bench_statement_formats [--sizes 10000 100000] [--formats camt053 mt940 ofx]
+
+Each format gets a synthetic statement of N credit entries, fed in 64 KiB chunks. "parse" runs
+the streaming reader from app/utils/statement_formats.py; "import" runs
+BankTransactionService.import_stream (parse, validate, chunked insert) into a fresh SQLite file.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from collections.abc import Iterator
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models import models  # noqa: F401  (ensure models are imported)
+from app.models.models import Tenant
+from app.services.bank_transactions import STATEMENT_READERS, BankTransactionService
+
+CHUNK = 64 * 1024
+
+
+def _days(n: int) -> Iterator[tuple[int, date, str]]:
+    base = date(2026, 1, 1)
+    for i in range(n):
+        yield i, base + timedelta(days=i % 365), f"{10 + (i * 37) % 5000}.{i % 100:02d}"
+
+
+def camt053(n: int) -> bytes:
+    entries = "".join(
+        f'<Ntry><NtryRef>n{i}</NtryRef><Amt Ccy="EUR">{amt}</Amt><CdtDbtInd>CRDT</CdtDbtInd>'
+        f"<BookgDt><Dt>{d.isoformat()}</Dt></BookgDt><AcctSvcrRef>R{i}</AcctSvcrRef>"
+        f"<NtryDtls><TxDtls><RmtInf><Ustrd>INV-{i} acme widget</Ustrd></RmtInf></TxDtls></NtryDtls></Ntry>\n"
+        for i, d, amt in _days(n)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"><BkToCstmrStmt><Stmt>\n'
+        f"{entries}</Stmt></BkToCstmrStmt></Document>\n"
+    ).encode()
+
+
+def mt940(n: int) -> bytes:
+    lines = "".join(
+        f":61:{d:%y%m%d}C{amt.replace('.', ',')}NTRFINV-{i}//R{i}\n:86:INV-{i} acme widget\n" for i, d, amt in _days(n)
+    )
+    return f":20:STMT\n:25:DE123456\n:28C:1/1\n:60F:C260101EUR0,00\n{lines}:62F:C261231EUR0,00\n-\n".encode()
+
+
+def ofx(n: int) -> bytes:
+    txns = "".join(
+        f"<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>{d:%Y%m%d}120000<TRNAMT>{amt}<FITID>R{i}<NAME>ACME<MEMO>INV-{i} widget</STMTTRN>\n"
+        for i, d, amt in _days(n)
+    )
+    return (
+        "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>USD<BANKTRANLIST>\n"
+        f"{txns}</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+    ).encode()
+
+
+GENERATORS = {"camt053": camt053, "mt940": mt940, "ofx": ofx}
+
+
+def chunks(data: bytes) -> Iterator[bytes]:
+    for i in range(0, len(data), CHUNK):
+        yield data[i : i + CHUNK]
+
+
+def bench_parse(fmt: str, data: bytes, n: int) -> float:
+    reader, _ = STATEMENT_READERS[fmt]
+    t0 = time.perf_counter()
+    count = sum(1 for _ in reader(chunks(data)))
+    elapsed = time.perf_counter() - t0
+    assert count == n
+    return n / elapsed
+
+
+def bench_import(fmt: str, data: bytes, n: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite+pysqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        with Session(engine, expire_on_commit=False, autoflush=False) as db:
+            tenant = Tenant(name="bench")
+            db.add(tenant)
+            db.commit()
+            t0 = time.perf_counter()
+            out = BankTransactionService(db).import_stream(tenant_id=tenant.id, chunks=chunks(data), fmt=fmt, idempotency_key="bench")
+            db.commit()
+            elapsed = time.perf_counter() - t0
+        engine.dispose()
+    assert out["inserted"] == n
+    return n / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--formats", nargs="+", choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    args = parser.parse_args()
+
+    print(f"{'format':>8} {'rows':>8} {'MiB':>6} {'parse rows/s':>13} {'import rows/s':>14}")
+    for fmt in args.formats:
+        for n in args.sizes:
+            data = GENERATORS[fmt](n)
+            parse = bench_parse(fmt, data, n)
+            imported = bench_import(fmt, data, n)
+            print(f"{fmt:>8} {n:>8} {len(data) / 2**20:>6.1f} {parse:>13,.0f} {imported:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -11,13 +11,7 @@ from app.db.deps import get_db
 from app.main import create_app
 
 
-@pytest.fixture()
-def client() -> TestClient:
-    engine = create_engine(
-        "sqlite+pysqlite://",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+def _make_client(engine: Engine) -> TestClient:
     TestingSessionLocal = sessionmaker(bind=engine, class_=Session, expire_on_commit=False, autoflush=False)
     Base.metadata.create_all(bind=engine)
 
@@ -36,3 +30,20 @@ def client() -> TestClient:
 
     app.dependency_overrides[get_db] = override_get_db
     return TestClient(app)
+
+
+@pytest.fixture()
+def client() -> TestClient:
+    engine = create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    return _make_client(engine)
+
+
+@pytest.fixture()
+def file_client(tmp_path) -> TestClient:
+    """Client on a file database, for tests where background threads open their own connections."""
+    engine = create_engine(f"sqlite+pysqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    return _make_client(engine)
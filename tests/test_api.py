@@ -62,6 +62,27 @@ def test_import_bank_transactions_idempotency(client):
     assert r3.status_code == 409
 
 
+def test_chunked_import_skips_duplicates_across_and_within_chunks(client, monkeypatch):
+    from app.services import bank_transactions
+
+    monkeypatch.setattr(bank_transactions, "IMPORT_CHUNK_SIZE", 3)
+    tenant_id = create_tenant(client, "Chunked import")
+    now = datetime(2026, 1, 12, 12, 0, 0)
+    ext = ["a", None, "b", "a", None, "c", "b", "d"]
+    payload = [{"external_id": e, "posted_at": now.isoformat(), "amount": 10.0 + n} for n, e in enumerate(ext)]
+    client.post(f"/tenants/{tenant_id}/bank-transactions/import", json=payload[5:6], headers={"Idempotency-Key": "first"})
+
+    r = client.post(f"/tenants/{tenant_id}/bank-transactions/import", json=payload, headers={"Idempotency-Key": "second"})
+    out = r.json()
+    assert (out["inserted"], out["skipped"]) == (5, 3)
+    assert out["created_ids"] == sorted(out["created_ids"])
+    listed = client.get(f"/tenants/{tenant_id}/bank-transactions").json()
+    assert [t["amount"] for t in listed if t["id"] in out["created_ids"]] == [10.0, 11.0, 12.0, 14.0, 17.0]
+
+    replay = client.post(f"/tenants/{tenant_id}/bank-transactions/import", json=payload, headers={"Idempotency-Key": "second"})
+    assert replay.json() == out
+
+
 def test_reconcile_ranking_confirm_and_ai_explain(client):
     tenant_id = create_tenant(client, "T3")
 
@@ -119,3 +140,176 @@ def test_reconcile_ranking_confirm_and_ai_explain(client):
     r = client.get(f"/tenants/{tenant_id}/reconcile/explain", params={"invoice_id": inv1, "transaction_id": txn_id})
     assert r.status_code == 200
     assert r.json()["used_ai"] is False
+
+
+def test_streamed_csv_and_ndjson_upload(client):
+    import json
+
+    tenant_id = create_tenant(client, "Upload")
+    url = f"/tenants/{tenant_id}/bank-transactions/upload"
+    csv_body = (
+        "external_id,posted_at,amount,currency,description\n"
+        "u1,2026-01-12T12:00:00,100.00,USD,\"Payment, widget\"\n"
+        "u2,2026-01-13T12:00:00,50.5,,\"multi\nline\"\n"
+        "u1,2026-01-12T12:00:00,100.00,USD,dup\n"
+    ).encode()
+
+    def chunks(body, size=7):
+        for i in range(0, len(body), size):
+            yield body[i : i + size]
+
+    headers = {"Idempotency-Key": "csv-1", "Content-Type": "text/csv"}
+    r = client.post(url, content=chunks(csv_body), headers=headers)
+    assert r.status_code == 200
+    out = r.json()
+    assert (out["inserted"], out["skipped"]) == (2, 1)
+    listed = client.get(f"/tenants/{tenant_id}/bank-transactions").json()
+    assert [(t["external_id"], t["amount"], t["currency"], t["description"]) for t in listed] == [
+        ("u1", 100.0, "USD", "Payment, widget"),
+        ("u2", 50.5, "USD", "multi\nline"),
+    ]
+    assert client.post(url, content=csv_body, headers=headers).json() == out
+    assert client.post(url, content=csv_body + b"u3,2026-01-14T00:00:00,1,USD,x\n", headers=headers).status_code == 409
+
+    ndjson = b"".join(
+        json.dumps({"external_id": f"n{i}", "posted_at": "2026-01-15T00:00:00", "amount": 10 + i}).encode() + b"\n" for i in range(5)
+    )
+    r = client.post(url, content=chunks(ndjson, 5), headers={"Idempotency-Key": "nd-1", "Content-Type": "application/x-ndjson"})
+    assert r.json()["inserted"] == 5
+
+    bad = b'{"external_id": "b1", "posted_at": "2026-01-15T00:00:00", "amount": -1}\n'
+    r = client.post(url, content=bad, headers={"Idempotency-Key": "nd-2", "Content-Type": "application/x-ndjson"})
+    assert r.status_code == 422 and r.json()["detail"].startswith("line 1 amount:")
+    assert client.post(url, content=b"", headers={"Idempotency-Key": "x", "Content-Type": "text/plain"}).status_code == 415
+    assert len(client.get(f"/tenants/{tenant_id}/bank-transactions").json()) == 7
+
+
+def test_batch_create_invoices_with_idempotency_key(client):
+    tenant_id = create_tenant(client, "Batch invoices")
+    payload = [{"amount": 10 + n, "invoice_date": "2026-01-10", "description": f"inv {n}"} for n in range(25)]
+    url = f"/tenants/{tenant_id}/invoices/batch"
+
+    r = client.post(url, json=payload, headers={"Idempotency-Key": "erp-jan"})
+    assert r.status_code == 201
+    out = r.json()
+    assert out["inserted"] == 25 and out["created_ids"] == sorted(out["created_ids"])
+    listed = client.get(f"/tenants/{tenant_id}/invoices").json()
+    assert [(i["id"], i["amount"]) for i in listed] == list(zip(out["created_ids"], [float(10 + n) for n in range(25)]))
+
+    assert client.post(url, json=payload, headers={"Idempotency-Key": "erp-jan"}).json() == out
+    assert client.post(url, json=payload[:3], headers={"Idempotency-Key": "erp-jan"}).status_code == 409
+    assert client.post(url, json=[{"amount": 5}, {"amount": -1}]).status_code == 422
+    assert client.post(url, json=payload[:2]).json()["inserted"] == 2
+    assert len(client.get(f"/tenants/{tenant_id}/invoices").json()) == 27
+
+    # Keys are scoped per endpoint: the same key on a bank import is a new request, and vice versa.
+    txn = [{"external_id": "x1", "posted_at": "2026-01-10T00:00:00", "amount": 10}]
+    imported = client.post(f"/tenants/{tenant_id}/bank-transactions/import", json=txn, headers={"Idempotency-Key": "erp-jan"})
+    assert imported.status_code == 200 and imported.json()["inserted"] == 1
+    again = client.post(url, json=payload[:1], headers={"Idempotency-Key": "shared"})
+    assert client.post(f"/tenants/{tenant_id}/bank-transactions/import", json=txn, headers={"Idempotency-Key": "shared"}).json() == {
+        "inserted": 0,
+        "skipped": 1,
+        "created_ids": [],
+    }
+    assert client.post(url, json=payload[:1], headers={"Idempotency-Key": "shared"}).json() == again.json()
+
+
+def test_keyset_pagination_of_listings(client):
+    tenant_id = create_tenant(client, "Paging")
+    base = f"/tenants/{tenant_id}"
+    client.post(f"{base}/invoices/batch", json=[{"amount": 100 + n, "invoice_date": "2026-01-10", "description": f"inv {n}"} for n in range(5)])
+    client.post(
+        f"{base}/bank-transactions/import",
+        json=[{"external_id": f"p{n}", "posted_at": "2026-01-11T00:00:00", "amount": 100 + n, "description": f"inv {n}"} for n in range(5)],
+        headers={"Idempotency-Key": "paging"},
+    )
+    client.post(f"{base}/reconcile")
+
+    for path in ("invoices", "bank-transactions", "matches"):
+        everything = [row["id"] for row in client.get(f"{base}/{path}").json()]
+        assert len(everything) >= 5
+        seen, cursor = [], None
+        while True:
+            r = client.get(f"{base}/{path}", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+            assert r.status_code == 200
+            seen += [row["id"] for row in r.json()]
+            cursor = r.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert seen == everything, path
+    assert client.get(f"{base}/invoices", params={"limit": 0}).status_code == 422
+
+
+def test_description_search_ranks_and_falls_back_to_like(client, monkeypatch):
+    tenant_id = create_tenant(client, "Search")
+    other = create_tenant(client, "Search other")
+    descs = ["INV-10 acme widget", "acme acme hosting", "rent march", "INV-1 payment acme"]
+    client.post(
+        f"/tenants/{tenant_id}/bank-transactions/import",
+        json=[{"posted_at": "2026-01-11T00:00:00", "amount": 10, "description": d} for d in descs],
+        headers={"Idempotency-Key": "search"},
+    )
+    client.post(f"/tenants/{other}/invoices", json={"amount": 10, "description": "acme"})
+    inv = client.post(f"/tenants/{tenant_id}/invoices", json={"amount": 10, "description": "Hosting for acme"}).json()
+
+    def search(path, **params):
+        r = client.get(f"/tenants/{tenant_id}/{path}", params=params)
+        assert r.status_code == 200, r.text
+        return [row["description"] for row in r.json()]
+
+    # Most occurrences rank first; prefixes need an explicit *.
+    assert search("bank-transactions/search", q="acme") == ["acme acme hosting", "INV-10 acme widget", "INV-1 payment acme"]
+    assert search("bank-transactions/search", q="pay*") == ["INV-1 payment acme"]
+    assert search("bank-transactions/search", q="pay") == []
+    assert search("invoices/search", q="acme") == [inv["description"]]
+    # description_contains keeps id order: its words as a phrase, the last one as a prefix.
+    assert search("bank-transactions", description_contains="inv-1") == ["INV-10 acme widget", "INV-1 payment acme"]
+    assert search("invoices", description_contains="hosting f") == [inv["description"]]
+
+    # Without an FTS index (other engines) the same requests go through LIKE.
+    from app.services import search as search_module
+
+    monkeypatch.setattr(search_module, "has_fts", lambda db, table: False)
+    assert search("bank-transactions/search", q="acme") == ["INV-10 acme widget", "acme acme hosting", "INV-1 payment acme"]
+    assert search("bank-transactions", description_contains="inv-1") == ["INV-10 acme widget", "INV-1 payment acme"]
+
+
+def test_list_etags_follow_collection_versions(client, monkeypatch):
+    tenant_id = create_tenant(client, "Versions")
+    base = f"/tenants/{tenant_id}"
+    client.post(f"{base}/invoices", json={"amount": 100, "invoice_date": "2026-01-10", "description": "acme"})
+    first = client.get(f"{base}/invoices")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    # Unchanged: 304 for the validator, and the cached body otherwise, without querying invoices.
+    from app.services.invoices import InvoiceService
+
+    def no_query(*args, **kwargs):
+        raise AssertionError("listing was queried")
+
+    with monkeypatch.context() as m:
+        m.setattr(InvoiceService, "list_invoice_rows", no_query)
+        r = client.get(f"{base}/invoices", headers={"If-None-Match": etag})
+        assert (r.status_code, r.content, r.headers["ETag"]) == (304, b"", etag)
+        again = client.get(f"{base}/invoices")
+        assert (again.content, again.headers["ETag"]) == (first.content, etag)
+
+    # Each write bumps its own collection only.
+    client.post(
+        f"{base}/bank-transactions/import",
+        json=[{"posted_at": "2026-01-11T00:00:00", "amount": 100, "description": "acme"}],
+        headers={"Idempotency-Key": "versions"},
+    )
+    assert client.get(f"{base}/invoices", headers={"If-None-Match": etag}).status_code == 304
+    matches_etag = client.get(f"{base}/matches").headers["ETag"]
+    client.post(f"{base}/reconcile")
+    r = client.get(f"{base}/matches", headers={"If-None-Match": matches_etag})
+    assert r.status_code == 200 and len(r.json()) == 1
+    assert client.post(f"{base}/matches/{r.json()[0]['id']}/confirm").status_code == 200
+    # Confirming changes the invoice status and the match.
+    assert client.get(f"{base}/matches", headers={"If-None-Match": r.headers["ETag"]}).json()[0]["status"] == "confirmed"
+    changed = client.get(f"{base}/invoices", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json()[0]["status"] == "matched"
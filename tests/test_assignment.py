@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import random
+
+from app.utils.assignment import connected_components, solve_assignment
+
+
+def best_weight_brute_force(edges):
+    best = 0
+    for mask in range(1 << len(edges)):
+        sel = [edges[i] for i in range(len(edges)) if mask >> i & 1]
+        if len({e[0] for e in sel}) == len(sel) and len({e[1] for e in sel}) == len(sel):
+            best = max(best, sum(round(e[2] * 10**9) for e in sel))
+    return best
+
+
+def test_solve_assignment_is_optimal_one_to_one():
+    for trial in range(150):
+        rng = random.Random(trial)
+        pairs = {(rng.randint(1, 5), rng.randint(1, 5)) for _ in range(rng.randint(1, 11))}
+        edges = [(inv, tx, rng.choice([0.2, 0.4, 0.6, 0.8, rng.random()])) for inv, tx in sorted(pairs)]
+
+        chosen, stats = solve_assignment(edges)
+        picked = [edges[pos] for pos in chosen]
+        assert len({e[0] for e in picked}) == len({e[1] for e in picked}) == len(picked)
+        assert sum(round(e[2] * 10**9) for e in picked) == best_weight_brute_force(edges)
+        assert stats.edges == len(edges)
+
+
+def test_connected_components_split_independent_subgraphs():
+    edges = [(1, 10, 0.5), (2, 20, 0.5), (1, 11, 0.4), (3, 11, 0.4), (2, 21, 0.2)]
+    assert connected_components(edges) == [[0, 2, 3], [1, 4]]
+
+
+def test_solve_assignment_is_optimal_for_shared_transactions_in_any_edge_order():
+    # Few transactions shared by many invoices, tied weights and shuffled edges: the cases where
+    # row potentials have to account for columns earlier rows already repriced.
+    assert solve_assignment([(2, 0, 0.8), (3, 0, 0.8), (4, 0, 0.4)])[0] in ([0], [1])
+    assert solve_assignment([(1, 0, 0.8), (2, 0, 0.8), (4, 0, 0.091)])[0] in ([0], [1])
+    for trial in range(2000):
+        rng = random.Random(trial)
+        pairs = list({(rng.randint(1, 6), rng.randint(1, 3)) for _ in range(rng.randint(2, 12))})
+        rng.shuffle(pairs)
+        edges = [(inv, tx, rng.choice([0.2, 0.4, 0.8, 0.8, rng.random()])) for inv, tx in pairs]
+
+        chosen, _ = solve_assignment(edges)
+        picked = [edges[pos] for pos in chosen]
+        assert len({e[0] for e in picked}) == len({e[1] for e in picked}) == len(picked)
+        assert sum(round(e[2] * 10**9) for e in picked) == best_weight_brute_force(edges), edges
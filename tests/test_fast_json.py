@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models.models import BankTransaction, Invoice, Match, MatchStatus, Tenant
+from app.schemas.bank_transaction import BankTransactionOut
+from app.schemas.invoice import InvoiceOut
+from app.schemas.match import MatchOut
+from app.services.bank_transactions import BankTransactionService
+from app.services.invoices import InvoiceService
+from app.services.reconciliation import ReconciliationService
+from app.utils import fast_json
+from app.utils.fast_json import iter_json_array
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False, autoflush=False) as session:
+        session.add(Tenant(id=1, name="T"))
+        for n, (amount, desc) in enumerate([(100.1, 'é "q" \\ \x1f '), (0.07, None), (12345678.99, "acme")]):
+            session.add(Invoice(tenant_id=1, amount=amount, amount_cents=round(amount * 100), invoice_date=date(2026, 1, n + 1), description=desc))
+            session.add(
+                BankTransaction(
+                    tenant_id=1,
+                    external_id=f"x{n}" if n else None,
+                    posted_at=datetime(2026, 1, 1, 0, 0, 0, 123000 * n, tzinfo=timezone.utc),
+                    amount=amount,
+                    amount_cents=round(amount * 100),
+                    description=desc,
+                )
+            )
+        session.flush()
+        session.add(Match(tenant_id=1, invoice_id=1, bank_transaction_id=1, score=0.7833333333333334, status=MatchStatus.proposed))
+        session.add(Match(tenant_id=1, invoice_id=2, bank_transaction_id=2, score=1.0, status=MatchStatus.confirmed, group_id=7))
+        session.commit()
+        yield session
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_row_path_matches_response_model_bytes(db, monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    listings = [
+        (InvoiceOut, InvoiceService(db).list_invoices, InvoiceService(db).list_invoice_rows),
+        (BankTransactionOut, BankTransactionService(db).list_transactions, BankTransactionService(db).list_transaction_rows),
+        (MatchOut, ReconciliationService(db).list_matches, ReconciliationService(db).list_match_rows),
+    ]
+    for model, list_orm, list_rows in listings:
+        adapter = TypeAdapter(list[model])
+        expected = adapter.dump_json(adapter.validate_python(list_orm(tenant_id=1)[0]))
+        rows, next_cursor = list_rows(tenant_id=1)
+        assert next_cursor is None
+        # One chunk per row exercises the streamed form.
+        assert b"".join(iter_json_array(list(model.model_fields), rows)) == expected, model
+        assert b"".join(iter_json_array(list(model.model_fields), rows, chunk_rows=1)) == expected, model
+    assert b"".join(iter_json_array(["id"], [])) == b"[]"
+    aware = [datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 1, 0, 0, 0, 5)]
+    assert fast_json.dumps(aware) == TypeAdapter(list[datetime]).dump_json(aware)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models.models import IdempotencyRecord, Tenant
+from app.schemas.bank_transaction import BankTransactionIn
+from app.services.bank_transactions import BankTransactionService, IdempotencyConflict
+from app.services.idempotency import IdempotencyStore, sweep_expired
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False, autoflush=False) as session:
+        session.add(Tenant(id=1, name="T"))
+        session.commit()
+        yield session
+
+
+def txns(*amounts):
+    return [BankTransactionIn(external_id=f"e{a}", posted_at=datetime(2026, 1, 1), amount=a) for a in amounts]
+
+
+def test_records_are_compressed_and_replayed_from_the_lru(db):
+    svc = BankTransactionService(db)
+    first = svc.import_transactions(tenant_id=1, transactions=txns(1, 2), idempotency_key="k")
+    db.commit()
+    record = db.scalar(select(IdempotencyRecord))
+    assert record.response_json == "" and zlib.decompress(record.response_blob)
+
+    # Served from the cache even once the row is gone; a different payload still conflicts.
+    db.delete(record)
+    db.commit()
+    assert BankTransactionService(db).import_transactions(tenant_id=1, transactions=txns(1, 2), idempotency_key="k") == first
+    with pytest.raises(IdempotencyConflict):
+        BankTransactionService(db).import_transactions(tenant_id=1, transactions=txns(3), idempotency_key="k")
+
+
+def test_rolled_back_import_is_not_cached(db):
+    BankTransactionService(db).import_transactions(tenant_id=1, transactions=txns(1), idempotency_key="gone")
+    db.rollback()
+    out = BankTransactionService(db).import_transactions(tenant_id=1, transactions=txns(1), idempotency_key="gone")
+    assert out["inserted"] == 1
+
+
+def test_legacy_uncompressed_record_is_replayed(db):
+    db.add(IdempotencyRecord(tenant_id=1, key="old", request_hash="h", response_json='{"created_ids":[],"inserted":0,"skipped":0}'))
+    db.commit()
+    entry = IdempotencyStore(db).get(tenant_id=1, key="old")
+    assert entry.response == {"created_ids": [], "inserted": 0, "skipped": 0}
+
+
+def test_expired_keys_are_forgotten_and_swept(db, monkeypatch):
+    from app.config import settings
+    from app.services import idempotency
+
+    monkeypatch.setattr(settings, "idempotency_ttl_seconds", 60)
+    svc = BankTransactionService(db)
+    svc.import_transactions(tenant_id=1, transactions=txns(1), idempotency_key="a")
+    svc.import_transactions(tenant_id=1, transactions=txns(2), idempotency_key="b")
+    db.commit()
+    assert sweep_expired(db) == 0
+
+    # Past the TTL a key is free again (for another payload too), even before the sweeper runs.
+    later = idempotency._utcnow() + timedelta(seconds=61)
+    monkeypatch.setattr(idempotency, "_utcnow", lambda: later)
+    out = BankTransactionService(db).import_transactions(tenant_id=1, transactions=txns(5), idempotency_key="a")
+    assert out["inserted"] == 1
+    db.commit()
+
+    assert sweep_expired(db, batch_size=1) == 1
+    assert list(db.scalars(select(IdempotencyRecord.key))) == ["a"]
+
+
+def test_streamed_import_replays_a_record_that_expires_while_the_body_is_read(db, monkeypatch):
+    from app.services import idempotency
+
+    body = [b'{"external_id": "n1", "posted_at": "2026-01-01T00:00:00", "amount": 5}\n']
+    first = BankTransactionService(db).import_stream(tenant_id=1, chunks=iter(body), fmt="ndjson", idempotency_key="s")
+    db.commit()
+
+    def expiring_body():
+        # The key passes its TTL after the record was looked up, before the body ends.
+        later = idempotency._utcnow() + timedelta(days=30)
+        monkeypatch.setattr(idempotency, "_utcnow", lambda: later)
+        yield from body
+
+    out = BankTransactionService(db).import_stream(tenant_id=1, chunks=expiring_body(), fmt="ndjson", idempotency_key="s")
+    assert out == first
+
+
+def test_sweeper_keeps_running_after_a_failed_sweep(monkeypatch):
+    import threading
+
+    from app.services import idempotency
+
+    calls = []
+    swept_twice = threading.Event()
+
+    def flaky_sweep(db):
+        calls.append(db)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        swept_twice.set()
+        return 0
+
+    monkeypatch.setattr(idempotency, "sweep_expired", flaky_sweep)
+    sweeper = idempotency.IdempotencySweeper(create_engine("sqlite+pysqlite://"), interval=0.01)
+    sweeper.start()
+    try:
+        assert swept_twice.wait(5)
+    finally:
+        sweeper.stop()
@@ -0,0 +1,548 @@
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, timedelta
+
+
+def create_tenant(client, name):
+    r = client.post("/tenants", json={"name": name})
+    assert r.status_code == 201
+    return r.json()["id"]
+
+
+def seed_random_book(client, tenant_id, *, seed=7, n_invoices=40, n_txns=120):
+    rng = random.Random(seed)
+    words = ["acme", "widget", "payment", "invoice", "rent", "march", "consulting", "hosting", "ltd", "inc"]
+
+    def desc():
+        if rng.random() < 0.15:
+            return None
+        return " ".join(rng.sample(words, rng.randint(1, 3)))
+
+    base = date(2026, 3, 1)
+    amounts = [round(rng.uniform(10, 500), 2) for _ in range(25)]
+    for _ in range(n_invoices):
+        client.post(
+            f"/tenants/{tenant_id}/invoices",
+            json={
+                "amount": rng.choice(amounts),
+                "invoice_date": (base + timedelta(days=rng.randint(0, 40))).isoformat() if rng.random() < 0.9 else None,
+                "description": desc(),
+            },
+        )
+    txns = []
+    for n in range(n_txns):
+        amt = rng.choice(amounts)
+        if rng.random() < 0.3:
+            amt = round(amt * rng.uniform(0.985, 1.015), 2)
+        txns.append(
+            {
+                "external_id": f"s{seed}-x{n}",
+                "posted_at": datetime.combine(base + timedelta(days=rng.randint(0, 40)), datetime.min.time()).isoformat(),
+                "amount": amt,
+                "description": desc(),
+            }
+        )
+    r = client.post(f"/tenants/{tenant_id}/bank-transactions/import", json=txns, headers={"Idempotency-Key": f"seed-{seed}"})
+    assert r.status_code == 200
+
+
+def proposal_set(rows):
+    return [(m["invoice_id"], m["bank_transaction_id"], m["score"]) for m in rows]
+
+
+def test_candidate_index_matches_exhaustive_scoring(client):
+    tenant_id = create_tenant(client, "Index")
+    seed_random_book(client, tenant_id)
+
+    for window in (0, 3, 10):
+        body = {"max_candidates_per_invoice": 5, "date_window_days": window}
+        exhaustive = client.post(f"/tenants/{tenant_id}/reconcile", json={**body, "candidate_strategy": "exhaustive"})
+        indexed = client.post(f"/tenants/{tenant_id}/reconcile", json=body)
+        assert exhaustive.status_code == indexed.status_code == 200
+        assert proposal_set(indexed.json()) == proposal_set(exhaustive.json())
+        assert indexed.json()
+
+
+def test_backfill_description_tokens_and_cents_for_legacy_rows():
+    from sqlalchemy import create_engine, select, text
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.init_db import init_db
+    from app.models.models import Invoice
+    from app.utils.reconcile import token_signature
+
+    engine = create_engine("sqlite+pysqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        # invoices table as created before description_tokens and amount_cents existed
+        conn.execute(text(
+            "CREATE TABLE invoices (id INTEGER PRIMARY KEY, tenant_id INTEGER NOT NULL, vendor_id INTEGER, "
+            "invoice_number VARCHAR(64), amount NUMERIC(12, 2) NOT NULL, currency VARCHAR(3) NOT NULL DEFAULT 'USD', "
+            "invoice_date DATE, description TEXT, status VARCHAR(7) NOT NULL DEFAULT 'open', "
+            "created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        conn.execute(text("INSERT INTO invoices (tenant_id, amount, description) VALUES (1, 10, 'Acme  widget'), (1, 5.00, NULL)"))
+
+    init_db(engine)
+
+    with Session(engine) as db:
+        rows = db.execute(select(Invoice.description_tokens, Invoice.amount_cents).order_by(Invoice.id)).all()
+    assert rows == [(token_signature("acme widget"), 1000), (b"", 500)]
+
+
+def proposed_now(client, tenant_id):
+    r = client.get(f"/tenants/{tenant_id}/matches", params={"status": "proposed"})
+    assert r.status_code == 200
+    return sorted((m["invoice_id"], m["bank_transaction_id"], m["score"]) for m in r.json())
+
+
+def test_incremental_reconcile_matches_full_recompute(client):
+    tenant_id = create_tenant(client, "Incremental")
+    seed_random_book(client, tenant_id, seed=11, n_invoices=30, n_txns=60)
+    body = {"max_candidates_per_invoice": 3, "date_window_days": 5}
+    assert client.post(f"/tenants/{tenant_id}/reconcile", json=body).status_code == 200
+
+    rng = random.Random(3)
+    for round_no in range(3):
+        # new statement lines and invoices
+        seed_random_book(client, tenant_id, seed=100 + round_no, n_invoices=4, n_txns=10)
+        proposals = client.get(f"/tenants/{tenant_id}/matches", params={"status": "proposed"}).json()
+        # confirm one proposal, delete one open invoice
+        chosen = rng.choice(proposals)
+        assert client.post(f"/tenants/{tenant_id}/matches/{chosen['id']}/confirm").status_code == 200
+        open_ids = [i["id"] for i in client.get(f"/tenants/{tenant_id}/invoices", params={"status": "open"}).json()]
+        assert client.delete(f"/tenants/{tenant_id}/invoices/{rng.choice(open_ids)}").status_code == 204
+
+        r = client.post(f"/tenants/{tenant_id}/reconcile", json={**body, "mode": "incremental"})
+        assert r.status_code == 200
+        incremental = proposed_now(client, tenant_id)
+        # only the proposals that changed are created
+        assert 0 < len(r.json()) < len(incremental)
+
+        full = client.post(f"/tenants/{tenant_id}/reconcile", json=body)
+        assert len(full.json()) == len(incremental)
+        assert proposed_now(client, tenant_id) == incremental
+
+
+def test_one_to_one_assignment_proposes_each_transaction_once(client):
+    tenant_id = create_tenant(client, "Assign")
+    seed_random_book(client, tenant_id, seed=5)
+
+    per_invoice = client.post(f"/tenants/{tenant_id}/reconcile", json={"max_candidates_per_invoice": 3}).json()
+    assert len({m["bank_transaction_id"] for m in per_invoice}) < len(per_invoice)
+
+    r = client.post(f"/tenants/{tenant_id}/reconcile", json={"max_candidates_per_invoice": 3, "assignment": "one_to_one"})
+    assert r.status_code == 200
+    assert "assign-solve" in r.headers["Server-Timing"]
+    proposals = r.json()
+    assert len({m["bank_transaction_id"] for m in proposals}) == len(proposals)
+    assert len({m["invoice_id"] for m in proposals}) == len(proposals)
+
+
+def test_sharded_process_pool_scoring_matches_serial(client, monkeypatch):
+    from app.config import settings
+
+    tenant_id = create_tenant(client, "Sharded")
+    seed_random_book(client, tenant_id, seed=21)
+    body = {"max_candidates_per_invoice": 4, "date_window_days": 3}
+
+    serial = client.post(f"/tenants/{tenant_id}/reconcile", json=body).json()
+    monkeypatch.setattr(settings, "reconcile_shard_size", 7)
+    sharded = client.post(f"/tenants/{tenant_id}/reconcile", json={**body, "workers": 2}).json()
+    assert proposal_set(sharded) == proposal_set(serial)
+
+
+def test_reconcile_job_runs_in_background_and_pages_results(file_client):
+    import time
+
+    client = file_client
+    tenant_id = create_tenant(client, "Jobs")
+    seed_random_book(client, tenant_id, seed=33)
+    body = {"max_candidates_per_invoice": 3, "date_window_days": 3}
+    sync = client.post(f"/tenants/{tenant_id}/reconcile", json=body).json()
+
+    r = client.post(f"/tenants/{tenant_id}/reconcile/jobs", json=body)
+    assert r.status_code == 202
+    job_id = r.json()["id"]
+
+    deadline = time.monotonic() + 30
+    while True:
+        job = client.get(f"/tenants/{tenant_id}/reconcile/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            break
+        assert 0 <= job["progress"] <= 100
+        time.sleep(0.05)
+    assert job["status"] == "succeeded", job
+    assert job["progress"] == 100 and job["phase"] == "done"
+    assert job["result_count"] == len(sync)
+
+    items, cursor = [], None
+    while True:
+        params = {"limit": 7} | ({"cursor": cursor} if cursor is not None else {})
+        page = client.get(f"/tenants/{tenant_id}/reconcile/jobs/{job_id}/results", params=params).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert proposal_set(items) == proposal_set(sync)
+
+    assert client.get(f"/tenants/{tenant_id + 1}/reconcile/jobs/{job_id}").status_code == 404
+
+
+def test_streamed_reconcile_matches_batch_response(client, monkeypatch):
+    import json
+
+    from app.config import settings
+
+    tenant_id = create_tenant(client, "Stream")
+    seed_random_book(client, tenant_id, seed=41)
+    body = {"max_candidates_per_invoice": 3, "date_window_days": 3}
+    batch = client.post(f"/tenants/{tenant_id}/reconcile", json=body).json()
+
+    monkeypatch.setattr(settings, "reconcile_shard_size", 6)
+    r = client.post(f"/tenants/{tenant_id}/reconcile/stream", json=body)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    streamed = [json.loads(line) for line in r.text.splitlines()]
+    assert proposal_set(streamed) == proposal_set(batch)
+    assert proposed_now(client, tenant_id) == sorted(proposal_set(streamed))
+
+
+def test_sql_prefilter_ranks_same_currency_amount_or_date_candidates(client):
+    from app.utils.reconcile import compute_score, to_cents
+
+    tenant_id = create_tenant(client, "Prefilter")
+    seed_random_book(client, tenant_id, seed=51)
+    # Same amounts and dates in another currency must not be proposed.
+    usd = client.get(f"/tenants/{tenant_id}/bank-transactions").json()
+    eur = [{**t, "external_id": f"eur-{t['id']}", "currency": "EUR"} for t in usd[:40]]
+    for t in eur:
+        for key in ("id", "tenant_id", "created_at"):
+            t.pop(key, None)
+    assert client.post(f"/tenants/{tenant_id}/bank-transactions/import", json=eur, headers={"Idempotency-Key": "eur"}).status_code == 200
+
+    invoices = client.get(f"/tenants/{tenant_id}/invoices").json()
+    txns = client.get(f"/tenants/{tenant_id}/bank-transactions").json()
+    for window in (0, 3):
+        expected = []
+        for inv in invoices:
+            inv_date = date.fromisoformat(inv["invoice_date"]) if inv["invoice_date"] else None
+            scored = []
+            for t in txns:
+                if t["currency"] != inv["currency"]:
+                    continue
+                posted = datetime.fromisoformat(t["posted_at"])
+                s = compute_score(
+                    to_cents(inv["amount"]), inv_date, inv["description"], to_cents(t["amount"]), posted, t["description"], date_window_days=window
+                )
+                in_window = inv_date is not None and abs((posted.date() - inv_date).days) <= window
+                if s.total > 0 and (s.amount_score > 0 or in_window):
+                    scored.append((-s.total, t["id"]))
+            expected += [(inv["id"], tx_id, -neg) for neg, tx_id in sorted(scored)[:3]]
+
+        r = client.post(f"/tenants/{tenant_id}/reconcile", json={"date_window_days": window, "candidate_strategy": "sql"})
+        assert r.status_code == 200
+        assert proposal_set(r.json()) == expected
+
+
+def test_split_payment_group_is_proposed_and_confirmed_atomically(client):
+    tenant_id = create_tenant(client, "Split")
+    inv_ids = []
+    for amount, day, desc in [(100.00, "2026-03-01", "acme march"), (250.50, "2026-03-02", "acme april"), (80.00, "2026-03-20", "rent")]:
+        r = client.post(f"/tenants/{tenant_id}/invoices", json={"amount": amount, "invoice_date": day, "description": desc})
+        inv_ids.append(r.json()["id"])
+    txns = [{"external_id": "t1", "posted_at": "2026-03-03T10:00:00", "amount": 350.50, "description": "acme"}]
+    assert client.post(f"/tenants/{tenant_id}/bank-transactions/import", json=txns, headers={"Idempotency-Key": "k"}).status_code == 200
+
+    r = client.post(f"/tenants/{tenant_id}/reconcile", json={"split_payments": True})
+    assert r.status_code == 200
+    grouped = [m for m in r.json() if m["group_id"] is not None]
+    assert sorted(m["invoice_id"] for m in grouped) == inv_ids[:2]
+    assert len({m["group_id"] for m in grouped}) == 1 and grouped[0]["group_id"] == min(m["id"] for m in grouped)
+    assert len({m["score"] for m in grouped}) == 1
+
+    r = client.post(f"/tenants/{tenant_id}/matches/{grouped[1]['id']}/confirm")
+    assert r.status_code == 200
+    confirmed = client.get(f"/tenants/{tenant_id}/matches", params={"status": "confirmed"}).json()
+    assert sorted(m["invoice_id"] for m in confirmed) == inv_ids[:2]
+    assert client.get(f"/tenants/{tenant_id}/matches", params={"status": "proposed"}).json() == []
+    open_ids = [i["id"] for i in client.get(f"/tenants/{tenant_id}/invoices", params={"status": "open"}).json()]
+    assert open_ids == [inv_ids[2]]
+
+
+def test_rejected_pairs_are_never_proposed_again(client):
+    tenant_id = create_tenant(client, "Rejections")
+    seed_random_book(client, tenant_id, seed=31, n_invoices=30, n_txns=60)
+    body = {"max_candidates_per_invoice": 3, "date_window_days": 5}
+    proposals = client.post(f"/tenants/{tenant_id}/reconcile", json=body).json()
+
+    rejected = set()
+    for m in random.Random(2).sample(proposals, 5):
+        r = client.post(f"/tenants/{tenant_id}/matches/{m['id']}/reject")
+        assert r.status_code == 200 and r.json()["status"] == "rejected"
+        rejected.add((m["invoice_id"], m["bank_transaction_id"]))
+    assert client.post(f"/tenants/{tenant_id}/matches/{m['id']}/reject").status_code == 400
+
+    incremental = client.post(f"/tenants/{tenant_id}/reconcile", json={**body, "mode": "incremental"})
+    assert incremental.status_code == 200
+    after_incremental = proposed_now(client, tenant_id)
+    for strategy in ("index", "exhaustive", "sql"):
+        client.post(f"/tenants/{tenant_id}/reconcile", json={**body, "candidate_strategy": strategy})
+        pairs = {(inv_id, tx_id) for inv_id, tx_id, _ in proposed_now(client, tenant_id)}
+        assert not pairs & rejected
+    client.post(f"/tenants/{tenant_id}/reconcile", json=body)
+    assert proposed_now(client, tenant_id) == after_incremental
+
+    inv_id = next(iter(rejected))[0]
+    r = client.delete(f"/tenants/{tenant_id}/rejections", params={"invoice_id": inv_id})
+    assert r.json()["cleared"] == sum(1 for i, _ in rejected if i == inv_id)
+    client.post(f"/tenants/{tenant_id}/reconcile", json={**body, "mode": "incremental"})
+    pairs = {(i, t) for i, t, _ in proposed_now(client, tenant_id)}
+    assert {p for p in rejected if p[0] == inv_id} <= pairs
+    assert client.delete(f"/tenants/{tenant_id}/rejections").json()["cleared"] == len({p for p in rejected if p[0] != inv_id})
+
+
+def test_bulk_confirm_reports_per_id_outcomes_and_prunes_competitors(client):
+    tenant_id = create_tenant(client, "Bulk confirm")
+    seed_random_book(client, tenant_id, seed=41, n_invoices=30, n_txns=60)
+    proposals = client.post(f"/tenants/{tenant_id}/reconcile", json={"max_candidates_per_invoice": 3}).json()
+
+    first = proposals[0]
+    same_invoice = next(m for m in proposals[1:] if m["invoice_id"] == first["invoice_id"])
+    other = next(m for m in proposals if m["invoice_id"] != first["invoice_id"] and m["bank_transaction_id"] != first["bank_transaction_id"])
+    r = client.post(f"/tenants/{tenant_id}/matches/confirm", json={"match_ids": [first["id"], same_invoice["id"], 999_999, other["id"], first["id"]]})
+    assert r.status_code == 200
+    assert r.json() == {
+        "confirmed": 2,
+        "results": [
+            {"match_id": first["id"], "outcome": "confirmed"},
+            {"match_id": same_invoice["id"], "outcome": "conflict"},
+            {"match_id": 999_999, "outcome": "not_found"},
+            {"match_id": other["id"], "outcome": "confirmed"},
+        ],
+    }
+    again = client.post(f"/tenants/{tenant_id}/matches/confirm", json={"match_ids": [first["id"]]}).json()
+    assert again["results"] == [{"match_id": first["id"], "outcome": "not_proposed"}]
+
+    r = client.post(f"/tenants/{tenant_id}/matches/confirm", json={"min_score": 0.6})
+    assert r.status_code == 200 and r.json()["confirmed"] > 0
+    confirmed = client.get(f"/tenants/{tenant_id}/matches", params={"status": "confirmed"}).json()
+    assert len({m["invoice_id"] for m in confirmed}) == len({m["bank_transaction_id"] for m in confirmed}) == len(confirmed)
+    taken_invoices = {m["invoice_id"] for m in confirmed}
+    taken_txns = {m["bank_transaction_id"] for m in confirmed}
+    for m in client.get(f"/tenants/{tenant_id}/matches", params={"status": "proposed"}).json():
+        assert m["score"] < 0.6 and m["invoice_id"] not in taken_invoices and m["bank_transaction_id"] not in taken_txns
+    statuses = {i["id"]: i["status"] for i in client.get(f"/tenants/{tenant_id}/invoices").json()}
+    assert all(statuses[i] == "matched" for i in taken_invoices)
+
+    assert client.post(f"/tenants/{tenant_id}/matches/confirm", json={}).status_code == 422
+
+    # A confirmed match that overlaps a split group prunes the whole group, and a group that lost
+    # an invoice is a conflict.
+    base, a, b, single, group = seed_split_overlap(client, "Bulk split overlap")
+    assert client.post(f"{base}/matches/confirm", json={"match_ids": [single["id"]]}).json()["confirmed"] == 1
+    assert client.get(f"{base}/matches", params={"status": "proposed"}).json() == []
+    base, a, b, single, group = seed_split_overlap(client, "Bulk split partial")
+    assert client.delete(f"{base}/invoices/{b}").status_code == 204
+    r = client.post(f"{base}/matches/confirm", json={"match_ids": [group[0]["id"]]}).json()
+    assert r["confirmed"] == 0 and {x["outcome"] for x in r["results"]} == {"conflict"}
+
+
+def test_change_feed_pages_events_and_compaction_forces_full_resync(client):
+    from app.db.deps import get_db
+    from app.services.change_log import compact_change_log
+
+    tenant_id = create_tenant(client, "Feed")
+    base = f"/tenants/{tenant_id}"
+    seed_random_book(client, tenant_id, seed=21, n_invoices=5, n_txns=10)
+    body = {"max_candidates_per_invoice": 2, "date_window_days": 5}
+    created = client.post(f"{base}/reconcile", json=body).json()
+    match = created[0]
+    assert client.post(f"{base}/matches/{match['id']}/confirm").status_code == 200
+
+    items, since = [], 0
+    while True:
+        page = client.get(f"{base}/changes", params={"since": since, "limit": 4}).json()
+        items += page["items"]
+        since = page["next_since"]
+        if not page["has_more"]:
+            break
+    assert [c["seq"] for c in items] == sorted(c["seq"] for c in items)
+    events = [(c["entity"], c["op"]) for c in items]
+    assert events.count(("invoice", "created")) == 5 and events.count(("bank_transaction", "created")) == 10
+    assert events.count(("match", "created")) == len(created)
+    assert ("match", "confirmed") in events and ("invoice", "status_changed") in events
+    # Proposals competing with the confirmed match are reported as removed.
+    kept = {m["id"] for m in client.get(f"{base}/matches").json()}
+    removed = {c["entity_id"] for c in items if c["entity"] == "match" and c["op"] == "deleted"}
+    assert removed == {m["id"] for m in created} - kept
+    # Caught up: nothing after the last seq, and other tenants see nothing.
+    assert client.get(f"{base}/changes", params={"since": since}).json() == {"items": [], "next_since": since, "has_more": False}
+    assert client.get(f"/tenants/{tenant_id + 1}/changes").json()["items"] == []
+
+    # Past retention the entries are compacted: an old cursor gets 410, the current one still works,
+    # and an incremental run can no longer replay from its watermark, so it runs in full.
+    gen = client.app.dependency_overrides[get_db]()
+    db = next(gen)
+    assert compact_change_log(db, now=datetime.utcnow() + timedelta(days=365), batch_size=7) == len(items)
+    gen.close()
+    assert client.get(f"{base}/changes", params={"since": 0}).status_code == 410
+    assert client.get(f"{base}/changes", params={"since": since}).status_code == 200
+    seed_random_book(client, tenant_id, seed=22, n_invoices=1, n_txns=2)
+    before = proposed_now(client, tenant_id)
+    rerun = client.post(f"{base}/reconcile", json={**body, "mode": "incremental"}).json()
+    assert len(rerun) == len(proposed_now(client, tenant_id)) >= len(before)
+
+
+def test_bulk_confirm_then_incremental_reconcile_matches_full_recompute(client):
+    tenant_id = create_tenant(client, "Bulk incremental")
+    base = f"/tenants/{tenant_id}"
+    seed_random_book(client, tenant_id, seed=43, n_invoices=30, n_txns=60)
+    body = {"max_candidates_per_invoice": 3, "date_window_days": 5}
+    proposals = client.post(f"{base}/reconcile", json=body).json()
+    # A full run after a confirmation proposes the confirmed transaction to other invoices again.
+    assert client.post(f"{base}/matches/{proposals[0]['id']}/confirm").status_code == 200
+    proposals = client.post(f"{base}/reconcile", json=body).json()
+
+    # Bulk confirm only prunes the competitors of the matches it confirms, like confirm_match.
+    first = proposals[0]
+    chosen = next(
+        m for m in proposals if m["invoice_id"] != first["invoice_id"] and m["bank_transaction_id"] != first["bank_transaction_id"]
+    )
+    r = client.post(f"{base}/matches/confirm", json={"match_ids": [chosen["id"]]})
+    assert r.json()["confirmed"] == 1
+    client.post(f"{base}/reconcile", json={**body, "mode": "incremental"})
+    incremental = proposed_now(client, tenant_id)
+    client.post(f"{base}/reconcile", json=body)
+    assert proposed_now(client, tenant_id) == incremental
+
+
+def test_change_feed_skips_internal_rejection_entries(client):
+    tenant_id = create_tenant(client, "Feed rejections")
+    base = f"/tenants/{tenant_id}"
+    seed_random_book(client, tenant_id, seed=25, n_invoices=5, n_txns=10)
+    match = client.post(f"{base}/reconcile", json={"max_candidates_per_invoice": 2}).json()[0]
+    since = client.get(f"{base}/changes", params={"limit": 1000}).json()["next_since"]
+    invoices_etag = client.get(f"{base}/invoices").headers["ETag"]
+
+    assert client.post(f"{base}/matches/{match['id']}/reject").status_code == 200
+    assert client.delete(f"{base}/rejections").json()["cleared"] == 1
+    # Only the match event is published; no invoice changed, so the invoice listing keeps its ETag.
+    items = client.get(f"{base}/changes", params={"since": since}).json()["items"]
+    assert [(c["entity"], c["entity_id"], c["op"]) for c in items] == [("match", match["id"], "rejected")]
+    assert client.get(f"{base}/invoices").headers["ETag"] == invoices_etag
+
+
+def seed_split_overlap(client, name):
+    """Invoices a (60.00) and b (40.00); a pays 1:1 against t2 (60.00), a+b as a group against t (100.00)."""
+    tenant_id = create_tenant(client, name)
+    base = f"/tenants/{tenant_id}"
+    a, b = (
+        client.post(f"{base}/invoices", json={"amount": amount, "invoice_date": "2026-03-01", "description": "acme"}).json()["id"]
+        for amount in (60.00, 40.00)
+    )
+    txns = [
+        {"external_id": "t", "posted_at": "2026-03-02T00:00:00", "amount": 100.00, "description": "acme"},
+        {"external_id": "t2", "posted_at": "2026-03-02T00:00:00", "amount": 60.00, "description": "acme"},
+    ]
+    t, t2 = client.post(f"{base}/bank-transactions/import", json=txns, headers={"Idempotency-Key": "k"}).json()["created_ids"]
+    proposals = client.post(f"{base}/reconcile", json={"split_payments": True}).json()
+    single = next(m for m in proposals if (m["invoice_id"], m["bank_transaction_id"], m["group_id"]) == (a, t2, None))
+    group = [m for m in proposals if m["group_id"] is not None]
+    assert sorted((m["invoice_id"], m["bank_transaction_id"]) for m in group) == [(a, t), (b, t)]
+    return base, a, b, single, group
+
+
+def test_confirm_overlapping_a_split_group_prunes_the_whole_group(client):
+    base, a, b, single, group = seed_split_overlap(client, "Split overlap")
+    # Confirming a against t2 takes the group's invoice a, so the group's row for b goes too:
+    # confirmed alone it would settle the 100.00 payment against the 40.00 invoice.
+    assert client.post(f"{base}/matches/{single['id']}/confirm").status_code == 200
+    assert client.get(f"{base}/matches", params={"status": "proposed"}).json() == []
+    assert [i["id"] for i in client.get(f"{base}/invoices", params={"status": "open"}).json()] == [b]
+
+    # A group whose invoices no longer add up to the transaction is refused.
+    base, a, b, single, group = seed_split_overlap(client, "Split partial")
+    assert client.delete(f"{base}/invoices/{b}").status_code == 204
+    r = client.post(f"{base}/matches/{group[0]['id']}/confirm")
+    assert r.status_code == 400 and "incomplete" in r.json()["detail"]
+
+
+def test_resume_only_requeues_running_jobs_whose_lease_lapsed(tmp_path):
+    import time
+
+    from sqlalchemy import create_engine, update
+    from sqlalchemy.orm import Session, sessionmaker
+
+    from app.db.base import Base
+    from app.models.models import JobStatus, ReconcileJob, Tenant
+    from app.services.jobs import JobRunner
+
+    engine = create_engine(f"sqlite+pysqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, class_=Session, expire_on_commit=False, autoflush=False)
+    with factory() as db:
+        tenant = Tenant(name="Leases")
+        db.add(tenant)
+        db.flush()
+        # Claimed by another live process, whose lease still holds.
+        job = ReconcileJob(
+            tenant_id=tenant.id,
+            request_json="{}",
+            status=JobStatus.running,
+            phase="scoring",
+            runner_id="other",
+            lease_expires_at=datetime.utcnow() + timedelta(minutes=5),
+        )
+        db.add(job)
+        db.commit()
+        job_id = job.id
+
+    runner = JobRunner(factory, workers=1)
+    try:
+        assert runner.resume() == 0
+        with factory() as db:
+            job = db.get(ReconcileJob, job_id)
+            assert (job.status, job.runner_id) == (JobStatus.running, "other")
+
+            # Its process died: the lease lapses and the job is taken over and run here.
+            db.execute(update(ReconcileJob).values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            db.commit()
+        assert runner.resume() == 1
+        deadline = time.monotonic() + 30
+        while True:
+            with factory() as db:
+                job = db.get(ReconcileJob, job_id)
+            if job.status in (JobStatus.succeeded, JobStatus.failed) or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        assert (job.status, job.runner_id, job.lease_expires_at) == (JobStatus.succeeded, runner.runner_id, None)
+    finally:
+        runner.shutdown()
+
+
+def test_change_log_compactor_keeps_running_after_a_failed_pass(monkeypatch):
+    import threading
+
+    from sqlalchemy import create_engine
+
+    from app.services import change_log
+
+    calls = []
+    compacted_twice = threading.Event()
+
+    def flaky_compact(db):
+        calls.append(db)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        compacted_twice.set()
+        return 0
+
+    monkeypatch.setattr(change_log, "compact_change_log", flaky_compact)
+    compactor = change_log.ChangeLogCompactor(create_engine("sqlite+pysqlite://"), interval=0.01)
+    compactor.start()
+    try:
+        assert compacted_twice.wait(5)
+    finally:
+        compactor.stop()
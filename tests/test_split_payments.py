@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import random
+from itertools import combinations
+
+from app.utils.split_payments import find_split
+
+
+def brute_force(target, amounts, tol, max_items):
+    best = None
+    for size in range(2, max_items + 1):
+        for combo in combinations(range(len(amounts)), size):
+            total = sum(amounts[i] for i in combo)
+            if abs(total - target) <= tol:
+                key = (abs(total - target), size, combo)
+                best = key if best is None or key < best else best
+    return best[2] if best else None
+
+
+def test_find_split_matches_brute_force():
+    for seed in range(300):
+        rng = random.Random(seed)
+        amounts = [rng.randint(1, 500) for _ in range(rng.randint(0, 10))]
+        target, tol, max_items = rng.randint(1, 1200), rng.randint(0, 5), rng.randint(2, 4)
+        got = find_split(target, amounts, tolerance_cents=tol, max_items=max_items, max_work=10**7)
+        assert got == brute_force(target, amounts, tol, max_items), seed
+
+
+def test_find_split_gives_up_past_work_limit():
+    amounts = [1000 + i for i in range(24)]
+    assert find_split(4006, amounts, tolerance_cents=0, max_items=4) is not None
+    assert find_split(4006, amounts, tolerance_cents=0, max_items=4, max_work=100) is None
+
+
+def test_propose_splits_shares_one_work_budget_across_vendor_pools(monkeypatch):
+    from datetime import date
+
+    from app.utils import split_payments
+    from app.utils.reconcile import ScoringColumns
+
+    # One transaction and 12 vendors, each with a pool whose search takes a few hundred steps.
+    n_vendors, per_vendor = 12, 10
+    inv_ids = list(range(1, n_vendors * per_vendor + 1))
+    inv_keys = [("USD", 1 + (i - 1) // per_vendor) for i in inv_ids]
+    inv_cols = ScoringColumns.from_rows((1000 + i, date(2026, 3, 1), b"") for i in inv_ids)
+    txn_cols = ScoringColumns.from_rows([(999_999, date(2026, 3, 1), b"")])
+
+    spent = []
+    real = split_payments.find_split
+
+    def counting_find_split(*args, budget, **kwargs):
+        before = budget[0]
+        out = real(*args, budget=budget, **kwargs)
+        spent.append(before - max(budget[0], 0))
+        return out
+
+    monkeypatch.setattr(split_payments, "find_split", counting_find_split)
+
+    def run(max_work):
+        spent.clear()
+        args = (inv_ids, inv_keys, inv_cols, [1], ["USD"], txn_cols)
+        list(split_payments.propose_splits(*args, date_window_days=3, max_items=4, max_candidates=24, max_work=max_work))
+        return sum(spent), len(spent)
+
+    unbounded, pools = run(10**7)
+    assert pools == n_vendors
+    limit = unbounded // 4
+    total, searched = run(limit)
+    assert total <= limit and searched < n_vendors
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import pytest
+
+from app.utils.statement_formats import _ofx_tokens, iter_camt053_records, iter_mt940_records, iter_ofx_records
+from app.utils.statement_stream import StatementFormatError, iter_lines
+
+CAMT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"><BkToCstmrStmt><Stmt>
+<Ntry><NtryRef>r1</NtryRef><Amt Ccy="EUR">100.50</Amt><CdtDbtInd>CRDT</CdtDbtInd>
+  <BookgDt><Dt>2026-01-05</Dt></BookgDt><AcctSvcrRef>B1</AcctSvcrRef>
+  <NtryDtls><TxDtls><RmtInf><Ustrd>INV-1</Ustrd><Ustrd>acme</Ustrd></RmtInf></TxDtls></NtryDtls></Ntry>
+<Ntry><Amt Ccy="EUR">5.00</Amt><CdtDbtInd>DBIT</CdtDbtInd><BookgDt><Dt>2026-01-05</Dt></BookgDt></Ntry>
+<Ntry><NtryRef>r3</NtryRef><Amt Ccy="EUR">7</Amt><CdtDbtInd>CRDT</CdtDbtInd>
+  <ValDt><DtTm>2026-01-06T10:00:00</DtTm></ValDt><AddtlNtryInf>fee refund</AddtlNtryInf></Ntry>
+</Stmt></BkToCstmrStmt></Document>"""
+
+MT940 = b""":20:STMT
+:25:DE123456
+:28C:1/1
+:60F:C260101EUR1000,00
+:61:2601050105C100,50NTRFINV-1//BREF1
+:86:Payment acme
+INV-1 thanks
+:61:260106D5,00NTRFNONREF
+:86:fee
+:61:260107C7,NMSCNONREF
+:62F:C260107EUR1102,50
+-
+"""
+
+OFX = b"""OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>USD<BANKTRANLIST>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260105120000.000[-5:EST]<TRNAMT>100.50<FITID>F1<NAME>ACME<MEMO>INV-1</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260105<TRNAMT>-5.00<FITID>F2</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260106<TRNAMT>7</TRNAMT><FITID>F3</FITID></STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"""
+
+
+def chunks(data: bytes, size: int = 7):
+    return (data[i : i + size] for i in range(0, len(data), size))
+
+
+def test_camt053_yields_credit_entries():
+    assert list(iter_camt053_records(chunks(CAMT))) == [
+        (1, {"external_id": "B1", "posted_at": "2026-01-05", "amount": "100.50", "currency": "EUR", "description": "INV-1 acme"}),
+        (3, {"external_id": "r3", "posted_at": "2026-01-06T10:00:00", "amount": "7", "currency": "EUR", "description": "fee refund"}),
+    ]
+
+
+def test_mt940_yields_credit_statement_lines():
+    assert list(iter_mt940_records(chunks(MT940))) == [
+        (
+            5,
+            {
+                "external_id": "BREF1",
+                "posted_at": "2026-01-05T00:00:00",
+                "amount": "100.50",
+                "currency": "EUR",
+                "description": "Payment acme INV-1 thanks",
+            },
+        ),
+        (10, {"posted_at": "2026-01-07T00:00:00", "amount": "7", "currency": "EUR"}),
+    ]
+
+
+def test_ofx_yields_credit_transactions():
+    assert list(iter_ofx_records(chunks(OFX, 5))) == [
+        (1, {"external_id": "F1", "posted_at": "2026-01-05T12:00:00", "amount": "100.50", "currency": "USD", "description": "ACME INV-1"}),
+        (3, {"external_id": "F3", "posted_at": "2026-01-06T00:00:00", "amount": "7", "currency": "USD"}),
+    ]
+
+
+def test_statement_upload_imports_each_format(client):
+    tenant_id = client.post("/tenants", json={"name": "Statements"}).json()["id"]
+    url = f"/tenants/{tenant_id}/bank-transactions/upload"
+    for fmt, body in (("camt053", CAMT), ("mt940", MT940), ("ofx", OFX)):
+        r = client.post(url, params={"format": fmt}, content=chunks(body, 64), headers={"Idempotency-Key": fmt})
+        assert r.status_code == 200, r.text
+        assert (r.json()["inserted"], r.json()["skipped"]) == (2, 0)
+    listed = client.get(f"/tenants/{tenant_id}/bank-transactions").json()
+    assert sorted((t["external_id"], t["amount"], t["currency"]) for t in listed if t["external_id"]) == [
+        ("B1", 100.5, "EUR"),
+        ("BREF1", 100.5, "EUR"),
+        ("F1", 100.5, "USD"),
+        ("F3", 7.0, "USD"),
+        ("r3", 7.0, "EUR"),
+    ]
+
+    broken = client.post(url, params={"format": "camt053"}, content=CAMT[:-20], headers={"Idempotency-Key": "broken"})
+    assert broken.status_code == 422
+
+
+def test_ofx_out_of_range_date_is_a_format_error(client):
+    bad = OFX.replace(b"<DTPOSTED>20260106", b"<DTPOSTED>20261340")
+    with pytest.raises(StatementFormatError, match="transaction 3: invalid DTPOSTED"):
+        list(iter_ofx_records(chunks(bad)))
+
+    tenant_id = client.post("/tenants", json={"name": "Bad dates"}).json()["id"]
+    r = client.post(
+        f"/tenants/{tenant_id}/bank-transactions/upload", params={"format": "ofx"}, content=chunks(bad, 64), headers={"Idempotency-Key": "bad"}
+    )
+    assert r.status_code == 422 and "invalid DTPOSTED" in r.text
+
+
+def test_overlong_lines_and_ofx_elements_are_rejected():
+    assert list(iter_lines(chunks(b"ab\ncdef\ng", 1), max_line_length=5)) == ["ab\n", "cdef\n", "g"]
+    with pytest.raises(StatementFormatError, match="line 2: longer than 5 characters"):
+        list(iter_lines(chunks(b"ab\ncdefgh", 2), max_line_length=5))
+    with pytest.raises(StatementFormatError, match="line 1: longer than 5 characters"):
+        list(iter_lines([b"abcdefgh\n"], max_line_length=5))
+
+    assert list(_ofx_tokens(chunks(b"<A>1<B>22", 1), max_length=5)) == [("A", "1"), ("B", "22")]
+    with pytest.raises(StatementFormatError, match="OFX element longer than 5 characters"):
+        list(_ofx_tokens(chunks(b"<A>1<MEMO>" + b"x" * 20, 3), max_length=5))